@@ -3,19 +3,31 @@
 AI Service for Docsmait
 
 This module handles AI/LLM integration for document assistance including:
-- Ollama integration
-- Error handling and timeouts
+- Ollama integration over a shared, pooled client (see ollama_pool.py)
+- Error handling, timeouts and circuit breaking
+- Priority admission through the LLM scheduler (see llm_scheduler.py)
+- Response caching for repeated assistance requests (see assist_cache.py)
+- Map-reduce assistance for documents longer than the context window
+  (see long_document.py)
 - Response formatting
 - Usage tracking
 """
 import asyncio
+import concurrent.futures
 import json
 import logging
 import time
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List, AsyncIterator
 import httpx
 from .ai_config import ai_config
+from .assist_cache import assist_cache, assist_cache_key
 from .config import config
+from .llm_scheduler import LLMQueueFullError, llm_scheduler
+from .long_document import (
+    INTERMEDIATE_REDUCE_INSTRUCTIONS, MAP_INSTRUCTIONS, REDUCE_INSTRUCTIONS,
+    reduce_partials, section_cache, section_cache_key, section_title, split_sections
+)
+from .ollama_pool import CircuitOpenError, ollama_pool
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +41,9 @@ class AIService:
         self.timeout = self.settings.get("ai_timeout", config.AI_TIMEOUT)
         self.max_response_length = self.settings.get("max_response_length", config.MAX_RESPONSE_LENGTH)
         self.context_window = self.settings.get("ai_context_window", config.AI_CONTEXT_WINDOW)
+        self.pool = ollama_pool
+        self.cache = assist_cache
+        self.section_cache = section_cache
     
     def refresh_settings(self):
         """Refresh AI settings from config"""
@@ -40,29 +55,35 @@ class AIService:
         self.context_window = self.settings.get("ai_context_window", config.AI_CONTEXT_WINDOW)
     
     async def check_ollama_health(self) -> bool:
-        """Check if Ollama service is available"""
+        """Whether Ollama is considered available, from the outcome of recent calls (no probe)"""
+        return self.pool.breaker.is_available()
+    
+    async def probe_ollama(self) -> bool:
+        """Call /api/tags through the pool; the outcome feeds the circuit breaker"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            response = await self.pool.request("GET", f"{self.base_url}/api/tags", timeout=10.0)
+            return response.status_code == 200
+        except CircuitOpenError:
+            return False
         except Exception as e:
-            logger.error(f"Ollama health check failed: {e}")
+            logger.error(f"Ollama health probe failed: {e}")
             return False
     
     async def list_available_models(self) -> Tuple[bool, List[str], Optional[str]]:
         """Get list of available models from Ollama"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    models = [model["name"] for model in data.get("models", [])]
-                    return True, models, None
-                else:
-                    error_msg = f"Failed to fetch models: HTTP {response.status_code}"
-                    logger.error(error_msg)
-                    return False, [], error_msg
+            response = await self.pool.request("GET", f"{self.base_url}/api/tags", timeout=30.0)
+            
+            if response.status_code == 200:
+                data = response.json()
+                models = [model["name"] for model in data.get("models", [])]
+                return True, models, None
+            else:
+                error_msg = f"Failed to fetch models: HTTP {response.status_code}"
+                logger.error(error_msg)
+                return False, [], error_msg
+        except CircuitOpenError:
+            return False, [], "AI service is currently unavailable"
         except httpx.TimeoutException:
             error_msg = "Timeout while fetching available models"
             logger.error(error_msg)
@@ -81,6 +102,192 @@ class AIService:
         truncated = content[:self.context_window - 100]
         return truncated + "\n\n[Content truncated to fit context window...]"
     
+    def _resolve_prompt_template(self, document_type: str, custom_prompt: Optional[str]) -> Tuple[str, str]:
+        """Return (prompt template, source) for a document type"""
+        if custom_prompt:
+            return custom_prompt, "custom"
+        prompt_template = ai_config.get_document_prompt(document_type)
+        if not prompt_template:
+            return "Help improve this document. Consider the following requirements: [configurable_item]", "fallback"
+        return prompt_template, "config"
+    
+    @staticmethod
+    def _build_user_prompt(truncated_content: str) -> str:
+        return f"Current document content:\n\n{truncated_content}\n\nPlease provide suggestions or improvements based on the requirements above."
+    
+    def _generation_options(self) -> Dict[str, Any]:
+        return {
+            "num_predict": self.max_response_length,
+            "temperature": 0.7,
+            "top_p": 0.9
+        }
+    
+    def _build_chat_payload(self, model: str, system_prompt: str, user_prompt: str, stream: bool) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "stream": stream,
+            "options": self._generation_options()
+        }
+    
+    def _use_long_document_mode(self, document_content: str, long_document: Optional[bool]) -> bool:
+        """Explicit request flag, otherwise automatic for documents beyond the context window"""
+        if long_document is None:
+            return config.AI_LONG_DOCUMENT_AUTO and len(document_content) > self.context_window
+        return long_document
+    
+    async def _chat(self, model: str, system_prompt: str, user_prompt: str, priority: str = "interactive") -> Tuple[bool, str]:
+        """One non-streaming chat call: (success, content or error message)"""
+        payload = self._build_chat_payload(model, system_prompt, user_prompt, stream=False)
+        async with llm_scheduler.async_slot(priority):
+            response = await self.pool.request("POST", f"{self.base_url}/api/chat", timeout=self.timeout, json=payload)
+        if response.status_code == 404:
+            return False, f"Model '{model}' not found. Please check available models."
+        if response.status_code != 200:
+            return False, f"AI service error: HTTP {response.status_code}"
+        content = response.json().get("message", {}).get("content", "")
+        if not content.strip():
+            return False, "AI service returned an empty response. Please try again."
+        return True, content
+    
+    async def _run_long_document(
+        self,
+        user_id: int,
+        document_type: str,
+        document_content: str,
+        prompt_template: str,
+        user_input: str,
+        model: str,
+        regenerate: bool,
+        start_time: float
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Map-reduce assistance for documents longer than the context window
+        
+        Sections are analyzed concurrently (at most OLLAMA_NUM_PARALLEL at a time
+        per request, as batch scheduler work so one document cannot occupy the
+        interactive slots), with results cached by section hash; the findings
+        are then reduced into one answer. Yields
+        {"type": "progress", ...} as sections complete and finally one
+        {"type": "result", "success": ..., "response": ..., "metadata": ...}.
+        """
+        full_prompt = prompt_template.replace("[configurable_item]", user_input)
+        options = self._generation_options()
+        cache_key = assist_cache_key(
+            model, prompt_template, document_content, user_input, dict(options, long_document=True)
+        )
+        if regenerate:
+            self.cache.record_bypass()
+        else:
+            cached = self.cache.lookup(cache_key)
+            if cached:
+                processing_time = time.time() - start_time
+                ai_config.log_ai_usage(
+                    user_id=user_id,
+                    document_type=document_type,
+                    prompt_used=full_prompt,
+                    response_length=len(cached["response"]),
+                    processing_time=processing_time
+                )
+                yield {"type": "result", "success": True, "response": cached["response"],
+                       "metadata": self._cached_metadata(cached, cache_key, processing_time)}
+                return
+        
+        sections = split_sections(document_content, self.context_window - 100)
+        sections_omitted = max(0, len(sections) - config.AI_LONG_DOCUMENT_MAX_SECTIONS)
+        sections = sections[:config.AI_LONG_DOCUMENT_MAX_SECTIONS]
+        map_prompt = f"{full_prompt}\n\n{MAP_INSTRUCTIONS}"
+        concurrency = asyncio.Semaphore(max(1, config.OLLAMA_NUM_PARALLEL))
+        
+        async def analyze(index: int, section: str):
+            key = section_cache_key(model, map_prompt, section, options)
+            result = None if regenerate else self.section_cache.lookup(key)
+            if result is not None:
+                return index, True, True, result
+            async with concurrency:
+                success, result = await self._chat(model, map_prompt, section, "batch")
+            if success:
+                self.section_cache.store(key, result)
+            return index, False, success, result
+        
+        # Map: analyze sections concurrently, reporting progress as each completes
+        findings: List[Optional[str]] = [None] * len(sections)
+        errors, sections_cached = [], 0
+        tasks = [asyncio.ensure_future(analyze(index, section)) for index, section in enumerate(sections)]
+        try:
+            for completed, task in enumerate(asyncio.as_completed(tasks), 1):
+                index, cached_result, success, result = await task
+                if success:
+                    findings[index] = result
+                    sections_cached += cached_result
+                else:
+                    errors.append(result)
+                yield {"type": "progress", "completed": completed, "total": len(sections), "cached": cached_result}
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        if not any(findings):
+            yield {"type": "result", "success": False, "response": errors[0] if errors else "The document is empty.", "metadata": {}}
+            return
+        
+        # Reduce: combine the per-section findings (in rounds if they exceed the context window)
+        partials = [
+            f"## Part {index + 1}: {section_title(section)}\n{findings[index] or '(analysis unavailable)'}"
+            for index, section in enumerate(sections)
+        ]
+        budget = self.context_window
+        
+        async def condense(group: List[str]) -> Tuple[bool, str]:
+            async with concurrency:
+                return await self._chat(model, INTERMEDIATE_REDUCE_INSTRUCTIONS, "\n\n".join(group), "batch")
+        
+        success, partials, reduce_rounds = await reduce_partials(partials, budget, condense)
+        if not success:
+            yield {"type": "result", "success": False, "response": partials[0], "metadata": {}}
+            return
+        
+        success, answer = await self._chat(
+            model, f"{full_prompt}\n\n{REDUCE_INSTRUCTIONS}", "\n\n".join(partials)[:budget]
+        )
+        if not success:
+            yield {"type": "result", "success": False, "response": answer, "metadata": {}}
+            return
+        
+        if len(answer) > self.max_response_length:
+            answer = answer[:self.max_response_length] + "\n\n[Response truncated due to length limit]"
+        
+        processing_time = time.time() - start_time
+        ai_config.log_ai_usage(
+            user_id=user_id,
+            document_type=document_type,
+            prompt_used=full_prompt,
+            response_length=len(answer),
+            processing_time=processing_time
+        )
+        
+        metadata = {
+            "model_used": model,
+            "processing_time": processing_time,
+            "response_length": len(answer),
+            "content_truncated": sections_omitted > 0,
+            "prompt_used": full_prompt if self.settings.get("show_prompt", True) else None,
+            "long_document": {
+                "sections": len(sections),
+                "sections_cached": sections_cached,
+                "sections_failed": len(errors),
+                "sections_omitted": sections_omitted,
+                "reduce_rounds": reduce_rounds
+            },
+            "cache_hit": False,
+            "cache_key": cache_key
+        }
+        self.cache.store(cache_key, answer, dict(metadata))
+        yield {"type": "result", "success": True, "response": answer, "metadata": metadata}
+    
     async def generate_document_assistance(
         self, 
         user_id: int,
@@ -89,11 +296,19 @@ class AIService:
         user_input: str,
         custom_prompt: Optional[str] = None,
         model: Optional[str] = None,
-        debug_mode: bool = False
+        debug_mode: bool = False,
+        regenerate: bool = False,
+        long_document: Optional[bool] = None
     ) -> Tuple[bool, str, Dict[str, Any]]:
         """
         Generate AI assistance for document editing
         
+        A cached answer for the same model, prompt, document and requirements is
+        returned without calling the LLM unless regenerate (or debug_mode) is set.
+        Documents longer than the context window are analyzed section by section
+        and the results combined, instead of being truncated (long_document
+        forces the mode on or off; None decides by length).
+        
         Returns:
             Tuple[bool, str, Dict]: (success, response/error_message, metadata)
         """
@@ -113,31 +328,13 @@ class AIService:
                     "context_window": self.context_window
                 }
             
-            # Check Ollama availability
-            health_check_start = time.time()
-            is_healthy = await self.check_ollama_health()
-            health_check_time = time.time() - health_check_start
-            
+            # Availability is tracked by the circuit breaker from real call outcomes
             if debug_mode:
-                debug_log["2_health_check"] = {
-                    "healthy": is_healthy,
-                    "check_time_ms": round(health_check_time * 1000, 2)
-                }
-            
-            if not is_healthy:
-                return False, "AI service is currently unavailable. Please try again later.", {"debug_log": debug_log} if debug_mode else {}
+                debug_log["2_circuit_breaker"] = self.pool.breaker.snapshot()
             
             # Get or use custom prompt
             prompt_fetch_start = time.time()
-            if custom_prompt:
-                prompt_template = custom_prompt
-                prompt_source = "custom"
-            else:
-                prompt_template = ai_config.get_document_prompt(document_type)
-                prompt_source = "config"
-                if not prompt_template:
-                    prompt_template = "Help improve this document. Consider the following requirements: [configurable_item]"
-                    prompt_source = "fallback"
+            prompt_template, prompt_source = self._resolve_prompt_template(document_type, custom_prompt)
             
             prompt_fetch_time = time.time() - prompt_fetch_start
             
@@ -153,6 +350,17 @@ class AIService:
             # Replace configurable item
             full_prompt = prompt_template.replace("[configurable_item]", user_input)
             
+            if self._use_long_document_mode(document_content, long_document):
+                async for event in self._run_long_document(
+                    user_id, document_type, document_content, prompt_template, user_input,
+                    model or self.default_model, regenerate or debug_mode, start_time
+                ):
+                    result = event  # Progress events matter only when streaming
+                metadata = result["metadata"]
+                if debug_mode:
+                    metadata = dict(metadata, debug_log=debug_log)
+                return result["success"], result["response"], metadata
+            
             # Truncate document content if needed
             content_processing_start = time.time()
             original_content_length = len(document_content)
@@ -170,7 +378,7 @@ class AIService:
             
             # Prepare the complete prompt
             system_prompt = full_prompt
-            user_prompt = f"Current document content:\n\n{truncated_content}\n\nPlease provide suggestions or improvements based on the requirements above."
+            user_prompt = self._build_user_prompt(truncated_content)
             
             # Use specified model or default
             model_to_use = model or self.default_model
@@ -183,19 +391,23 @@ class AIService:
                 }
             
             # Prepare request payload
-            payload = {
-                "model": model_to_use,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "stream": False,
-                "options": {
-                    "num_predict": self.max_response_length,
-                    "temperature": 0.7,
-                    "top_p": 0.9
-                }
-            }
+            payload = self._build_chat_payload(model_to_use, system_prompt, user_prompt, stream=False)
+            
+            cache_key = assist_cache_key(model_to_use, prompt_template, truncated_content, user_input, payload["options"])
+            if regenerate or debug_mode:
+                self.cache.record_bypass()
+            else:
+                cached = self.cache.lookup(cache_key)
+                if cached:
+                    processing_time = time.time() - start_time
+                    ai_config.log_ai_usage(
+                        user_id=user_id,
+                        document_type=document_type,
+                        prompt_used=full_prompt,
+                        response_length=len(cached["response"]),
+                        processing_time=processing_time
+                    )
+                    return True, cached["response"], self._cached_metadata(cached, cache_key, processing_time)
             
             if debug_mode:
                 debug_log["6_api_request"] = {
@@ -207,100 +419,107 @@ class AIService:
             
             # Make API call to Ollama
             api_call_start = time.time()
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                if debug_mode:
-                    debug_log["7_api_call_timing"] = {"start_time": api_call_start}
-                
-                response = await client.post(
+            if debug_mode:
+                debug_log["7_api_call_timing"] = {"start_time": api_call_start}
+            
+            async with llm_scheduler.async_slot("interactive") as queue_seconds:
+                response = await self.pool.request(
+                    "POST",
                     f"{self.base_url}/api/chat",
+                    timeout=self.timeout,
                     json=payload
                 )
+            
+            api_call_time = time.time() - api_call_start
+            processing_time = time.time() - start_time
+            
+            if debug_mode:
+                debug_log["8_api_response"] = {
+                    "status_code": response.status_code,
+                    "queue_time_ms": round(queue_seconds * 1000, 2),
+                    "api_call_time_ms": round(api_call_time * 1000, 2),
+                    "total_processing_time_ms": round(processing_time * 1000, 2),
+                    "response_headers": dict(response.headers)
+                }
+            
+            if response.status_code == 200:
+                data = response.json()
+                ai_response = data.get("message", {}).get("content", "")
                 
-                api_call_time = time.time() - api_call_start
-                processing_time = time.time() - start_time
+                if debug_mode:
+                    debug_log["9_response_data"] = {
+                        "raw_response_keys": list(data.keys()),
+                        "message_keys": list(data.get("message", {}).keys()) if data.get("message") else [],
+                        "response_length": len(ai_response),
+                        "response_preview": ai_response[:200] + "..." if len(ai_response) > 200 else ai_response
+                    }
+                
+                # Validate response
+                if not ai_response.strip():
+                    error_msg = "AI service returned an empty response. Please try again."
+                    return False, error_msg, {"debug_log": debug_log} if debug_mode else {}
+                
+                # Truncate response if too long
+                response_truncated = False
+                if len(ai_response) > self.max_response_length:
+                    ai_response = ai_response[:self.max_response_length] + "\n\n[Response truncated due to length limit]"
+                    response_truncated = True
                 
                 if debug_mode:
-                    debug_log["8_api_response"] = {
-                        "status_code": response.status_code,
-                        "api_call_time_ms": round(api_call_time * 1000, 2),
-                        "total_processing_time_ms": round(processing_time * 1000, 2),
-                        "response_headers": dict(response.headers)
+                    debug_log["10_response_processing"] = {
+                        "response_truncated": response_truncated,
+                        "final_response_length": len(ai_response)
                     }
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_response = data.get("message", {}).get("content", "")
-                    
-                    if debug_mode:
-                        debug_log["9_response_data"] = {
-                            "raw_response_keys": list(data.keys()),
-                            "message_keys": list(data.get("message", {}).keys()) if data.get("message") else [],
-                            "response_length": len(ai_response),
-                            "response_preview": ai_response[:200] + "..." if len(ai_response) > 200 else ai_response
-                        }
-                    
-                    # Validate response
-                    if not ai_response.strip():
-                        error_msg = "AI service returned an empty response. Please try again."
-                        return False, error_msg, {"debug_log": debug_log} if debug_mode else {}
-                    
-                    # Truncate response if too long
-                    response_truncated = False
-                    if len(ai_response) > self.max_response_length:
-                        ai_response = ai_response[:self.max_response_length] + "\n\n[Response truncated due to length limit]"
-                        response_truncated = True
-                    
-                    if debug_mode:
-                        debug_log["10_response_processing"] = {
-                            "response_truncated": response_truncated,
-                            "final_response_length": len(ai_response)
-                        }
-                    
-                    # Log usage
-                    ai_config.log_ai_usage(
-                        user_id=user_id,
-                        document_type=document_type,
-                        prompt_used=full_prompt,
-                        response_length=len(ai_response),
-                        processing_time=processing_time
-                    )
-                    
-                    metadata = {
-                        "model_used": model_to_use,
-                        "processing_time": processing_time,
-                        "response_length": len(ai_response),
-                        "content_truncated": len(document_content) > self.context_window,
-                        "prompt_used": full_prompt if ai_config.get_ai_settings().get("show_prompt", True) else None
+                # Log usage
+                ai_config.log_ai_usage(
+                    user_id=user_id,
+                    document_type=document_type,
+                    prompt_used=full_prompt,
+                    response_length=len(ai_response),
+                    processing_time=processing_time
+                )
+                
+                metadata = {
+                    "model_used": model_to_use,
+                    "processing_time": processing_time,
+                    "queue_time": round(queue_seconds, 3),
+                    "response_length": len(ai_response),
+                    "content_truncated": len(document_content) > self.context_window,
+                    "prompt_used": full_prompt if ai_config.get_ai_settings().get("show_prompt", True) else None,
+                    "cache_hit": False,
+                    "cache_key": cache_key
+                }
+                self.cache.store(cache_key, ai_response, dict(metadata))
+                
+                if debug_mode:
+                    metadata["debug_log"] = debug_log
+                
+                return True, ai_response, metadata
+                
+            else:
+                error_data = response.json() if response.headers.get('content-type') == 'application/json' else {}
+                error_msg = error_data.get("error", f"HTTP {response.status_code}")
+                
+                if debug_mode:
+                    debug_log["11_api_error"] = {
+                        "status_code": response.status_code,
+                        "error_data": error_data,
+                        "error_message": error_msg,
+                        "response_text": response.text[:500] if hasattr(response, 'text') else "N/A"
                     }
-                    
-                    if debug_mode:
-                        metadata["debug_log"] = debug_log
-                    
-                    return True, ai_response, metadata
-                    
+                
+                logger.error(f"Ollama API error: {error_msg}")
+                
+                if response.status_code == 404:
+                    error_msg = f"Model '{model_to_use}' not found. Please check available models."
+                elif response.status_code == 429:
+                    error_msg = "AI service is busy. Please try again in a moment."
                 else:
-                    error_data = response.json() if response.headers.get('content-type') == 'application/json' else {}
-                    error_msg = error_data.get("error", f"HTTP {response.status_code}")
-                    
-                    if debug_mode:
-                        debug_log["11_api_error"] = {
-                            "status_code": response.status_code,
-                            "error_data": error_data,
-                            "error_message": error_msg,
-                            "response_text": response.text[:500] if hasattr(response, 'text') else "N/A"
-                        }
-                    
-                    logger.error(f"Ollama API error: {error_msg}")
-                    
-                    if response.status_code == 404:
-                        error_msg = f"Model '{model_to_use}' not found. Please check available models."
-                    elif response.status_code == 429:
-                        error_msg = "AI service is busy. Please try again in a moment."
-                    else:
-                        error_msg = f"AI service error: {error_msg}"
-                    
-                    return False, error_msg, {"debug_log": debug_log} if debug_mode else {}
-        
+                    error_msg = f"AI service error: {error_msg}"
+                
+                return False, error_msg, {"debug_log": debug_log} if debug_mode else {}
+    
         except httpx.TimeoutException:
             processing_time = time.time() - start_time
             error_msg = f"AI request timed out after {self.timeout} seconds. Please try again with a shorter document or different requirements."
@@ -315,6 +534,15 @@ class AIService:
             logger.error(f"AI timeout: {processing_time}s")
             return False, error_msg, {"debug_log": debug_log} if debug_mode else {}
             
+        except LLMQueueFullError:
+            # Surfaced by the API as 429 with Retry-After
+            raise
+            
+        except CircuitOpenError as e:
+            if debug_mode:
+                debug_log["13_circuit_open"] = {"retry_after_seconds": round(e.retry_after, 1)}
+            return False, "AI service is currently unavailable. Please try again later.", {"debug_log": debug_log} if debug_mode else {}
+            
         except httpx.ConnectError as e:
             error_msg = "Cannot connect to AI service. Please check if the service is running."
             
@@ -342,60 +570,309 @@ class AIService:
             logger.error(f"AI service error: {e}")
             return False, error_msg, {"debug_log": debug_log} if debug_mode else {}
     
+    async def stream_document_assistance(
+        self,
+        user_id: int,
+        document_type: str,
+        document_content: str,
+        user_input: str,
+        custom_prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        regenerate: bool = False,
+        long_document: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of generate_document_assistance
+        
+        Yields {"type": "start"}, then {"type": "token", "content": ...} events as
+        Ollama produces them, and finally {"type": "done", "metadata": {...}} or
+        {"type": "error", "error": ...}. A cached answer arrives as a single token.
+        Long documents yield {"type": "progress", "completed", "total"} events
+        while sections are analyzed, then the combined answer as a single token.
+        """
+        start_time = time.time()
+        self.refresh_settings()
+        
+        prompt_template, _ = self._resolve_prompt_template(document_type, custom_prompt)
+        if self._use_long_document_mode(document_content, long_document):
+            async for event in self._stream_long_document(
+                user_id, document_type, document_content, prompt_template, user_input,
+                model or self.default_model, regenerate, start_time
+            ):
+                yield event
+            return
+        
+        full_prompt = prompt_template.replace("[configurable_item]", user_input)
+        truncated_content = self.truncate_content(document_content)
+        model_to_use = model or self.default_model
+        payload = self._build_chat_payload(
+            model_to_use, full_prompt, self._build_user_prompt(truncated_content), stream=True
+        )
+        
+        start_event = {
+            "type": "start",
+            "model_used": model_to_use,
+            "content_truncated": len(document_content) > self.context_window,
+            "prompt_used": full_prompt if self.settings.get("show_prompt", True) else None
+        }
+        
+        # Cached answers are served even while the circuit breaker is open
+        cache_key = assist_cache_key(model_to_use, prompt_template, truncated_content, user_input, payload["options"])
+        cached = None
+        if regenerate:
+            self.cache.record_bypass()
+        else:
+            cached = self.cache.lookup(cache_key)
+        if cached:
+            yield dict(start_event, cache_hit=True)
+            yield {"type": "token", "content": cached["response"]}
+            processing_time = time.time() - start_time
+            ai_config.log_ai_usage(
+                user_id=user_id,
+                document_type=document_type,
+                prompt_used=full_prompt,
+                response_length=len(cached["response"]),
+                processing_time=processing_time
+            )
+            metadata = self._cached_metadata(cached, cache_key, processing_time)
+            metadata["first_token_time"] = round(processing_time, 3)
+            yield {"type": "done", "metadata": metadata}
+            return
+        
+        if not self.pool.breaker.is_available():
+            yield {"type": "error", "error": "AI service is currently unavailable. Please try again later."}
+            return
+        
+        yield dict(start_event, cache_hit=False)
+        
+        response_parts = []
+        response_length = 0
+        first_token_time = None
+        response_truncated = False
+        try:
+            async with llm_scheduler.async_slot("interactive") as queue_seconds:
+                async with self.pool.stream("POST", f"{self.base_url}/api/chat", timeout=self.timeout, json=payload) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        if response.status_code == 404:
+                            error_msg = f"Model '{model_to_use}' not found. Please check available models."
+                        elif response.status_code == 429:
+                            error_msg = "AI service is busy. Please try again in a moment."
+                        else:
+                            error_msg = f"AI service error: HTTP {response.status_code}"
+                        logger.error(f"Ollama API error: {error_msg}")
+                        yield {"type": "error", "error": error_msg}
+                        return
+                    
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        data = json.loads(line)
+                        if data.get("error"):
+                            yield {"type": "error", "error": f"AI service error: {data['error']}"}
+                            return
+                        
+                        token = data.get("message", {}).get("content", "")
+                        if token:
+                            if first_token_time is None:
+                                first_token_time = time.time() - start_time
+                            # Enforce the same length limit as the non-streaming endpoint
+                            remaining = self.max_response_length - response_length
+                            if len(token) > remaining:
+                                token = token[:remaining]
+                                response_truncated = True
+                            response_length += len(token)
+                            if token:
+                                response_parts.append(token)
+                                yield {"type": "token", "content": token}
+                        if data.get("done") or response_truncated:
+                            break
+    
+        except httpx.TimeoutException:
+            logger.error(f"AI stream timeout: {time.time() - start_time}s")
+            yield {"type": "error", "error": f"AI request timed out after {self.timeout} seconds. Please try again with a shorter document or different requirements."}
+            return
+        except LLMQueueFullError as e:
+            yield {"type": "error", "error": "AI service is busy. Please try again in a moment.", "retry_after": e.retry_after}
+            return
+        except CircuitOpenError:
+            yield {"type": "error", "error": "AI service is currently unavailable. Please try again later."}
+            return
+        except httpx.ConnectError:
+            logger.error("Ollama connection error")
+            yield {"type": "error", "error": "Cannot connect to AI service. Please check if the service is running."}
+            return
+        except Exception as e:
+            logger.error(f"AI stream error: {e}")
+            yield {"type": "error", "error": f"Unexpected error during AI processing: {str(e)}"}
+            return
+        
+        if response_truncated:
+            response_parts.append("\n\n[Response truncated due to length limit]")
+            yield {"type": "token", "content": response_parts[-1]}
+        
+        if not response_length:
+            yield {"type": "error", "error": "AI service returned an empty response. Please try again."}
+            return
+        
+        processing_time = time.time() - start_time
+        ai_config.log_ai_usage(
+            user_id=user_id,
+            document_type=document_type,
+            prompt_used=full_prompt,
+            response_length=response_length,
+            processing_time=processing_time
+        )
+        
+        metadata = {
+            "model_used": model_to_use,
+            "processing_time": processing_time,
+            "queue_time": round(queue_seconds, 3),
+            "first_token_time": round(first_token_time, 3) if first_token_time is not None else None,
+            "response_length": response_length,
+            "response_truncated": response_truncated,
+            "cache_hit": False,
+            "cache_key": cache_key
+        }
+        self.cache.store(cache_key, "".join(response_parts), dict(metadata))
+        yield {"type": "done", "metadata": metadata}
+    
+    async def _stream_long_document(
+        self,
+        user_id: int,
+        document_type: str,
+        document_content: str,
+        prompt_template: str,
+        user_input: str,
+        model: str,
+        regenerate: bool,
+        start_time: float
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream events for _run_long_document"""
+        full_prompt = prompt_template.replace("[configurable_item]", user_input)
+        yield {
+            "type": "start",
+            "model_used": model,
+            "content_truncated": False,
+            "long_document": True,
+            "prompt_used": full_prompt if self.settings.get("show_prompt", True) else None
+        }
+        try:
+            async for event in self._run_long_document(
+                user_id, document_type, document_content, prompt_template, user_input,
+                model, regenerate, start_time
+            ):
+                if event["type"] == "progress":
+                    yield event
+                elif event["success"]:
+                    yield {"type": "token", "content": event["response"]}
+                    yield {"type": "done", "metadata": event["metadata"]}
+                else:
+                    yield {"type": "error", "error": event["response"]}
+        except httpx.TimeoutException:
+            logger.error(f"AI long document timeout: {time.time() - start_time}s")
+            yield {"type": "error", "error": f"AI request timed out after {self.timeout} seconds. Please try again with a shorter document or different requirements."}
+        except LLMQueueFullError as e:
+            yield {"type": "error", "error": "AI service is busy. Please try again in a moment.", "retry_after": e.retry_after}
+        except CircuitOpenError:
+            yield {"type": "error", "error": "AI service is currently unavailable. Please try again later."}
+        except httpx.ConnectError:
+            logger.error("Ollama connection error")
+            yield {"type": "error", "error": "Cannot connect to AI service. Please check if the service is running."}
+        except Exception as e:
+            logger.error(f"AI long document error: {e}")
+            yield {"type": "error", "error": f"Unexpected error during AI processing: {str(e)}"}
+    
+    @staticmethod
+    def _cached_metadata(cached: Dict[str, Any], cache_key: str, processing_time: float) -> Dict[str, Any]:
+        """Metadata of a cached answer, with this request's timing"""
+        metadata = dict(cached["metadata"])
+        metadata.update({
+            "processing_time": processing_time,
+            "queue_time": 0.0,
+            "cache_hit": True,
+            "cache_key": cache_key,
+            "cached_at": cached["created_at"]
+        })
+        return metadata
+    
     async def get_model_info(self, model_name: str) -> Tuple[bool, Dict[str, Any], Optional[str]]:
         """Get information about a specific model"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/show",
-                    json={"name": model_name}
-                )
+            response = await self.pool.request(
+                "POST",
+                f"{self.base_url}/api/show",
+                timeout=30.0,
+                json={"name": model_name}
+            )
+            
+            if response.status_code == 200:
+                return True, response.json(), None
+            else:
+                error_msg = f"Model info error: HTTP {response.status_code}"
+                return False, {}, error_msg
                 
-                if response.status_code == 200:
-                    return True, response.json(), None
-                else:
-                    error_msg = f"Model info error: HTTP {response.status_code}"
-                    return False, {}, error_msg
-                    
         except Exception as e:
             error_msg = f"Error getting model info: {str(e)}"
             logger.error(error_msg)
             return False, {}, error_msg
     
-    def generate_response(self, prompt: str, max_tokens: int = None) -> Dict[str, Any]:
+    def generate_response(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        temperature: float = 0.7,
+        priority: str = "batch",
+        timeout: float = None
+    ) -> Dict[str, Any]:
         """
         Simplified synchronous method for generating responses
         Used by training system and other simple use cases
+        
+        Runs on the connection pool's background event loop, so it reuses
+        pooled connections and works from any thread. priority is the LLM
+        scheduler class: "batch" for user-triggered bulk work, "background" for
+        internal workers. timeout bounds the whole call including queueing;
+        the request is cancelled when it expires.
         """
         try:
-            # Use asyncio to run the async method
-            import asyncio
+            success, response, metadata = self.pool.run_sync(
+                self._simple_generate(prompt, max_tokens or self.max_response_length, temperature, priority),
+                timeout=timeout
+            )
             
-            # Create a simple prompt without document context
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                # Use a simplified version that doesn't require document context
-                success, response, metadata = loop.run_until_complete(
-                    self._simple_generate(prompt, max_tokens or self.max_response_length)
-                )
-                
-                if success:
-                    return {
-                        "success": True,
-                        "response": response,
-                        "metadata": metadata
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": response,
-                        "response": ""
-                    }
-            finally:
-                loop.close()
+            if success:
+                return {
+                    "success": True,
+                    "response": response,
+                    "metadata": metadata
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": response,
+                    "response": ""
+                }
                 
+        except LLMQueueFullError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "response": "",
+                "retry_after": e.retry_after
+            }
+        except concurrent.futures.TimeoutError:
+            return {
+                "success": False,
+                "error": f"AI request did not complete within {timeout} seconds",
+                "response": ""
+            }
+        except concurrent.futures.CancelledError:
+            return {
+                "success": False,
+                "error": "AI request was cancelled",
+                "response": ""
+            }
         except Exception as e:
             logger.error(f"Error in generate_response: {e}")
             return {
@@ -404,17 +881,14 @@ class AIService:
                 "response": ""
             }
     
-    async def _simple_generate(self, prompt: str, max_tokens: int) -> Tuple[bool, str, Dict[str, Any]]:
+    async def _simple_generate(
+        self, prompt: str, max_tokens: int, temperature: float = 0.7, priority: str = "batch"
+    ) -> Tuple[bool, str, Dict[str, Any]]:
         """Simple async generation without document context"""
         try:
             # Refresh settings
             self.refresh_settings()
             
-            # Check Ollama availability
-            is_healthy = await self.check_ollama_health()
-            if not is_healthy:
-                return False, "AI service is currently unavailable. Please try again later.", {}
-            
             # Prepare request payload
             payload = {
                 "model": self.default_model,
@@ -424,38 +898,44 @@ class AIService:
                 "stream": False,
                 "options": {
                     "num_predict": max_tokens,
-                    "temperature": 0.7,
+                    "temperature": temperature,
                     "top_p": 0.9
                 }
             }
             
             # Make API call to Ollama
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
+            async with llm_scheduler.async_slot(priority) as queue_seconds:
+                response = await self.pool.request(
+                    "POST",
                     f"{self.base_url}/api/chat",
+                    timeout=self.timeout,
                     json=payload
                 )
+            
+            if response.status_code == 200:
+                data = response.json()
+                ai_response = data.get("message", {}).get("content", "")
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_response = data.get("message", {}).get("content", "")
-                    
-                    if not ai_response.strip():
-                        return False, "AI service returned an empty response. Please try again.", {}
-                    
-                    # Truncate response if too long
-                    if len(ai_response) > max_tokens:
-                        ai_response = ai_response[:max_tokens] + "\n\n[Response truncated due to length limit]"
-                    
-                    return True, ai_response, {"model_used": self.default_model}
-                    
-                else:
-                    error_data = response.json() if response.headers.get('content-type') == 'application/json' else {}
-                    error_msg = error_data.get("error", f"HTTP {response.status_code}")
-                    return False, f"AI service error: {error_msg}", {}
-        
+                if not ai_response.strip():
+                    return False, "AI service returned an empty response. Please try again.", {}
+                
+                # Truncate response if too long
+                if len(ai_response) > max_tokens:
+                    ai_response = ai_response[:max_tokens] + "\n\n[Response truncated due to length limit]"
+                
+                return True, ai_response, {"model_used": self.default_model, "queue_time": round(queue_seconds, 3)}
+                
+            else:
+                error_data = response.json() if response.headers.get('content-type') == 'application/json' else {}
+                error_msg = error_data.get("error", f"HTTP {response.status_code}")
+                return False, f"AI service error: {error_msg}", {}
+    
         except httpx.TimeoutException:
             return False, f"AI request timed out after {self.timeout} seconds. Please try again.", {}
+        except LLMQueueFullError:
+            raise
+        except CircuitOpenError:
+            return False, "AI service is currently unavailable. Please try again later.", {}
         except httpx.ConnectError:
             return False, "Cannot connect to AI service. Please check if the service is running.", {}
         except Exception as e:
@@ -0,0 +1,199 @@
+# backend/app/answer_cache.py
+"""
+Answer Cache for Docsmait Knowledge Base chat
+
+Caches RAG answers so repeated questions skip retrieval and generation:
+- Keyed by (collection, normalized question, chat model)
+- Optional near-duplicate match on query-embedding cosine similarity (off by
+  default; never for identifier-style questions such as "What does REQ-042
+  require?", whose embeddings barely differ from other identifiers'), scored
+  against a NumPy matrix of the cached questions' unit vectors
+- Entries remember the collection's content version and are ignored once
+  documents are added to, removed from or reset in the collection
+"""
+import re
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .cache_utils import TTLCache
+from .config import config
+from .lexical_index import looks_like_identifier_query
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    return _TRAILING_PUNCTUATION.sub("", " ".join(question.lower().split()))
+
+
+def _unit_vector(vector: List[float]) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    if norm == 0:
+        return None
+    return array / norm
+
+
+class AnswerCache:
+    """Per-collection, version-checked cache of chat answers"""
+
+    def __init__(self):
+        self.cache = TTLCache(
+            config.KB_ANSWER_CACHE_SIZE,
+            config.KB_ANSWER_CACHE_TTL_SECONDS,
+            name="kb_answers"
+        )
+        self.similarity_threshold = config.KB_ANSWER_CACHE_SIMILARITY
+        self._lock = threading.Lock()
+        self._counters = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "stale": 0, "stores": 0}
+        # Question unit vectors per (collection key, model); stacked into a matrix on first use after a change
+        self._index_lock = threading.Lock()
+        self._vectors: Dict[Tuple, Dict[Hashable, np.ndarray]] = {}
+        self._matrices: Dict[Tuple, Tuple[List[Hashable], np.ndarray]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return 0 < self.similarity_threshold <= 1
+
+    def lookup(self, collection_key: Tuple[str, str], question: str, model: str, version: int,
+               query_embedding: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for the current collection version
+
+        collection_key is (collection id, collection name) so a collection that is
+        deleted and re-created under the same name never sees old answers.
+        Returns the cached entry plus "match" ("exact"/"semantic") and "similarity".
+        """
+        if not self.enabled:
+            return None
+        self._count("lookups")
+
+        key = (collection_key, normalize_question(question), model)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry["version"] == version:
+                self._count("exact_hits")
+                return dict(entry, match="exact", similarity=1.0)
+            self.cache.pop(key)
+            self._count("stale")
+
+        if query_embedding is None:
+            return None
+        return self.lookup_similar(collection_key, question, model, version, query_embedding)
+
+    def wants_embedding(self, question: str) -> bool:
+        """Whether a near-duplicate lookup for this question would use its embedding"""
+        return self.enabled and self.semantic_enabled and not looks_like_identifier_query(question)
+
+    def lookup_similar(self, collection_key: Tuple[str, str], question: str, model: str, version: int,
+                       query_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Near-duplicate half of lookup() for callers that embed the question only
+        after an exact-key miss; not counted as a separate lookup
+        """
+        if not self.wants_embedding(question):
+            return None
+        query_unit = _unit_vector(query_embedding)
+        if query_unit is None:
+            return None
+
+        group = (collection_key, model)
+        keys, matrix = self._group_matrix(group)
+        if not keys or matrix.shape[1] != query_unit.shape[0]:
+            return None
+        similarities = matrix @ query_unit
+        for row in np.argsort(-similarities):
+            similarity = float(similarities[row])
+            if similarity < self.similarity_threshold:
+                break
+            candidate = self.cache.peek(keys[row])
+            if candidate is None:
+                self._forget(group, keys[row])  # Evicted or expired since it was indexed
+                continue
+            if candidate["version"] != version:
+                continue
+            self.cache.get(keys[row])  # Refresh its LRU position
+            self._count("semantic_hits")
+            return dict(candidate, match="semantic", similarity=round(similarity, 4))
+        return None
+
+    def store(self, collection_key: Tuple[str, str], question: str, model: str, version: int,
+              query_embedding: Optional[List[float]], response: str, sources: List[Dict[str, Any]]) -> None:
+        """Cache an answer generated against the given collection version"""
+        if not self.enabled:
+            return
+        key = (collection_key, normalize_question(question), model)
+        self.cache.put(key, {
+            "version": version,
+            "response": response,
+            "sources": sources,
+            "created_at": time.time()
+        })
+        self._count("stores")
+
+        query_unit = _unit_vector(query_embedding) if self.semantic_enabled and query_embedding else None
+        if query_unit is None or looks_like_identifier_query(question):
+            return
+        group = (collection_key, model)
+        with self._index_lock:
+            vectors = self._vectors.setdefault(group, {})
+            vectors[key] = query_unit
+            self._matrices.pop(group, None)
+            # Keys evicted from the cache linger here until pruned
+            indexed = list(vectors) if len(vectors) > self.cache.max_entries else []
+        for indexed_key in indexed:
+            if self.cache.peek(indexed_key) is None:
+                self._forget(group, indexed_key)
+
+    def invalidate_collection(self, collection_name: str) -> None:
+        """Drop all answers for a collection (used when it is deleted)"""
+        for key, _ in self.cache.items():
+            if key[0][1] == collection_name:
+                self.cache.pop(key)
+        with self._index_lock:
+            for group in [group for group in self._vectors if group[0][1] == collection_name]:
+                del self._vectors[group]
+                self._matrices.pop(group, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.cache.get_stats()
+        with self._lock:
+            stats.update(self._counters)
+        # Count semantic matches as hits too, not just exact key matches
+        answered = stats["exact_hits"] + stats["semantic_hits"]
+        stats["answer_hit_rate"] = round(answered / stats["lookups"], 3) if stats["lookups"] else 0.0
+        stats["similarity_threshold"] = self.similarity_threshold
+        return stats
+
+    def _group_matrix(self, group: Tuple) -> Tuple[List[Hashable], np.ndarray]:
+        """Cached keys and stacked unit vectors of one (collection key, model) group"""
+        with self._index_lock:
+            stacked = self._matrices.get(group)
+            if stacked is None:
+                vectors = self._vectors.get(group, {})
+                keys = list(vectors)
+                matrix = np.stack([vectors[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+                stacked = self._matrices[group] = (keys, matrix)
+            return stacked
+
+    def _forget(self, group: Tuple, key: Hashable):
+        with self._index_lock:
+            vectors = self._vectors.get(group)
+            if vectors and vectors.pop(key, None) is not None:
+                self._matrices.pop(group, None)
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+
+# Create global answer cache instance
+answer_cache = AnswerCache()
@@ -0,0 +1,85 @@
+# backend/app/assist_cache.py
+"""
+Assist Cache for Docsmait AI document assistance
+
+Caches /ai/assist answers so clicking "assist" again on an unchanged document
+with the same requirements skips the LLM:
+- Keyed by (model, resolved prompt template, hash of the truncated document
+  content, user input, generation options)
+- TTL and LRU size bound (TTLCache)
+- The key is returned to clients as metadata["cache_key"]; poorly rated
+  feedback on that key evicts the answer
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .cache_utils import TTLCache
+from .config import config
+
+
+def assist_cache_key(model: str, prompt_template: str, truncated_content: str,
+                     user_input: str, options: Dict[str, Any]) -> str:
+    """Stable key for one assistance request"""
+    content_hash = hashlib.sha256(truncated_content.encode("utf-8")).hexdigest()
+    material = json.dumps([model, prompt_template, content_hash, user_input, options], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+
+class AssistCache:
+    """TTL/LRU cache of AI assistance responses"""
+
+    def __init__(self):
+        self.cache = TTLCache(
+            config.AI_ASSIST_CACHE_SIZE,
+            config.AI_ASSIST_CACHE_TTL_SECONDS,
+            name="ai_assist"
+        )
+        self.evict_rating = config.AI_ASSIST_CACHE_EVICT_RATING
+        self._lock = threading.Lock()
+        self._counters = {"bypassed": 0, "stores": 0, "feedback_evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached {"response", "metadata", "created_at"} entry, or None"""
+        if not self.enabled:
+            return None
+        return self.cache.get(key)
+
+    def store(self, key: str, response: str, metadata: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self.cache.put(key, {"response": response, "metadata": metadata, "created_at": time.time()})
+        self._count("stores")
+
+    def record_bypass(self) -> None:
+        self._count("bypassed")
+
+    def evict_for_feedback(self, key: Optional[str], rating: int) -> bool:
+        """Drop a cached answer that received a poor rating; returns whether one was dropped"""
+        if not key or rating > self.evict_rating:
+            return False
+        if self.cache.pop(key) is None:
+            return False
+        self._count("feedback_evictions")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.cache.get_stats()
+        with self._lock:
+            stats.update(self._counters)
+        stats["evict_rating"] = self.evict_rating
+        return stats
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+
+# Create global assist cache instance
+assist_cache = AssistCache()
@@ -361,11 +361,16 @@ class AutomatedReviewService:
             """
             
             # Get AI analysis
-            ai_response = ai_service.generate_response(
+            result = ai_service.generate_response(
                 prompt=prompt,
                 max_tokens=1000,
-                temperature=0.3
+                temperature=0.3,
+                priority="batch"
             )
+            if not result.get("success"):
+                print(f"AI suggestions unavailable: {result.get('error')}")
+                return []
+            ai_response = result["response"]
             
             # Parse AI response
             try:
@@ -0,0 +1,308 @@
+# backend/app/bulk_ingest_service.py
+"""
+Bulk Ingestion Service for Docsmait
+
+Loads many files into a Knowledge Base collection in one run:
+- Sources: zip/tar archives or a server-side directory (recursive)
+- Text extraction (PyPDF2 / python-docx) runs across a process pool sized to
+  the available cores, so parsing is not bound to one interpreter
+- Extracted chunks feed the shared embedding stage and bulk Qdrant writer
+- Per-file summary of chunks, timings and failures
+- Resumable: files completed by an earlier run of the same job are skipped
+- Cancellable between files and chunk windows; a cancelled run removes every
+  document it wrote
+"""
+import logging
+import multiprocessing
+import os
+import tarfile
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import config
+from .database_config import get_db
+from .db_models import KBDocument
+from .ingestion_job_service import IngestionCancelled
+from .text_extraction import extract_file_chunks
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+    ".md": "text/markdown"
+}
+
+
+class BulkIngestService:
+    """Process-pool extraction feeding the shared KB embedding/upsert stage"""
+
+    def __init__(self):
+        self.extract_workers = config.KB_BULK_EXTRACT_WORKERS or os.cpu_count() or 1
+        self.import_root = os.path.realpath(config.KB_BULK_IMPORT_ROOT)
+
+    # ========== Sources ==========
+
+    def resolve_directory(self, directory: str) -> Tuple[Optional[str], Optional[str]]:
+        """Validate a server-side directory; returns (real path, error)"""
+        real_path = os.path.realpath(directory)
+        if os.path.commonpath([real_path, self.import_root]) != self.import_root:
+            return None, f"Directory must be inside {self.import_root}"
+        if not os.path.isdir(real_path):
+            return None, f"Directory '{directory}' not found"
+        return real_path, None
+
+    def ingest_archive(self, archive_path: str, collection_name: str, chunk_size: int = None,
+                       progress_callback: Optional[Callable[[int, int], None]] = None,
+                       run_id: str = None, cancel_check: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Unpack a zip/tar archive to a temporary directory and ingest its files"""
+        os.makedirs(config.KB_INGEST_STAGING_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=config.KB_INGEST_STAGING_DIR) as extract_dir:
+            try:
+                self._unpack_archive(archive_path, extract_dir)
+            except Exception as e:
+                return {"success": False, "error": f"Failed to unpack archive: {str(e)}"}
+            return self.ingest_directory(extract_dir, collection_name, chunk_size, progress_callback, run_id, cancel_check)
+
+    def ingest_directory(self, directory: str, collection_name: str, chunk_size: int = None,
+                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                         run_id: str = None, cancel_check: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        Ingest all supported files below a directory
+
+        cancel_check is polled between files; when it returns True (or the
+        progress callback raises IngestionCancelled) the run stops, deletes every
+        document of this run and re-raises IngestionCancelled.
+        """
+        from .kb_service_pg import kb_service
+
+        start_time = time.time()
+        files = self._collect_files(directory)
+        if not files:
+            return {"success": False, "error": "No supported files found (.pdf, .docx, .txt, .md)"}
+
+        # Deterministic document ids let a retried job skip files it already completed
+        run_id = run_id or str(uuid.uuid4())
+        document_ids = {
+            relative_path: str(uuid.uuid5(uuid.NAMESPACE_URL, f"docsmait:bulk:{run_id}:{relative_path}"))
+            for relative_path, _ in files
+        }
+        completed_ids = self._completed_document_ids(list(document_ids.values()))
+
+        summaries: List[Dict[str, Any]] = []
+        pending = []
+        for relative_path, path in files:
+            if document_ids[relative_path] in completed_ids:
+                summaries.append({
+                    "filename": relative_path,
+                    "success": True,
+                    "skipped": True,
+                    "document_id": document_ids[relative_path],
+                    "message": "Already ingested by an earlier run"
+                })
+            else:
+                pending.append((relative_path, path))
+
+        print(f"Bulk ingest into '{collection_name}': {len(pending)} files to process "
+              f"({len(files) - len(pending)} already done), {self.extract_workers} extraction workers")
+
+        progress = {"chunks_done": 0, "files_done": 0}
+        total_files = len(pending)
+
+        def report(extra_chunks: int = 0):
+            if not progress_callback:
+                return
+            done = progress["chunks_done"] + extra_chunks
+            # Estimate remaining work from the average chunks per finished file
+            files_done = max(progress["files_done"], 1)
+            estimated_total = max(done, round(progress["chunks_done"] / files_done * total_files))
+            progress_callback(done, estimated_total)
+
+        def check_cancelled():
+            if cancel_check and cancel_check():
+                raise IngestionCancelled(f"Bulk ingestion into '{collection_name}' was cancelled")
+
+        current_document_id = None
+        executor = ProcessPoolExecutor(
+            max_workers=self.extract_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        try:
+            queue = list(reversed(pending))
+            in_flight = {}
+            max_in_flight = self.extract_workers * 2  # Bound memory held by extracted chunks
+
+            while queue or in_flight:
+                check_cancelled()
+                while queue and len(in_flight) < max_in_flight:
+                    relative_path, path = queue.pop()
+                    extension = os.path.splitext(path)[1].lower()
+                    future = executor.submit(
+                        extract_file_chunks, path, os.path.basename(path),
+                        SUPPORTED_CONTENT_TYPES.get(extension), chunk_size
+                    )
+                    in_flight[future] = relative_path
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    check_cancelled()
+                    relative_path = in_flight.pop(future)
+                    current_document_id = document_ids[relative_path]
+                    summary = self._ingest_extracted(
+                        kb_service, future, relative_path, collection_name, current_document_id,
+                        lambda chunks_done, _total: report(chunks_done)
+                    )
+                    summaries.append(summary)
+                    progress["files_done"] += 1
+                    progress["chunks_done"] += summary.get("chunks", 0)
+                    if summary["success"]:
+                        current_document_id = None
+                    report()
+
+        except IngestionCancelled:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._discard_documents(kb_service, list(document_ids.values()))
+            raise
+        except BaseException:
+            # Crashed: stop extraction and drop the half-written document
+            executor.shutdown(wait=False, cancel_futures=True)
+            if current_document_id:
+                kb_service.delete_document(current_document_id)
+            raise
+        else:
+            executor.shutdown(wait=True)
+
+        failed = [summary for summary in summaries if not summary["success"]]
+        processing_time = time.time() - start_time
+        result = {
+            "success": not failed,
+            "files_total": len(files),
+            "files_succeeded": len(summaries) - len(failed),
+            "files_failed": len(failed),
+            "files_skipped": len(files) - len(pending),
+            "chunks_created": sum(summary.get("chunks", 0) for summary in summaries),
+            "processing_time": round(processing_time, 2),
+            "files": sorted(summaries, key=lambda summary: summary["filename"])
+        }
+        if failed:
+            result["error"] = f"{len(failed)} of {len(files)} files failed"
+        print(f"Bulk ingest into '{collection_name}' finished: {result['files_succeeded']} succeeded, "
+              f"{result['files_failed']} failed, {result['chunks_created']} chunks in {processing_time:.2f}s")
+        return result
+
+    def _ingest_extracted(self, kb_service, future, relative_path: str, collection_name: str,
+                          document_id: str, progress_callback: Callable[[int, int], None]) -> Dict[str, Any]:
+        """Feed one file's extracted chunks into the embedding stage"""
+        try:
+            extracted = future.result()
+        except Exception as e:
+            extracted = {"success": False, "error": f"Extraction worker failed: {str(e)}", "extract_seconds": None}
+
+        summary = {
+            "filename": relative_path,
+            "success": False,
+            "document_id": document_id,
+            "chunks": 0,
+            "extract_seconds": extracted.get("extract_seconds")
+        }
+        if not extracted.get("success"):
+            summary["error"] = extracted.get("error")
+            return summary
+
+        extension = os.path.splitext(relative_path)[1].lower()
+        ingest_start = time.time()
+        result = kb_service.add_chunks_to_collection(
+            collection_name, extracted["chunks"], os.path.basename(relative_path),
+            SUPPORTED_CONTENT_TYPES.get(extension), extracted["size_bytes"],
+            progress_callback=progress_callback, document_id=document_id
+        )
+        summary["ingest_seconds"] = round(time.time() - ingest_start, 3)
+        summary["success"] = bool(result.get("success"))
+        summary["chunks"] = result.get("chunks_created", 0) if result.get("success") else 0
+        if not result.get("success"):
+            summary["error"] = result.get("error")
+        return summary
+
+    def _collect_files(self, directory: str) -> List[Tuple[str, str]]:
+        """Return (relative path, absolute path) for supported files, in a stable order"""
+        files = []
+        for root, dirs, filenames in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.startswith(".") or os.path.splitext(filename)[1].lower() not in SUPPORTED_CONTENT_TYPES:
+                    continue
+                path = os.path.join(root, filename)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    files.append((os.path.relpath(path, directory), path))
+        return files
+
+    def _unpack_archive(self, archive_path: str, extract_dir: str):
+        """Extract regular files from a zip/tar archive, refusing paths outside extract_dir"""
+        root = os.path.realpath(extract_dir)
+
+        def safe_target(name: str) -> str:
+            target = os.path.realpath(os.path.join(root, name))
+            if os.path.commonpath([target, root]) != root:
+                raise ValueError(f"Archive member '{name}' escapes the extraction directory")
+            return target
+
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as archive:
+                for member in archive.infolist():
+                    if member.is_dir():
+                        continue
+                    target = safe_target(member.filename)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with archive.open(member) as source, open(target, "wb") as destination:
+                        while True:
+                            block = source.read(1024 * 1024)
+                            if not block:
+                                break
+                            destination.write(block)
+        elif tarfile.is_tarfile(archive_path):
+            with tarfile.open(archive_path) as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue  # Skip directories, links and devices
+                    target = safe_target(member.name)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    source = archive.extractfile(member)
+                    with source, open(target, "wb") as destination:
+                        while True:
+                            block = source.read(1024 * 1024)
+                            if not block:
+                                break
+                            destination.write(block)
+        else:
+            raise ValueError("Unsupported archive format (expected zip or tar)")
+
+    def _completed_document_ids(self, document_ids: List[str]) -> set:
+        return self._existing_document_ids(document_ids, status="completed")
+
+    def _existing_document_ids(self, document_ids: List[str], status: Optional[str] = None) -> set:
+        db = next(get_db())
+        try:
+            query = db.query(KBDocument.id).filter(KBDocument.id.in_(document_ids))
+            if status:
+                query = query.filter(KBDocument.status == status)
+            return {row.id for row in query.all()}
+        finally:
+            db.close()
+
+    def _discard_documents(self, kb_service, document_ids: List[str]):
+        """Delete the vectors and KB documents written by a cancelled run (including earlier runs of the job)"""
+        existing = self._existing_document_ids(document_ids)
+        for document_id in existing:
+            result = kb_service.delete_document(document_id)
+            if not result.get("success"):
+                logger.warning(f"Failed to discard bulk document {document_id}: {result.get('error')}")
+        print(f"Bulk ingest cancelled: discarded {len(existing)} documents")
+
+
+# Create global bulk ingest service instance
+bulk_ingest_service = BulkIngestService()
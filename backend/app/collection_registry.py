@@ -0,0 +1,181 @@
+# backend/app/collection_registry.py
+"""
+Collection Registry for Docsmait Knowledge Base
+
+In-process cache of KB collection metadata used on every search, chat and
+ingest:
+- All collections plus the configured default collection, loaded in one session
+- Write-through invalidation: collection writes call collections_changed()
+- Cross-process invalidation via PostgreSQL LISTEN/NOTIFY, so every backend
+  worker reloads after a change made by another worker
+- TTL safety net in case a notification is missed while reconnecting
+"""
+import logging
+import select
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import psycopg2
+from sqlalchemy import text
+
+from .config import config
+from .database_config import DATABASE_URL, get_db
+from .db_models import KBCollection, KBConfig
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "kb_collections_changed"
+MISS_RELOAD_INTERVAL_SECONDS = 1.0  # Unknown names re-check the database at most this often
+
+
+class CollectionRegistry:
+    """Cached view of kb_collections and the default collection setting"""
+
+    def __init__(self):
+        self.ttl_seconds = config.KB_COLLECTION_REGISTRY_TTL_SECONDS
+        self.origin = uuid.uuid4().hex  # Identifies this process's own notifications
+        self._lock = threading.Lock()
+        self._collections: Optional[Dict[str, Dict[str, Any]]] = None
+        self._default_name: Optional[str] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._listener: Optional[threading.Thread] = None
+        self._counters = {"hits": 0, "loads": 0, "local_invalidations": 0, "remote_invalidations": 0}
+
+    # ========== Reads ==========
+
+    def get(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a collection (id, name, is_default, content_version) or None"""
+        collections, _ = self._snapshot()
+        collection = collections.get(collection_name)
+        if collection is None:
+            # May have just been created by another worker whose notification is in flight
+            with self._lock:
+                stale = time.monotonic() - self._loaded_at >= MISS_RELOAD_INTERVAL_SECONDS
+                generation = self._generation
+            if stale:
+                collections, _ = self._load(generation)
+                collection = collections.get(collection_name)
+        return collection
+
+    def exists(self, collection_name: str) -> bool:
+        return self.get(collection_name) is not None
+
+    def default_name(self) -> str:
+        _, default_name = self._snapshot()
+        return default_name
+
+    def _snapshot(self):
+        with self._lock:
+            fresh = self._collections is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+            if fresh:
+                self._counters["hits"] += 1
+                return self._collections, self._default_name
+            generation = self._generation
+        self._ensure_listener()
+        return self._load(generation)
+
+    def _load(self, generation: int):
+        db = next(get_db())
+        try:
+            collections = {
+                row.name: {
+                    "id": row.id,
+                    "name": row.name,
+                    "is_default": bool(row.is_default),
+                    "content_version": row.content_version or 0
+                }
+                for row in db.query(
+                    KBCollection.id, KBCollection.name, KBCollection.is_default, KBCollection.content_version
+                ).all()
+            }
+            default_row = db.query(KBConfig.value).filter(KBConfig.key == "default_collection").first()
+            default_name = (default_row.value if default_row else None) or config.DEFAULT_COLLECTION_NAME
+        finally:
+            db.close()
+
+        with self._lock:
+            # Keep the result only if nothing was invalidated while loading
+            if generation == self._generation:
+                self._collections = collections
+                self._default_name = default_name
+                self._loaded_at = time.monotonic()
+            self._counters["loads"] += 1
+        return collections, default_name
+
+    # ========== Invalidation ==========
+
+    def collections_changed(self) -> None:
+        """Call after committing a collection write: drop the local cache and tell other workers"""
+        self._invalidate("local_invalidations")
+        db = next(get_db())
+        try:
+            db.execute(text("SELECT pg_notify(:channel, :origin)"), {"channel": NOTIFY_CHANNEL, "origin": self.origin})
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to publish collection change notification: {e}")
+        finally:
+            db.close()
+
+    def _invalidate(self, counter: str) -> None:
+        with self._lock:
+            self._collections = None
+            self._generation += 1
+            self._counters[counter] += 1
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="kb-collection-registry", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self) -> None:
+        """Reload on notifications from other processes; reconnects with backoff"""
+        backoff = 1
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(DATABASE_URL.replace("postgresql+psycopg2://", "postgresql://"))
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Changes may have been missed while disconnected
+                self._invalidate("remote_invalidations")
+                backoff = 1
+                while True:
+                    if select.select([connection], [], [], 60) == ([], [], []):
+                        continue
+                    connection.poll()
+                    remote = [notify for notify in connection.notifies if notify.payload != self.origin]
+                    connection.notifies.clear()
+                    if remote:
+                        self._invalidate("remote_invalidations")
+            except Exception as e:
+                logger.warning(f"Collection registry listener disconnected, retrying in {backoff}s: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["collections"] = len(self._collections) if self._collections is not None else None
+        stats["listening"] = self._listener is not None and self._listener.is_alive()
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+# Create global collection registry instance
+collection_registry = CollectionRegistry()
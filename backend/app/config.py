@@ -64,10 +64,24 @@ class Config:
     GENERAL_PURPOSE_LLM: str = os.getenv("GENERAL_PURPOSE_LLM", "qwen2:7b")
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "nomic-embed-text:latest")
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
+    OLLAMA_MAX_CONNECTIONS: int = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10"))  # Shared AI client pool
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "5"))
+    OLLAMA_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    OLLAMA_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("OLLAMA_BREAKER_FAILURE_THRESHOLD", "3"))  # Consecutive failures that open the circuit
+    OLLAMA_BREAKER_RESET_SECONDS: float = float(os.getenv("OLLAMA_BREAKER_RESET_SECONDS", "30"))  # Open time before a trial call
+    # LLM scheduler: concurrent calls per Ollama model (match the ollama service's OLLAMA_NUM_PARALLEL)
+    OLLAMA_NUM_PARALLEL: int = int(os.getenv("OLLAMA_NUM_PARALLEL", "2"))
+    LLM_SCHEDULER_RESERVED_INTERACTIVE_SLOTS: int = int(os.getenv("LLM_SCHEDULER_RESERVED_INTERACTIVE_SLOTS", "1"))  # Kept free of batch/background work
+    LLM_SCHEDULER_INTERACTIVE_QUEUE_LIMIT: int = int(os.getenv("LLM_SCHEDULER_INTERACTIVE_QUEUE_LIMIT", "20"))  # Waiting calls before 429 (0 = unbounded)
+    LLM_SCHEDULER_BATCH_QUEUE_LIMIT: int = int(os.getenv("LLM_SCHEDULER_BATCH_QUEUE_LIMIT", "10"))
+    LLM_SCHEDULER_BACKGROUND_QUEUE_LIMIT: int = int(os.getenv("LLM_SCHEDULER_BACKGROUND_QUEUE_LIMIT", "0"))  # Internal workers wait instead
     
     # === Vector Database Configuration ===
-    VECTOR_DB: str = os.getenv("VECTOR_DB", "qdrant")
+    VECTOR_DB: str = os.getenv("VECTOR_DB", "qdrant")  # qdrant, or embedded (no Qdrant container)
     QDRANT_URL: str = os.getenv("QDRANT_URL", "http://qdrant:6333")
+    VECTOR_STORE_PATH: str = os.getenv("VECTOR_STORE_PATH", "/app/data/vector_store")  # Embedded store files
+    KB_VECTOR_QUANTIZATION: str = os.getenv("KB_VECTOR_QUANTIZATION", "none")  # Default for new collections: none, scalar (int8), binary
+    KB_QUANTIZATION_OVERSAMPLING: float = float(os.getenv("KB_QUANTIZATION_OVERSAMPLING", "3.0"))  # Candidates rescored per result
     
     # === Knowledge Base Configuration ===
     DEFAULT_CHUNK_SIZE: int = int(os.getenv("DEFAULT_CHUNK_SIZE", "1000"))
@@ -84,6 +98,24 @@ class Config:
     # === Vector Embedding Configuration ===
     EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "768"))
     DEFAULT_EMBEDDING_MODEL: str = os.getenv("DEFAULT_EMBEDDING_MODEL", "nomic-embed-text")
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "ollama")  # ollama, or onnx (in-process CPU inference)
+    EMBEDDING_ONNX_MODEL_PATH: str = os.getenv("EMBEDDING_ONNX_MODEL_PATH", "/app/models/nomic-embed-text")  # model.onnx + tokenizer.json
+    EMBEDDING_ONNX_MODEL_ID: str = os.getenv("EMBEDDING_ONNX_MODEL_ID", "")  # Vector space id; defaults to DEFAULT_EMBEDDING_MODEL
+    EMBEDDING_ONNX_THREADS: int = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))  # 0 = all available cores
+    EMBEDDING_ONNX_MAX_TOKENS: int = int(os.getenv("EMBEDDING_ONNX_MAX_TOKENS", "2048"))
+    EMBEDDING_ONNX_MICRO_BATCH_SIZE: int = int(os.getenv("EMBEDDING_ONNX_MICRO_BATCH_SIZE", "16"))
+    EMBEDDING_ONNX_POOLING: str = os.getenv("EMBEDDING_ONNX_POOLING", "mean")  # mean or cls
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_MAX_CONCURRENT_BATCHES: int = int(os.getenv("EMBEDDING_MAX_CONCURRENT_BATCHES", "2"))
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+    EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+    EMBEDDING_CACHE_EVICTION_CHECK_INTERVAL: int = int(os.getenv("EMBEDDING_CACHE_EVICTION_CHECK_INTERVAL", "1000"))
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2000"))  # In-process query embedding memo (0 disables)
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+    KB_ANSWER_CACHE_SIZE: int = int(os.getenv("KB_ANSWER_CACHE_SIZE", "500"))  # Cached /kb/chat answers (0 disables)
+    KB_ANSWER_CACHE_TTL_SECONDS: int = int(os.getenv("KB_ANSWER_CACHE_TTL_SECONDS", "86400"))
+    KB_ANSWER_CACHE_SIMILARITY: float = float(os.getenv("KB_ANSWER_CACHE_SIMILARITY", "0"))  # Near-duplicate match threshold (0 = exact only)
     
     # === LLM Configuration ===
     DEFAULT_CHAT_MODEL: str = os.getenv("DEFAULT_CHAT_MODEL", "qwen2:1.5b")
@@ -91,6 +123,13 @@ class Config:
     MAX_RESPONSE_LENGTH: int = int(os.getenv("MAX_RESPONSE_LENGTH", "2000"))
     AI_CONTEXT_WINDOW: int = int(os.getenv("AI_CONTEXT_WINDOW", "4000"))
     SHOW_PROMPT: bool = os.getenv("SHOW_PROMPT", "true").lower() == "true"
+    AI_ASSIST_CACHE_SIZE: int = int(os.getenv("AI_ASSIST_CACHE_SIZE", "200"))  # Cached /ai/assist responses (0 disables)
+    AI_ASSIST_CACHE_TTL_SECONDS: int = int(os.getenv("AI_ASSIST_CACHE_TTL_SECONDS", "3600"))
+    AI_ASSIST_CACHE_EVICT_RATING: int = int(os.getenv("AI_ASSIST_CACHE_EVICT_RATING", "2"))  # Feedback at or below this evicts the answer
+    AI_LONG_DOCUMENT_AUTO: bool = os.getenv("AI_LONG_DOCUMENT_AUTO", "true").lower() == "true"  # Map-reduce documents beyond AI_CONTEXT_WINDOW instead of truncating
+    AI_LONG_DOCUMENT_MAX_SECTIONS: int = int(os.getenv("AI_LONG_DOCUMENT_MAX_SECTIONS", "16"))  # Sections analyzed per request; the rest are omitted
+    AI_SECTION_CACHE_SIZE: int = int(os.getenv("AI_SECTION_CACHE_SIZE", "1000"))  # Cached per-section analyses (0 disables)
+    AI_SECTION_CACHE_TTL_SECONDS: int = int(os.getenv("AI_SECTION_CACHE_TTL_SECONDS", "86400"))
     AVAILABLE_MODELS: list = [
         os.getenv("MODEL_1", "qwen2:7b"),
         os.getenv("MODEL_2", "llama3:latest"),
@@ -101,6 +140,14 @@ class Config:
     
     # === RAG Configuration ===
     RAG_SIMILARITY_SEARCH_LIMIT: int = int(os.getenv("RAG_SIMILARITY_SEARCH_LIMIT", "5"))
+    KB_LEXICAL_INDEX_ENABLED: bool = os.getenv("KB_LEXICAL_INDEX_ENABLED", "true").lower() == "true"  # Postgres full-text index of chunks
+    KB_SEARCH_MODE: str = os.getenv("KB_SEARCH_MODE", "auto")  # vector, lexical, hybrid, auto (identifier queries go lexical)
+    KB_HYBRID_RRF_K: int = int(os.getenv("KB_HYBRID_RRF_K", "60"))  # Reciprocal rank fusion constant
+    KB_FANOUT_MAX_WORKERS: int = int(os.getenv("KB_FANOUT_MAX_WORKERS", "8"))  # Concurrent searches for multi-collection retrieval
+    KB_COLLECTION_REGISTRY_TTL_SECONDS: int = int(os.getenv("KB_COLLECTION_REGISTRY_TTL_SECONDS", "300"))  # Safety net for missed change notifications
+    KB_QUERY_LOG_QUEUE_SIZE: int = int(os.getenv("KB_QUERY_LOG_QUEUE_SIZE", "10000"))  # Buffered query log rows before dropping
+    KB_QUERY_LOG_BATCH_SIZE: int = int(os.getenv("KB_QUERY_LOG_BATCH_SIZE", "200"))
+    KB_QUERY_LOG_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("KB_QUERY_LOG_FLUSH_INTERVAL_SECONDS", "2"))
     RAG_MIN_CHUNK_LENGTH: int = int(os.getenv("RAG_MIN_CHUNK_LENGTH", "50"))
     
     # === Usage Tracking Configuration ===
@@ -121,6 +168,34 @@ class Config:
     KB_AI_MAX_TOKENS: int = int(os.getenv("KB_AI_MAX_TOKENS", "2000"))
     KB_OVERVIEW_QUERY_LIMIT: int = int(os.getenv("KB_OVERVIEW_QUERY_LIMIT", "20"))
     
+    # === KB Ingestion Jobs Configuration ===
+    KB_INGEST_WORKERS: int = int(os.getenv("KB_INGEST_WORKERS", "1"))
+    KB_INGEST_STAGING_DIR: str = os.getenv("KB_INGEST_STAGING_DIR", "/app/uploads/kb_ingest")
+    KB_INGEST_POLL_INTERVAL_SECONDS: float = float(os.getenv("KB_INGEST_POLL_INTERVAL_SECONDS", "2"))
+    KB_INGEST_PROGRESS_INTERVAL_SECONDS: float = float(os.getenv("KB_INGEST_PROGRESS_INTERVAL_SECONDS", "1"))
+    KB_INGEST_STALE_JOB_SECONDS: int = int(os.getenv("KB_INGEST_STALE_JOB_SECONDS", "600"))
+    KB_INGEST_WINDOW_CHUNKS: int = int(os.getenv("KB_INGEST_WINDOW_CHUNKS", "128"))  # Chunks embedded/upserted per window
+    KB_TEXT_SEGMENT_CHARS: int = int(os.getenv("KB_TEXT_SEGMENT_CHARS", "65536"))  # Text file read block size
+    KB_UPSERT_BATCH_SIZE: int = int(os.getenv("KB_UPSERT_BATCH_SIZE", "256"))  # Points per pipelined Qdrant upsert
+    KB_UPSERT_MAX_RETRIES: int = int(os.getenv("KB_UPSERT_MAX_RETRIES", "3"))
+    KB_BULK_EXTRACT_WORKERS: int = int(os.getenv("KB_BULK_EXTRACT_WORKERS", "0"))  # 0 = one per CPU core
+    KB_BULK_IMPORT_ROOT: str = os.getenv("KB_BULK_IMPORT_ROOT", "/app/kb_import")  # Server-side directories allowed for bulk ingest
+    KB_PDF_EXTRACT_WORKERS: int = int(os.getenv("KB_PDF_EXTRACT_WORKERS", "0"))  # 0 = one per CPU core
+    KB_PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("KB_PDF_PARALLEL_MIN_PAGES", "200"))  # Smaller PDFs are read sequentially
+    KB_PDF_PAGE_RANGE_SIZE: int = int(os.getenv("KB_PDF_PAGE_RANGE_SIZE", "50"))  # Pages per worker task
+    
+    # === Assessment Question Bank Configuration ===
+    KB_QUESTION_BANK_ENABLED: bool = os.getenv("KB_QUESTION_BANK_ENABLED", "true").lower() == "true"
+    KB_QUESTION_BANK_SIZE: int = int(os.getenv("KB_QUESTION_BANK_SIZE", "60"))  # Target questions per collection
+    KB_QUESTION_BANK_QUESTIONS_PER_PROMPT: int = int(os.getenv("KB_QUESTION_BANK_QUESTIONS_PER_PROMPT", "10"))
+    KB_QUESTION_BANK_CHUNKS_PER_PROMPT: int = int(os.getenv("KB_QUESTION_BANK_CHUNKS_PER_PROMPT", "4"))
+    KB_QUESTION_BANK_SCAN_CHUNKS: int = int(os.getenv("KB_QUESTION_BANK_SCAN_CHUNKS", "5000"))  # Chunks sampled from per generation
+    KB_QUESTION_BANK_POLL_INTERVAL_SECONDS: float = float(os.getenv("KB_QUESTION_BANK_POLL_INTERVAL_SECONDS", "30"))
+    KB_QUESTION_BANK_DEBOUNCE_SECONDS: int = int(os.getenv("KB_QUESTION_BANK_DEBOUNCE_SECONDS", "120"))  # Wait for ingestion bursts to settle
+    KB_QUESTION_BANK_RETRY_SECONDS: int = int(os.getenv("KB_QUESTION_BANK_RETRY_SECONDS", "900"))  # Retry failed generations after
+    KB_QUESTION_BANK_STALE_SECONDS: int = int(os.getenv("KB_QUESTION_BANK_STALE_SECONDS", "1800"))  # Reclaim generations of crashed workers
+    KB_QUESTION_BANK_RETIRED_RETENTION_HOURS: int = int(os.getenv("KB_QUESTION_BANK_RETIRED_RETENTION_HOURS", "24"))  # Replaced questions stay scorable
+    
     # === Activity Logging Configuration ===
     ACTIVITY_LOG_RETENTION_DAYS: int = int(os.getenv("ACTIVITY_LOG_RETENTION_DAYS", "365"))
     LOG_IP_ADDRESSES: bool = os.getenv("LOG_IP_ADDRESSES", "true").lower() == "true"
@@ -1,5 +1,6 @@
 # backend/app/db_models.py
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, BigInteger, ForeignKey, JSON, UniqueConstraint, Index, Numeric, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, BigInteger, ForeignKey, JSON, UniqueConstraint, Index, Numeric, LargeBinary, Computed, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database_config import Base
@@ -229,6 +230,10 @@ class KBCollection(Base):
     total_size_bytes = Column(BigInteger, default=0)
     tags = Column(Text)  # JSON string of tags
     is_default = Column(Boolean, default=False)
+    content_version = Column(Integer, default=0)  # Bumped whenever documents are added/removed (cache invalidation)
+    pending_document_count = Column(Integer, default=0)  # Documents still processing or failed (not in document_count)
+    last_document_at = Column(DateTime(timezone=True))  # Upload time of the most recently added document
+    vector_quantization = Column(String(20), default="none")  # none, scalar (int8) or binary embedding storage
     
     # Relationships
     documents = relationship("KBDocument", back_populates="collection")
@@ -244,6 +249,8 @@ class KBDocument(Base):
     chunk_count = Column(Integer)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     status = Column(String(50), default="processing")
+    source_id = Column(String(100), index=True)  # e.g. "document:<id>" for incrementally indexed content
+    chunks_flushed = Column(Integer, default=0)  # Resume checkpoint: chunks already written to Qdrant
     
     # Relationships
     collection = relationship("KBCollection", back_populates="documents")
@@ -259,6 +266,12 @@ class KBQuery(Base):
     query_date = Column(Date, server_default=func.current_date())
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+class KBQueryDailyCount(Base):
+    __tablename__ = "kb_query_daily_counts"
+    
+    query_date = Column(Date, primary_key=True)  # Same date as kb_queries.query_date
+    query_count = Column(BigInteger, nullable=False, default=0)
+
 class KBConfig(Base):
     __tablename__ = "kb_config"
     
@@ -277,6 +290,84 @@ class KBDocumentTag(Base):
     # Relationships
     document = relationship("KBDocument", back_populates="tags")
 
+class KBIngestionJob(Base):
+    __tablename__ = "kb_ingestion_jobs"
+    
+    id = Column(String(36), primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False)  # upload, text, bulk
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, completed, failed, cancelled
+    collection_name = Column(String(200), nullable=False)
+    filename = Column(String(500), nullable=False)
+    content_type = Column(String(100))
+    staged_path = Column(String(1000))  # Uploaded content staged on disk until processed
+    parameters = Column(Text)  # JSON string (chunk_size, metadata, ...)
+    submitted_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    chunks_done = Column(Integer, default=0)
+    chunks_total = Column(Integer)
+    result = Column(Text)  # JSON string of the ingestion result
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False)
+    worker_id = Column(String(100))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+
+class KBQuestionBank(Base):
+    __tablename__ = "kb_question_banks"
+    
+    collection_id = Column(String(36), ForeignKey("kb_collections.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, generating, ready, failed
+    content_version = Column(Integer)  # Collection content_version the active questions were generated from
+    question_count = Column(Integer, default=0)
+    error = Column(Text)
+    worker_id = Column(String(100))
+    generated_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class KBAssessmentQuestion(Base):
+    __tablename__ = "kb_assessment_questions"
+    
+    id = Column(String(36), primary_key=True, index=True)
+    collection_id = Column(String(36), ForeignKey("kb_collections.id", ondelete="CASCADE"), nullable=False)
+    question = Column(Text, nullable=False)
+    correct_answer = Column(Boolean, nullable=False)
+    content_version = Column(Integer, nullable=False)  # Collection content_version it was generated from
+    is_active = Column(Boolean, nullable=False, default=True)  # Retired questions stay scorable for a while
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    retired_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (Index('idx_assessment_questions_collection_active', 'collection_id', 'is_active'),)
+
+class KBEmbeddingCache(Base):
+    __tablename__ = "kb_embedding_cache"
+    
+    chunk_hash = Column(String(64), primary_key=True)  # sha256 of normalized chunk text
+    model = Column(String(200), primary_key=True)
+    embedding = Column(LargeBinary, nullable=False)  # float32 array bytes
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class KBChunk(Base):
+    __tablename__ = "kb_chunks"
+    
+    point_id = Column(String(36), primary_key=True)  # Qdrant point id of the chunk
+    collection_name = Column(String(100), nullable=False, index=True)
+    kb_document_id = Column(String(36), index=True)
+    filename = Column(String(255))
+    chunk_index = Column(Integer)
+    page_start = Column(Integer)
+    page_end = Column(Integer)
+    text = Column(Text, nullable=False)
+    search_vector = Column(TSVECTOR, Computed("to_tsvector('english', text)", persisted=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_kb_chunks_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
 # Audit Management Models
 class Audit(Base):
     __tablename__ = "audits"
@@ -569,16 +569,20 @@ class DocumentsService:
                 "created_by": document.get('created_by_username', 'Unknown')
             }
             
-            # Add to knowledge base
-            result = kb_service.add_text_to_collection(
+            # Re-index incrementally: only chunks changed since the last approved revision are embedded
+            result = kb_service.index_document_revision(
                 collection_name=collection_name,
+                source_id=f"document:{document['id']}",
                 text_content=content,
                 filename=filename,
-                metadata=metadata
+                metadata=metadata,
+                legacy_match={"document_id": document['id'], "review_id": None}
             )
             
             if result.get("success"):
-                print(f"✅ Document '{document['name']}' added to knowledge base collection '{collection_name}'")
+                print(f"✅ Document '{document['name']}' indexed in knowledge base collection '{collection_name}' "
+                      f"({result.get('chunks_added', 0)} added, {result.get('chunks_unchanged', 0)} unchanged, "
+                      f"{result.get('chunks_removed', 0)} removed chunks)")
             else:
                 print(f"❌ Failed to add document to KB: {result.get('error', 'Unknown error')}")
                 
@@ -0,0 +1,182 @@
+# backend/app/embedding_cache.py
+"""
+Embedding Cache for Docsmait
+
+Content-addressed, persistent cache of chunk embeddings:
+- Keyed by (sha256 of normalized chunk text, embedding model)
+- Stored in PostgreSQL as float32 bytes
+- LRU eviction bounded by entry count and total size
+- Hit/miss counters for monitoring
+"""
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from .config import config
+from .database_config import get_db
+from .db_models import KBEmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalize chunk text so whitespace/unicode variants share a cache key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def chunk_hash(text: str) -> str:
+    """sha256 hex digest of the normalized chunk text"""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent embedding cache with LRU/size-based eviction"""
+
+    def __init__(self):
+        self.enabled = config.EMBEDDING_CACHE_ENABLED
+        self.max_entries = config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.max_bytes = config.EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+        self.eviction_check_interval = config.EMBEDDING_CACHE_EVICTION_CHECK_INTERVAL
+        self._lock = threading.Lock()
+        self._writes_since_eviction_check = 0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    def get_many(self, hashes: Iterable[str], model: str) -> Dict[str, List[float]]:
+        """Look up embeddings for the given chunk hashes; returns {hash: embedding}"""
+        unique_hashes = list(dict.fromkeys(hashes))
+        if not self.enabled or not unique_hashes:
+            return {}
+
+        db = next(get_db())
+        try:
+            rows = db.query(KBEmbeddingCache.chunk_hash, KBEmbeddingCache.embedding).filter(
+                KBEmbeddingCache.model == model,
+                KBEmbeddingCache.chunk_hash.in_(unique_hashes)
+            ).all()
+            found = {row.chunk_hash: array("f", row.embedding).tolist() for row in rows}
+
+            # Touch hits so LRU eviction keeps recently used entries
+            if found:
+                db.query(KBEmbeddingCache).filter(
+                    KBEmbeddingCache.model == model,
+                    KBEmbeddingCache.chunk_hash.in_(list(found.keys()))
+                ).update({"last_accessed_at": datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+
+            with self._lock:
+                self._counters["hits"] += len(found)
+                self._counters["misses"] += len(unique_hashes) - len(found)
+            return found
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Embedding cache lookup failed: {e}")
+            with self._lock:
+                self._counters["errors"] += 1
+                self._counters["misses"] += len(unique_hashes)
+            return {}
+        finally:
+            db.close()
+
+    def put_many(self, entries: Dict[str, List[float]], model: str) -> None:
+        """Store embeddings keyed by chunk hash"""
+        if not self.enabled or not entries:
+            return
+
+        db = next(get_db())
+        try:
+            now = datetime.utcnow()
+            rows = []
+            for hash_value, embedding in entries.items():
+                data = array("f", embedding).tobytes()
+                rows.append({
+                    "chunk_hash": hash_value,
+                    "model": model,
+                    "embedding": data,
+                    "size_bytes": len(data),
+                    "last_accessed_at": now
+                })
+            db.execute(insert(KBEmbeddingCache).values(rows).on_conflict_do_nothing())
+            db.commit()
+
+            with self._lock:
+                self._counters["stores"] += len(rows)
+                self._writes_since_eviction_check += len(rows)
+                check_eviction = self._writes_since_eviction_check >= self.eviction_check_interval
+                if check_eviction:
+                    self._writes_since_eviction_check = 0
+
+            if check_eviction:
+                self.evict()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Embedding cache store failed: {e}")
+            with self._lock:
+                self._counters["errors"] += 1
+        finally:
+            db.close()
+
+    def evict(self) -> int:
+        """Evict least recently used entries until count and size limits hold"""
+        db = next(get_db())
+        try:
+            entry_count, total_bytes = db.query(
+                func.count(KBEmbeddingCache.chunk_hash),
+                func.coalesce(func.sum(KBEmbeddingCache.size_bytes), 0)
+            ).one()
+
+            excess_entries = max(0, entry_count - self.max_entries)
+            if total_bytes > self.max_bytes and entry_count:
+                # Entries are near-uniform in size, so convert the byte excess to a count
+                average_size = total_bytes / entry_count
+                excess_entries = max(excess_entries, int((total_bytes - self.max_bytes) / average_size) + 1)
+
+            if excess_entries == 0:
+                return 0
+
+            oldest = db.query(KBEmbeddingCache.chunk_hash, KBEmbeddingCache.model).order_by(
+                KBEmbeddingCache.last_accessed_at.asc()
+            ).limit(excess_entries).subquery()
+            evicted = db.query(KBEmbeddingCache).filter(
+                tuple_(KBEmbeddingCache.chunk_hash, KBEmbeddingCache.model).in_(
+                    db.query(oldest.c.chunk_hash, oldest.c.model)
+                )
+            ).delete(synchronize_session=False)
+            db.commit()
+
+            with self._lock:
+                self._counters["evictions"] += evicted
+            logger.info(f"Evicted {evicted} embedding cache entries")
+            return evicted
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Embedding cache eviction failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and configured limits"""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else 0.0
+        counters.update({
+            "enabled": self.enabled,
+            "max_entries": self.max_entries,
+            "max_mb": config.EMBEDDING_CACHE_MAX_MB
+        })
+        return counters
+
+
+# Create global embedding cache instance
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,244 @@
+# backend/app/embedding_providers.py
+"""
+Embedding Providers for Docsmait
+
+Backends that turn a batch of texts into vectors for EmbeddingService:
+- OllamaEmbeddingProvider: Ollama's multi-input embed API over HTTP, with a
+  per-text fallback for older servers, admitted by the embedding scheduler
+- OnnxEmbeddingProvider: in-process CPU inference of an ONNX export of the
+  embedding model (onnxruntime + tokenizers), batched and using all cores, so
+  bulk ingestion does not compete with chat generation inside Ollama
+
+Both return L2-normalized vectors of EMBEDDING_DIMENSIONS. The ONNX provider
+reports the configured model id, so vectors (and embedding cache entries) are
+interchangeable with the Ollama path as long as the export is the same model.
+"""
+import logging
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from .config import config
+from .llm_scheduler import LLMQueueFullError, embedding_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider:
+    """Interface for embedding backends"""
+
+    name = "base"
+
+    def __init__(self, model_id: str, dimensions: int):
+        self.model_id = model_id  # Identifies the vector space; part of the embedding cache key
+        self.dimensions = dimensions
+
+    def embed(self, batch: List[str], priority: str = "background") -> List[Optional[List[float]]]:
+        """Embeddings aligned with batch (None for texts that failed)
+
+        priority is the scheduler class for providers backed by Ollama:
+        "interactive" for search queries, "background" for ingestion
+        """
+        raise NotImplementedError
+
+
+# ========== Ollama ==========
+
+class OllamaEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from an Ollama server"""
+
+    name = "ollama"
+
+    def __init__(self, base_url: str, model_id: str, dimensions: int):
+        import ollama
+
+        super().__init__(model_id, dimensions)
+        self.ollama = ollama
+        self.client = ollama.Client(host=base_url)
+        self._supports_batch_api = True
+        self._lock = threading.Lock()
+
+    def embed(self, batch: List[str], priority: str = "background") -> List[Optional[List[float]]]:
+        """Embed one batch within an embedding scheduler slot"""
+        try:
+            with embedding_scheduler.slot(priority):
+                return self._embed(batch)
+        except LLMQueueFullError as e:
+            logger.warning(f"Embedding of {len(batch)} texts rejected: {e}")
+            return [None] * len(batch)
+
+    def _embed(self, batch: List[str]) -> List[Optional[List[float]]]:
+        """Embed one batch, falling back to per-text requests when needed"""
+        if self._supports_batch_api:
+            try:
+                response = self.client.embed(model=self.model_id, input=batch)
+                batch_embeddings = list(response["embeddings"])
+                if len(batch_embeddings) == len(batch):
+                    return batch_embeddings
+                logger.warning(
+                    f"Embed API returned {len(batch_embeddings)} vectors for {len(batch)} inputs, retrying per text"
+                )
+            except (AttributeError, self.ollama.ResponseError) as e:
+                # Older Ollama servers/clients have no /api/embed endpoint
+                if isinstance(e, AttributeError) or getattr(e, "status_code", None) == 404:
+                    with self._lock:
+                        self._supports_batch_api = False
+                    logger.info("Ollama multi-input embed API unavailable, using per-text embeddings")
+                else:
+                    logger.error(f"Batch embedding failed, retrying per text: {e}")
+            except Exception as e:
+                logger.error(f"Batch embedding failed, retrying per text: {e}")
+
+        results: List[Optional[List[float]]] = []
+        for text in batch:
+            try:
+                response = self.client.embeddings(model=self.model_id, prompt=text)
+                results.append(response["embedding"])
+            except Exception as e:
+                logger.error(f"Error generating embedding: {e}")
+                results.append(None)
+        return results
+
+
+# ========== ONNX (in-process CPU) ==========
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """Embeddings computed in-process from an ONNX model on the CPU"""
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_path: str,
+        model_id: str,
+        dimensions: int,
+        max_tokens: int = 2048,
+        threads: int = 0,
+        micro_batch_size: int = 16,
+        pooling: str = "mean"
+    ):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        super().__init__(model_id, dimensions)
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unknown EMBEDDING_ONNX_POOLING '{pooling}' (expected 'mean' or 'cls')")
+        self.model_path = model_path
+        self.pooling = pooling
+        self.micro_batch_size = max(1, micro_batch_size)
+        self.threads = threads or self._available_cores()
+
+        model_file = self._find_file(model_path, ["model.onnx", os.path.join("onnx", "model.onnx")])
+        tokenizer_file = self._find_file(model_path, ["tokenizer.json"])
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_file)
+        self.tokenizer.no_padding()  # Padded per length-sorted micro-batch instead
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        # One inference at a time: each run already uses every core
+        self._run_lock = threading.Lock()
+
+        # Refuse to start with a model whose vectors do not fit the collections
+        probe = self._embed_arrays(["dimension check"])
+        if probe.shape[1] != dimensions:
+            raise ValueError(
+                f"ONNX model at {model_path} produces {probe.shape[1]}-dimensional vectors, "
+                f"EMBEDDING_DIMENSIONS is {dimensions}"
+            )
+        logger.info(f"Loaded ONNX embedding model {model_file} ({self.threads} threads, {pooling} pooling)")
+
+    @staticmethod
+    def _available_cores() -> int:
+        """Cores this process may use, honouring the container's CPU quota"""
+        try:
+            cores = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cores = os.cpu_count() or 1
+        try:
+            with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+                quota, period = cpu_max.read().split()
+            if quota != "max":
+                cores = min(cores, max(1, -(-int(quota) // int(period))))
+        except (OSError, ValueError):
+            pass
+        return cores
+
+    @staticmethod
+    def _find_file(model_path: str, candidates: List[str]) -> str:
+        for candidate in candidates:
+            path = os.path.join(model_path, candidate)
+            if os.path.isfile(path):
+                return path
+        raise FileNotFoundError(f"None of {candidates} found in ONNX model directory {model_path}")
+
+    def embed(self, batch: List[str], priority: str = "background") -> List[Optional[List[float]]]:
+        # Runs in-process, so it does not take Ollama scheduler slots
+        try:
+            return self._embed_arrays(batch).tolist()
+        except Exception as e:
+            logger.error(f"ONNX embedding of {len(batch)} texts failed: {e}")
+            return [None] * len(batch)
+
+    def _embed_arrays(self, batch: List[str]):
+        encodings = self.tokenizer.encode_batch(batch)
+        rows = [None] * len(batch)
+        # Similar lengths share a micro-batch so little compute is spent on padding
+        order = sorted(range(len(batch)), key=lambda i: len(encodings[i].ids))
+        for start in range(0, len(order), self.micro_batch_size):
+            indexes = order[start:start + self.micro_batch_size]
+            for i, vector in zip(indexes, self._run([encodings[i] for i in indexes])):
+                rows[i] = vector
+        vectors = np.stack(rows).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _run(self, encodings):
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+        feed = {name: value for name, value in feed.items() if name in self.input_names}
+
+        with self._run_lock:
+            output = self.session.run(None, feed)[0]
+        if output.ndim == 2:
+            return output  # Export already includes pooling
+        if self.pooling == "cls":
+            return output[:, 0, :]
+        mask = attention_mask[:, :, None].astype(output.dtype)
+        return (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1.0)
+
+
+def create_embedding_provider(provider: str = None) -> EmbeddingProvider:
+    """Embedding provider for the configured (or given) backend"""
+    provider = (provider or config.EMBEDDING_PROVIDER).lower()
+    if provider == "ollama":
+        return OllamaEmbeddingProvider(
+            config.OLLAMA_BASE_URL, config.DEFAULT_EMBEDDING_MODEL, config.EMBEDDING_DIMENSIONS
+        )
+    if provider == "onnx":
+        return OnnxEmbeddingProvider(
+            config.EMBEDDING_ONNX_MODEL_PATH,
+            config.EMBEDDING_ONNX_MODEL_ID or config.DEFAULT_EMBEDDING_MODEL,
+            config.EMBEDDING_DIMENSIONS,
+            max_tokens=config.EMBEDDING_ONNX_MAX_TOKENS,
+            threads=config.EMBEDDING_ONNX_THREADS,
+            micro_batch_size=config.EMBEDDING_ONNX_MICRO_BATCH_SIZE,
+            pooling=config.EMBEDDING_ONNX_POOLING
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}' (expected 'ollama' or 'onnx')")
@@ -0,0 +1,196 @@
+# backend/app/embedding_service.py
+"""
+Embedding Service for Docsmait
+
+This module handles embedding generation for Knowledge Base ingestion:
+- Batched requests to the configured provider (Ollama, or in-process ONNX on
+  the CPU - see embedding_providers.py)
+- Bounded number of batches in flight at once
+- Content-addressed cache lookups so unchanged chunks skip the provider
+- In-process LRU+TTL memo for search query embeddings
+- Throughput reporting (chunks/sec)
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cache_utils import TTLCache
+from .config import config
+from .embedding_cache import chunk_hash, embedding_cache, normalize_chunk_text
+from .embedding_providers import create_embedding_provider
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """Batched, concurrent embedding engine over a pluggable provider"""
+
+    def __init__(self):
+        self.provider = create_embedding_provider()
+        self.model = self.provider.model_id
+        self.dimensions = self.provider.dimensions
+        self.batch_size = max(1, config.EMBEDDING_BATCH_SIZE)
+        self.max_concurrent_batches = max(1, config.EMBEDDING_MAX_CONCURRENT_BATCHES)
+        # Shared pool so the bound applies across all concurrent ingestions
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_batches,
+            thread_name_prefix="embedding"
+        )
+        self.cache = embedding_cache
+        self.query_cache = TTLCache(
+            config.QUERY_EMBEDDING_CACHE_SIZE,
+            config.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+            name="query_embeddings"
+        )
+
+    def embed_texts(
+        self,
+        texts: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        use_cache: bool = True
+    ) -> Tuple[List[Optional[List[float]]], Dict[str, Any]]:
+        """
+        Embed a list of texts in batches
+
+        Returns:
+            Tuple[List, Dict]: (embeddings aligned with texts - None for failed
+            texts, throughput statistics)
+        """
+        start_time = time.time()
+        total = len(texts)
+        embeddings: List[Optional[List[float]]] = [None] * total
+
+        # Resolve cached embeddings first; identical texts are embedded once
+        use_cache = use_cache and self.cache.enabled
+        hashes = [chunk_hash(text) for text in texts] if use_cache else []
+        cached = self.cache.get_many(hashes, self.model) if use_cache else {}
+
+        pending_indexes: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            key = hashes[i] if use_cache else str(i)
+            if key in cached:
+                embeddings[i] = cached[key]
+            else:
+                pending_indexes.setdefault(key, []).append(i)
+
+        pending_keys = list(pending_indexes.keys())
+        pending_texts = [texts[pending_indexes[key][0]] for key in pending_keys]
+        batches = [
+            (offset, pending_texts[offset:offset + self.batch_size])
+            for offset in range(0, len(pending_texts), self.batch_size)
+        ]
+
+        cache_hits = total - sum(len(indexes) for indexes in pending_indexes.values())
+        completed = cache_hits
+        if progress_callback and completed:
+            progress_callback(completed, total)
+
+        new_entries: Dict[str, List[float]] = {}
+        futures = {
+            self._executor.submit(self._embed_batch, batch): (offset, len(batch))
+            for offset, batch in batches
+        }
+        try:
+            for future in as_completed(futures):
+                offset, size = futures[future]
+                try:
+                    batch_embeddings = future.result()
+                except Exception as e:
+                    logger.error(f"Embedding batch at offset {offset} failed: {e}")
+                    batch_embeddings = [None] * size
+
+                for key, embedding in zip(pending_keys[offset:offset + size], batch_embeddings):
+                    for i in pending_indexes[key]:
+                        embeddings[i] = embedding
+                        completed += 1
+                    if embedding is not None and use_cache:
+                        new_entries[key] = embedding
+
+                # Callbacks may raise (e.g. job cancellation) to abort the run
+                if progress_callback:
+                    progress_callback(completed, total)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if new_entries:
+                self.cache.put_many(new_entries, self.model)
+
+        elapsed = time.time() - start_time
+        failed = sum(1 for embedding in embeddings if embedding is None)
+        stats = {
+            "provider": self.provider.name,
+            "chunks": total,
+            "batches": len(batches),
+            "failed": failed,
+            "cache_hits": cache_hits,
+            "cache_misses": len(pending_keys),
+            "batch_size": self.batch_size,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(total / elapsed, 2) if elapsed > 0 else float(total)
+        }
+        return embeddings, stats
+
+    def embed_text(self, text: str) -> Optional[List[float]]:
+        """Embed a single text (None on failure)"""
+        embeddings, _ = self.embed_texts([text])
+        return embeddings[0]
+
+    def embed_query(self, text: str) -> Tuple[Optional[List[float]], bool]:
+        """
+        Embed a search query, memoized by normalized text and model
+
+        Returns:
+            Tuple[Optional[List[float]], bool]: (embedding or None on failure, cache hit)
+        """
+        key = (normalize_chunk_text(text), self.model)
+        embedding = self.query_cache.get(key)
+        if embedding is not None:
+            return embedding, True
+
+        embedding = self._embed_batch([text], "interactive")[0]
+        if embedding is not None:
+            self.query_cache.put(key, embedding)
+        return embedding, False
+
+    def embed_queries(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], int]:
+        """
+        Embed several search queries, sending all memo misses in a single batch
+
+        Returns:
+            Tuple[List, int]: (embeddings aligned with texts - None on failure, cache hits)
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        pending: Dict[Tuple[str, str], List[int]] = {}
+        hits = 0
+        for i, text in enumerate(texts):
+            key = (normalize_chunk_text(text), self.model)
+            embedding = self.query_cache.get(key)
+            if embedding is not None:
+                embeddings[i] = embedding
+                hits += 1
+            else:
+                pending.setdefault(key, []).append(i)
+
+        keys = list(pending.keys())
+        for start in range(0, len(keys), self.batch_size):
+            batch_keys = keys[start:start + self.batch_size]
+            batch = [texts[pending[key][0]] for key in batch_keys]
+            for key, embedding in zip(batch_keys, self._embed_batch(batch, "interactive")):
+                if embedding is None:
+                    continue
+                self.query_cache.put(key, embedding)
+                for i in pending[key]:
+                    embeddings[i] = embedding
+        return embeddings, hits
+
+    def _embed_batch(self, batch: List[str], priority: str = "background") -> List[Optional[List[float]]]:
+        """Ingestion batches run as background scheduler work, query embeddings as interactive"""
+        return self.provider.embed(batch, priority)
+
+
+# Create global embedding service instance
+embedding_service = EmbeddingService()
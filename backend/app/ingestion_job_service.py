@@ -0,0 +1,576 @@
+# backend/app/ingestion_job_service.py
+"""
+Ingestion Job Service for Docsmait
+
+Durable background ingestion for the Knowledge Base:
+- Jobs persisted in PostgreSQL (kb_ingestion_jobs), uploads staged on disk
+- Worker threads claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so several
+  backend processes can share one queue
+- Progress (chunks done/total, throughput, ETA) and cooperative cancellation
+- A timer thread refreshes the heartbeat of each claimed job; jobs orphaned
+  by a crashed worker are re-queued once their heartbeat is stale
+- Failed jobs can be retried; re-runs resume after the last chunk flushed to Qdrant
+- Bulk jobs ingest a zip/tar archive or server-side directory (see bulk_ingest_service)
+"""
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import UploadFile
+
+from .config import config
+from .database_config import get_db
+from .db_models import KBIngestionJob
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ["queued", "running", "completed", "failed", "cancelled"]
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+class IngestionCancelled(Exception):
+    """Raised from progress callbacks when a job has been cancelled"""
+
+
+class IngestionJobService:
+    """Durable queue and worker pool for Knowledge Base ingestion"""
+
+    def __init__(self):
+        self.staging_dir = config.KB_INGEST_STAGING_DIR
+        self.num_workers = max(1, config.KB_INGEST_WORKERS)
+        self.poll_interval = config.KB_INGEST_POLL_INTERVAL_SECONDS
+        self.stale_after = timedelta(seconds=config.KB_INGEST_STALE_JOB_SECONDS)
+        # Several beats per stale window, so one slow database round-trip cannot expire a live job
+        self.heartbeat_interval = max(1.0, config.KB_INGEST_STALE_JOB_SECONDS / 4)
+        self.progress_interval = config.KB_INGEST_PROGRESS_INTERVAL_SECONDS
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    # ========== Submission ==========
+
+    def submit_upload(self, file: UploadFile, collection_name: str, chunk_size: int = None,
+                      user_id: int = None) -> Dict[str, Any]:
+        """Stage an uploaded file on disk and queue it for ingestion"""
+        job_id = str(uuid.uuid4())
+        try:
+            staged_path = self._stage_upload(job_id, file)
+        except Exception as e:
+            logger.error(f"Failed to stage upload {file.filename}: {e}")
+            return {"success": False, "error": f"Failed to stage upload: {str(e)}"}
+
+        return self._create_job(
+            job_id=job_id,
+            job_type="upload",
+            collection_name=collection_name,
+            filename=file.filename,
+            content_type=file.content_type,
+            staged_path=staged_path,
+            parameters={"chunk_size": chunk_size},
+            user_id=user_id
+        )
+
+    def submit_text(self, collection_name: str, text_content: str, filename: str,
+                    metadata: Dict[str, Any] = None, user_id: int = None) -> Dict[str, Any]:
+        """Stage text content on disk and queue it for ingestion"""
+        if not text_content or not text_content.strip():
+            return {"success": False, "error": "Text content is empty"}
+
+        job_id = str(uuid.uuid4())
+        try:
+            staged_path = self._staged_path(job_id)
+            with open(staged_path, "w", encoding="utf-8") as f:
+                f.write(text_content)
+        except Exception as e:
+            logger.error(f"Failed to stage text {filename}: {e}")
+            return {"success": False, "error": f"Failed to stage text: {str(e)}"}
+
+        return self._create_job(
+            job_id=job_id,
+            job_type="text",
+            collection_name=collection_name,
+            filename=filename,
+            content_type="text/plain",
+            staged_path=staged_path,
+            parameters={"metadata": metadata},
+            user_id=user_id
+        )
+
+    def submit_bulk_archive(self, file: UploadFile, collection_name: str, chunk_size: int = None,
+                            user_id: int = None) -> Dict[str, Any]:
+        """Stage a zip/tar archive and queue its files for bulk ingestion"""
+        job_id = str(uuid.uuid4())
+        try:
+            staged_path = self._stage_upload(job_id, file)
+        except Exception as e:
+            logger.error(f"Failed to stage archive {file.filename}: {e}")
+            return {"success": False, "error": f"Failed to stage archive: {str(e)}"}
+
+        return self._create_job(
+            job_id=job_id,
+            job_type="bulk",
+            collection_name=collection_name,
+            filename=file.filename,
+            content_type=file.content_type,
+            staged_path=staged_path,
+            parameters={"chunk_size": chunk_size},
+            user_id=user_id
+        )
+
+    def submit_bulk_directory(self, directory: str, collection_name: str, chunk_size: int = None,
+                              user_id: int = None) -> Dict[str, Any]:
+        """Queue all supported files in a server-side directory for bulk ingestion"""
+        from .bulk_ingest_service import bulk_ingest_service
+
+        real_path, error = bulk_ingest_service.resolve_directory(directory)
+        if error:
+            return {"success": False, "error": error}
+
+        return self._create_job(
+            job_id=str(uuid.uuid4()),
+            job_type="bulk",
+            collection_name=collection_name,
+            filename=real_path,
+            content_type=None,
+            staged_path=None,
+            parameters={"chunk_size": chunk_size, "directory": real_path},
+            user_id=user_id
+        )
+
+    def _create_job(self, job_id: str, job_type: str, collection_name: str, filename: str,
+                    content_type: Optional[str], staged_path: str, parameters: Dict[str, Any],
+                    user_id: Optional[int]) -> Dict[str, Any]:
+        db = next(get_db())
+        try:
+            job = KBIngestionJob(
+                id=job_id,
+                job_type=job_type,
+                status="queued",
+                collection_name=collection_name,
+                filename=filename,
+                content_type=content_type,
+                staged_path=staged_path,
+                parameters=json.dumps(parameters),
+                submitted_by=user_id
+            )
+            db.add(job)
+            db.commit()
+            self._wake_event.set()
+
+            return {
+                "success": True,
+                "job_id": job_id,
+                "status": "queued",
+                "message": f"'{filename}' queued for ingestion into '{collection_name}'"
+            }
+
+        except Exception as e:
+            db.rollback()
+            self._remove_staged_file(staged_path)
+            logger.error(f"Failed to create ingestion job: {e}")
+            return {"success": False, "error": f"Failed to create ingestion job: {str(e)}"}
+        finally:
+            db.close()
+
+    # ========== Queries ==========
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get job status and progress"""
+        db = next(get_db())
+        try:
+            job = db.query(KBIngestionJob).filter(KBIngestionJob.id == job_id).first()
+            return self._job_to_dict(job) if job else None
+        finally:
+            db.close()
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List recent jobs, newest first"""
+        db = next(get_db())
+        try:
+            query = db.query(KBIngestionJob)
+            if status:
+                query = query.filter(KBIngestionJob.status == status)
+            jobs = query.order_by(KBIngestionJob.created_at.desc()).limit(limit).all()
+            return [self._job_to_dict(job) for job in jobs]
+        finally:
+            db.close()
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a queued job immediately, or ask a running job to stop"""
+        db = next(get_db())
+        try:
+            job = db.query(KBIngestionJob).filter(KBIngestionJob.id == job_id).with_for_update().first()
+            if not job:
+                return {"success": False, "error": "Job not found"}
+            if job.status not in ACTIVE_STATUSES:
+                return {"success": False, "error": f"Job is already {job.status}"}
+
+            job.cancel_requested = True
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.completed_at = datetime.utcnow()
+                self._remove_staged_file(job.staged_path)
+            db.commit()
+
+            return {
+                "success": True,
+                "job_id": job_id,
+                "status": job.status,
+                "message": "Job cancelled" if job.status == "cancelled" else "Cancellation requested"
+            }
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to cancel job {job_id}: {e}")
+            return {"success": False, "error": f"Failed to cancel job: {str(e)}"}
+        finally:
+            db.close()
+
+    def retry_job(self, job_id: str) -> Dict[str, Any]:
+        """Re-queue a failed job; it resumes after the last chunk flushed to Qdrant"""
+        db = next(get_db())
+        try:
+            job = db.query(KBIngestionJob).filter(KBIngestionJob.id == job_id).with_for_update().first()
+            if not job:
+                return {"success": False, "error": "Job not found"}
+            if job.status != "failed":
+                return {"success": False, "error": f"Only failed jobs can be retried (job is {job.status})"}
+            parameters = json.loads(job.parameters) if job.parameters else {}
+            source_path = parameters.get("directory") or job.staged_path
+            if not source_path or not os.path.exists(source_path):
+                return {"success": False, "error": "Staged content for this job is no longer available"}
+
+            job.status = "queued"
+            job.error = None
+            job.result = None
+            job.completed_at = None
+            job.cancel_requested = False
+            db.commit()
+            self._wake_event.set()
+
+            return {"success": True, "job_id": job_id, "status": "queued", "message": "Job re-queued"}
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to retry job {job_id}: {e}")
+            return {"success": False, "error": f"Failed to retry job: {str(e)}"}
+        finally:
+            db.close()
+
+    def _job_to_dict(self, job: KBIngestionJob) -> Dict[str, Any]:
+        chunks_done = job.chunks_done or 0
+        chunks_total = job.chunks_total
+        throughput = None
+        eta_seconds = None
+
+        if job.started_at and chunks_done:
+            end_time = self._as_aware(job.completed_at) if job.completed_at else datetime.now(timezone.utc)
+            elapsed = (end_time - self._as_aware(job.started_at)).total_seconds()
+            if elapsed > 0:
+                throughput = round(chunks_done / elapsed, 2)
+                if job.status == "running" and chunks_total:
+                    eta_seconds = round(max(0, chunks_total - chunks_done) / throughput, 1)
+
+        return {
+            "job_id": job.id,
+            "job_type": job.job_type,
+            "status": job.status,
+            "collection_name": job.collection_name,
+            "filename": job.filename,
+            "chunks_done": chunks_done,
+            "chunks_total": chunks_total,
+            "progress": round(chunks_done / chunks_total, 3) if chunks_total else None,
+            "chunks_per_second": throughput,
+            "eta_seconds": eta_seconds,
+            "cancel_requested": bool(job.cancel_requested),
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "completed_at": job.completed_at.isoformat() if job.completed_at else None
+        }
+
+    # ========== Workers ==========
+
+    def start_workers(self):
+        """Start background worker threads (idempotent)"""
+        if self._workers:
+            return
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._stop_event.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                args=(f"{self.worker_prefix}:{i}",),
+                name=f"kb-ingest-{i}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        print(f"✅ Started {self.num_workers} KB ingestion worker(s)")
+
+    def stop_workers(self):
+        """Signal workers to stop; running jobs are re-queued via heartbeat expiry"""
+        self._stop_event.set()
+        self._wake_event.set()
+        for worker in self._workers:
+            worker.join(timeout=config.THREAD_JOIN_TIMEOUT)
+        self._workers = []
+
+    def _worker_loop(self, worker_id: str):
+        while not self._stop_event.is_set():
+            try:
+                job_id = self._claim_next_job(worker_id)
+            except Exception as e:
+                logger.error(f"Ingestion worker {worker_id} failed to claim job: {e}")
+                job_id = None
+
+            if job_id:
+                heartbeat_stop = self._start_heartbeat(job_id, worker_id)
+                try:
+                    self._run_job(job_id)
+                finally:
+                    heartbeat_stop.set()
+                continue
+
+            self._wake_event.wait(self.poll_interval)
+            self._wake_event.clear()
+
+    def _claim_next_job(self, worker_id: str) -> Optional[str]:
+        db = next(get_db())
+        try:
+            stale_before = datetime.utcnow() - self.stale_after
+            job = db.query(KBIngestionJob).filter(
+                (KBIngestionJob.status == "queued") |
+                ((KBIngestionJob.status == "running") & (KBIngestionJob.heartbeat_at < stale_before))
+            ).order_by(KBIngestionJob.created_at.asc()).with_for_update(skip_locked=True).first()
+
+            if not job:
+                return None
+
+            if job.status == "running":
+                logger.warning(f"Re-queuing stale ingestion job {job.id} from worker {job.worker_id}")
+
+            job.status = "running"
+            job.worker_id = worker_id
+            job.started_at = datetime.utcnow()
+            job.heartbeat_at = datetime.utcnow()
+            job.chunks_done = 0
+            db.commit()
+            return job.id
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _start_heartbeat(self, job_id: str, worker_id: str) -> threading.Event:
+        """
+        Refresh the job's heartbeat on a timer until the returned event is set
+
+        Independent of progress reporting, so a long first extraction (a large
+        PDF or archive) does not look stale and get claimed by another worker.
+        """
+        stop_event = threading.Event()
+
+        def beat():
+            while not stop_event.wait(self.heartbeat_interval):
+                db = next(get_db())
+                try:
+                    db.query(KBIngestionJob).filter(
+                        KBIngestionJob.id == job_id,
+                        KBIngestionJob.worker_id == worker_id,
+                        KBIngestionJob.status == "running"
+                    ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logger.warning(f"Failed to refresh heartbeat of ingestion job {job_id}: {e}")
+                finally:
+                    db.close()
+
+        threading.Thread(target=beat, name=f"kb-ingest-heartbeat-{job_id[:8]}", daemon=True).start()
+        return stop_event
+
+    def _run_job(self, job_id: str):
+        from .kb_service_pg import kb_service
+
+        db = next(get_db())
+        try:
+            job = db.query(KBIngestionJob).filter(KBIngestionJob.id == job_id).first()
+            job_type = job.job_type
+            collection_name = job.collection_name
+            filename = job.filename
+            content_type = job.content_type
+            staged_path = job.staged_path
+            parameters = json.loads(job.parameters) if job.parameters else {}
+        finally:
+            db.close()
+
+        progress_callback = self._make_progress_callback(job_id)
+        try:
+            if job_type == "upload":
+                with open(staged_path, "rb") as f:
+                    file_content = f.read()
+                # The job id doubles as the KB document id so a re-run resumes
+                # after the last chunk flushed to Qdrant
+                result = kb_service.add_file_content_to_collection(
+                    collection_name, file_content, filename, content_type,
+                    chunk_size=parameters.get("chunk_size"),
+                    progress_callback=progress_callback,
+                    document_id=job_id
+                )
+            elif job_type == "text":
+                with open(staged_path, "r", encoding="utf-8") as f:
+                    text_content = f.read()
+                result = kb_service.add_text_to_collection(
+                    collection_name, text_content, filename,
+                    metadata=parameters.get("metadata"),
+                    progress_callback=progress_callback,
+                    document_id=job_id
+                )
+            elif job_type == "bulk":
+                from .bulk_ingest_service import bulk_ingest_service
+
+                # Bulk runs discard all of their documents themselves when cancelled
+                if parameters.get("directory"):
+                    result = bulk_ingest_service.ingest_directory(
+                        parameters["directory"], collection_name,
+                        chunk_size=parameters.get("chunk_size"),
+                        progress_callback=progress_callback,
+                        run_id=job_id,
+                        cancel_check=lambda: self._cancel_requested(job_id)
+                    )
+                else:
+                    result = bulk_ingest_service.ingest_archive(
+                        staged_path, collection_name,
+                        chunk_size=parameters.get("chunk_size"),
+                        progress_callback=progress_callback,
+                        run_id=job_id,
+                        cancel_check=lambda: self._cancel_requested(job_id)
+                    )
+            else:
+                result = {"success": False, "error": f"Unknown job type '{job_type}'"}
+        except IngestionCancelled as e:
+            result = {"success": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} crashed: {e}")
+            result = {"success": False, "error": str(e)}
+
+        self._finish_job(job_id, result)
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        db = next(get_db())
+        try:
+            job = db.query(KBIngestionJob).filter(KBIngestionJob.id == job_id).first()
+            return bool(job and job.cancel_requested)
+        finally:
+            db.close()
+
+    def _make_progress_callback(self, job_id: str):
+        """Build a throttled callback that records progress and honours cancellation"""
+        state = {"last_update": 0.0}
+
+        def callback(done: int, total: int):
+            now = time.time()
+            if done < total and now - state["last_update"] < self.progress_interval:
+                return
+            state["last_update"] = now
+
+            db = next(get_db())
+            try:
+                job = db.query(KBIngestionJob).filter(KBIngestionJob.id == job_id).first()
+                if job is None:
+                    return
+                job.chunks_done = done
+                job.chunks_total = total
+                job.heartbeat_at = datetime.utcnow()
+                cancel_requested = bool(job.cancel_requested)
+                db.commit()
+            finally:
+                db.close()
+
+            if cancel_requested:
+                raise IngestionCancelled(f"Ingestion job {job_id} was cancelled")
+
+        return callback
+
+    def _finish_job(self, job_id: str, result: Dict[str, Any]):
+        db = next(get_db())
+        try:
+            job = db.query(KBIngestionJob).filter(KBIngestionJob.id == job_id).first()
+            if job is None:
+                return
+
+            if job.cancel_requested and not result.get("success"):
+                job.status = "cancelled"
+            elif result.get("success"):
+                job.status = "completed"
+                job.chunks_done = result.get("chunks_created", job.chunks_done)
+                job.chunks_total = job.chunks_total or job.chunks_done
+            else:
+                job.status = "failed"
+                job.error = result.get("error", "Unknown error")
+
+            job.result = json.dumps(result, default=str)
+            job.completed_at = datetime.utcnow()
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+
+            if job.status == "cancelled" and job.job_type != "bulk":
+                self._discard_partial_document(job_id)
+
+            # Failed jobs keep their staged file so they can be retried (and resumed)
+            if job.status != "failed":
+                self._remove_staged_file(job.staged_path)
+            print(f"KB ingestion job {job_id} ({job.filename}) finished: {job.status}")
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to record result for ingestion job {job_id}: {e}")
+        finally:
+            db.close()
+
+    def _discard_partial_document(self, job_id: str):
+        """Remove the vectors and KB document a cancelled job had already written"""
+        from .kb_service_pg import kb_service
+
+        result = kb_service.delete_document(job_id)
+        if not result.get("success") and result.get("error") != "Document not found":
+            logger.warning(f"Failed to discard partial document for cancelled job {job_id}: {result.get('error')}")
+
+    # ========== Staging ==========
+
+    def _staged_path(self, job_id: str) -> str:
+        os.makedirs(self.staging_dir, exist_ok=True)
+        return os.path.join(self.staging_dir, job_id)
+
+    def _stage_upload(self, job_id: str, file: UploadFile) -> str:
+        staged_path = self._staged_path(job_id)
+        with open(staged_path, "wb") as f:
+            shutil.copyfileobj(file.file, f, 1024 * 1024)
+        return staged_path
+
+    def _remove_staged_file(self, staged_path: Optional[str]):
+        if staged_path and os.path.exists(staged_path):
+            try:
+                os.remove(staged_path)
+            except OSError as e:
+                logger.warning(f"Failed to remove staged file {staged_path}: {e}")
+
+    @staticmethod
+    def _as_aware(value: datetime) -> datetime:
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# Create global ingestion job service instance
+ingestion_job_service = IngestionJobService()
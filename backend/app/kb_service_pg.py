@@ -3,29 +3,44 @@ import os
 import time
 import uuid
 import json
-from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Iterator, Iterable, Tuple
 from fastapi import HTTPException, UploadFile
-import PyPDF2
-import docx
 import magic
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, insert, select, text
 
 from .config import config
 import ollama
-import qdrant_client
-from qdrant_client.http.models import PointStruct, VectorParams, Distance
 
 from .database_config import get_db
-from .db_models import KBCollection, KBDocument, KBQuery, KBConfig, KBDocumentTag
+from .db_models import KBCollection, KBDocument, KBQuery, KBQueryDailyCount, KBConfig, KBDocumentTag
 from .ai_service import ai_service
+from .embedding_service import embedding_service
+from .llm_scheduler import LLMQueueFullError, llm_scheduler
+from .embedding_cache import chunk_hash
+from .ingestion_job_service import IngestionCancelled
+from .answer_cache import answer_cache
+from .collection_registry import collection_registry
+from .query_log_writer import query_log_writer
+from .question_bank_service import question_bank_service
+from .lexical_index import lexical_index, looks_like_identifier_query, reciprocal_rank_fusion
+from .vector_bulk_writer import VectorBulkWriter
+from .vector_store import QUANTIZATION_MODES, VectorPoint, vector_store
+from .text_extraction import TextSegment, iter_chunks, iter_text_segments
 
 class KnowledgeBaseService:
     def __init__(self):
         self.ollama_client = ollama.Client(host=config.OLLAMA_BASE_URL)
-        self.qdrant_client = qdrant_client.QdrantClient(url=config.QDRANT_URL)
+        self.vector_store = vector_store  # Qdrant or embedded store, per VECTOR_DB
         self.ai_service = ai_service  # Add AI service for training functionality
+        self.question_bank_service = question_bank_service  # Pre-generated assessment questions
+        self.embedding_service = embedding_service  # Batched embeddings for ingestion
+        self.answer_cache = answer_cache  # Cached chat answers, invalidated by collection content version
+        self.lexical_index = lexical_index  # Postgres full-text index of chunk text
+        self.collection_registry = collection_registry  # Cached collection metadata for read paths
+        self.query_log_writer = query_log_writer  # Buffered KBQuery inserts, off the request path
         self.ensure_kb_tables()
         
     def ensure_kb_tables(self):
@@ -35,8 +50,13 @@ class KnowledgeBaseService:
         pass
 
     def create_collection(self, name: str, description: str, created_by: str, 
-                         tags: List[str] = None, is_default: bool = False) -> Dict[str, Any]:
-        """Create a new knowledge base collection"""
+                         tags: List[str] = None, is_default: bool = False,
+                         quantization: str = None) -> Dict[str, Any]:
+        """Create a new knowledge base collection (quantization defaults to KB_VECTOR_QUANTIZATION)"""
+        quantization = quantization or config.KB_VECTOR_QUANTIZATION
+        if quantization not in QUANTIZATION_MODES:
+            return {"success": False, "error": f"Unknown quantization '{quantization}' (expected one of {', '.join(QUANTIZATION_MODES)})"}
+        
         db = next(get_db())
         try:
             # Check if collection already exists
@@ -52,29 +72,25 @@ class KnowledgeBaseService:
                 description=description,
                 created_by=created_by,
                 tags=json.dumps(tags) if tags else "[]",
-                is_default=is_default
+                is_default=is_default,
+                vector_quantization=quantization
             )
             db.add(collection)
             
-            # Create Qdrant collection for vectors
+            # Create vector collection (an existing one is reused)
             try:
-                self.qdrant_client.create_collection(
-                    collection_name=name,
-                    vectors_config=VectorParams(size=config.EMBEDDING_DIMENSIONS, distance=Distance.COSINE)
-                )
+                self.vector_store.create_collection(name, config.EMBEDDING_DIMENSIONS, quantization)
             except Exception as e:
-                # Check if collection already exists (409 Conflict)
-                if "already exists" in str(e) or "409" in str(e):
-                    print(f"Qdrant collection '{name}' already exists, continuing with PostgreSQL record creation...")
-                else:
-                    db.rollback()
-                    return {"success": False, "error": f"Failed to create Qdrant collection: {str(e)}"}
+                db.rollback()
+                return {"success": False, "error": f"Failed to create vector collection: {str(e)}"}
             
             db.commit()
+            self.collection_registry.collections_changed()
             
             return {
                 "success": True,
                 "collection_id": collection_id,
+                "vector_quantization": quantization,
                 "message": f"Collection '{name}' created successfully"
             }
             
@@ -119,7 +135,8 @@ class KnowledgeBaseService:
                     "total_size_bytes": collection.total_size_bytes or 0,
                     "total_size_mb": round(total_size_mb, 2),
                     "tags": json.loads(collection.tags) if collection.tags else [],
-                    "is_default": collection.is_default
+                    "is_default": collection.is_default,
+                    "vector_quantization": collection.vector_quantization or "none"
                 })
             
             return result
@@ -175,6 +192,7 @@ class KnowledgeBaseService:
                 "total_size_mb": round(total_size_mb, 2),
                 "tags": json.loads(collection.tags) if collection.tags else [],
                 "is_default": collection.is_default,
+                "vector_quantization": collection.vector_quantization or "none",
                 "documents": documents_list
             }
             
@@ -194,13 +212,47 @@ class KnowledgeBaseService:
         return self.add_document_to_collection(collection_name, file, chunk_size)
 
     def add_document_to_collection(self, collection_name: str, file: UploadFile, 
-                                 chunk_size: int = None) -> Dict[str, Any]:
-        """Add document to collection (metadata in PostgreSQL, vectors in Qdrant)"""
+                                 chunk_size: int = None,
+                                 progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Add document to collection (metadata in PostgreSQL, vectors in the vector store)"""
+        # Read file content
+        file_content = file.file.read()
+        file.file.seek(0)  # Reset file pointer
+        
+        return self.add_file_content_to_collection(
+            collection_name, file_content, file.filename, file.content_type,
+            chunk_size=chunk_size, progress_callback=progress_callback
+        )
+
+    def add_file_content_to_collection(self, collection_name: str, file_content: bytes, filename: str,
+                                       content_type: str, chunk_size: int = None,
+                                       progress_callback: Optional[Callable[[int, int], None]] = None,
+                                       document_id: str = None) -> Dict[str, Any]:
+        """
+        Add raw file content to collection (used by uploads and background ingestion jobs)
+        
+        When a document_id is supplied the ingestion is resumable: a re-run for the same
+        id continues after the last chunk flushed to the vector store instead of starting over.
+        """
+        # Pages/paragraphs stream in, chunks stream out; embeddings and vector
+        # upserts consume them window by window so memory stays bounded
+        segments = self._iter_text_segments(file_content, content_type or "", filename)
+        chunks = self._iter_chunks(segments, chunk_size or config.DEFAULT_CHUNK_SIZE)
+        
+        return self.add_chunks_to_collection(
+            collection_name, chunks, filename, content_type, len(file_content),
+            progress_callback=progress_callback, document_id=document_id
+        )
+
+    def add_chunks_to_collection(self, collection_name: str, chunks: Iterable[Dict[str, Any]], filename: str,
+                                 content_type: str, size_bytes: int,
+                                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                                 document_id: str = None) -> Dict[str, Any]:
+        """Add already extracted chunks (from iter_chunks) of a file to collection"""
         db = next(get_db())
         start_time = time.time()
-        
-        if chunk_size is None:
-            chunk_size = config.DEFAULT_CHUNK_SIZE
+        resumable = document_id is not None
+        actual_collection_name = collection_name
         
         try:
             # Check if collection exists, fallback to default if not
@@ -210,94 +262,78 @@ class KnowledgeBaseService:
             if not collection:
                 return {"success": False, "error": f"Collection '{actual_collection_name}' not found and could not create default"}
             
-            # Read file content
-            file_content = file.file.read()
-            file.file.seek(0)  # Reset file pointer
+            # Create (or resume) document record in PostgreSQL
+            kb_document, start_chunk = self._begin_document(
+                db, document_id, filename, content_type, size_bytes, actual_collection_name
+            )
+            document_id = kb_document.id
+            if kb_document.status == "completed":
+                return self._completed_document_result(kb_document, start_time)
+            
+            print(f"Processing {filename}: streaming extraction, chunking and embedding"
+                  + (f" (resuming after chunk {start_chunk})" if start_chunk else ""))
+            
+            def build_payload(chunk_index: int, chunk: Dict[str, Any]) -> Dict[str, Any]:
+                payload = {
+                    "document_id": document_id,
+                    "kb_document_id": document_id,
+                    "filename": filename,
+                    "chunk_index": chunk_index,
+                    "text": chunk["text"],
+                    "collection": actual_collection_name
+                }
+                if chunk.get("page_start") is not None:
+                    payload["page_start"] = chunk["page_start"]
+                    payload["page_end"] = chunk["page_end"]
+                return payload
+            
+            ingest_stats = self._ingest_chunks(
+                chunks, actual_collection_name, document_id, build_payload,
+                progress_callback=progress_callback, label=filename, start_chunk=start_chunk
+            )
             
-            # Extract text based on file type
-            text_content = self._extract_text_content(file_content, file.content_type, file.filename)
-            if not text_content:
+            if ingest_stats["chunks"] == 0:
+                db.delete(kb_document)
+                self._count_pending_document(db, actual_collection_name, -1)
+                db.commit()
                 return {"success": False, "error": "Failed to extract text from file"}
             
-            # Create document record in PostgreSQL
-            document_id = str(uuid.uuid4())
-            kb_document = KBDocument(
-                id=document_id,
-                filename=file.filename,
-                content_type=file.content_type,
-                size_bytes=len(file_content),
-                collection_name=actual_collection_name,
-                status="processing"
-            )
-            db.add(kb_document)
-            
-            # Process text into chunks and create embeddings (Qdrant operations)
-            chunks = self._chunk_text(text_content, chunk_size)
-            vectors = []
-            total_chunks = len(chunks)
-            
-            print(f"Processing {file.filename}: {total_chunks} chunks to process")
-            
-            for i, chunk in enumerate(chunks):
-                try:
-                    # Log progress for every 10th chunk or for small files every chunk
-                    if total_chunks <= 10 or (i + 1) % 10 == 0 or i == total_chunks - 1:
-                        print(f"Processing {file.filename}: chunk {i+1}/{total_chunks} ({((i+1)/total_chunks*100):.1f}%)")
-                    
-                    # Generate embedding using Ollama
-                    embedding = self._generate_embedding(chunk)
-                    
-                    point = PointStruct(
-                        id=str(uuid.uuid4()),
-                        vector=embedding,
-                        payload={
-                            "document_id": document_id,
-                            "filename": file.filename,
-                            "chunk_index": i,
-                            "text": chunk,
-                            "collection": actual_collection_name
-                        }
-                    )
-                    vectors.append(point)
-                    
-                except Exception as e:
-                    print(f"Error processing chunk {i+1}/{total_chunks} for {file.filename}: {e}")
-                    continue
-            
-            # Store vectors in Qdrant
-            if vectors:
-                print(f"Storing {len(vectors)} vectors in Qdrant for {file.filename}")
-                self.qdrant_client.upsert(
-                    collection_name=actual_collection_name,
-                    points=vectors
-                )
-                print(f"Successfully stored vectors for {file.filename}")
-            
             # Update document record
-            kb_document.chunk_count = len(vectors)
+            kb_document.chunk_count = ingest_stats["stored"]
+            kb_document.chunks_flushed = ingest_stats["chunks"]
             kb_document.status = "completed"
             
             # Update collection stats
-            collection.document_count += 1
-            collection.total_size_bytes += len(file_content)
+            self._adjust_collection_totals(db, actual_collection_name, 1, size_bytes)
+            self._count_pending_document(db, actual_collection_name, -1)
             collection.updated_date = datetime.utcnow()
+            self._bump_content_version(db, collection.name)
             
             db.commit()
+            self.collection_registry.collections_changed()
             
             processing_time = time.time() - start_time
-            print(f"Completed processing {file.filename}: {len(vectors)} chunks in {processing_time:.2f}s")
+            print(f"Completed processing {filename}: {ingest_stats['stored']} chunks in {processing_time:.2f}s "
+                  f"({ingest_stats['chunks_per_second']} chunks/sec)")
             
             return {
                 "success": True,
                 "document_id": document_id,
-                "chunks_created": len(vectors),
+                "chunks_created": ingest_stats["stored"],
                 "processing_time": round(processing_time, 2),
-                "message": f"Document '{file.filename}' added successfully"
+                "embedding_stats": ingest_stats,
+                "message": f"Document '{filename}' added successfully"
             }
             
+        except IngestionCancelled:
+            # Not a failure: the job owning this document decides what to discard
+            db.rollback()
+            self._abort_document(actual_collection_name, document_id, keep_for_resume=resumable)
+            raise
         except Exception as e:
             db.rollback()
             print(f"Error adding document: {e}")
+            self._abort_document(actual_collection_name, document_id, keep_for_resume=resumable)
             processing_time = time.time() - start_time
             return {
                 "success": False, 
@@ -307,54 +343,86 @@ class KnowledgeBaseService:
         finally:
             db.close()
 
-    def search_collection(self, collection_name: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Search collection using vector similarity"""
-        db = next(get_db())
+    def search_collection(self, collection_name: str, query: str, limit: int = 5,
+                          mode: str = None) -> List[Dict[str, Any]]:
+        """Search collection using vector similarity, full-text ranking or both (see _search_chunks)"""
         try:
             start_time = time.time()
             
             # Check if collection exists, fallback to default if not
             actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
             
-            # Generate query embedding
-            query_embedding = self._generate_embedding(query)
+            results, retrieval_mode = self._search_chunks(actual_collection_name, query, limit, mode)
             
-            # Search in Qdrant
-            search_results = self.qdrant_client.search(
-                collection_name=actual_collection_name,
-                query_vector=query_embedding,
-                limit=limit,
-                with_payload=True
-            )
-            
-            # Log query
+            # Log query (buffered, written in batches by the query log writer)
             response_time = int((time.time() - start_time) * 1000)
-            kb_query = KBQuery(
-                query_text=query,
-                collection_name=actual_collection_name,
-                response_time_ms=response_time
-            )
-            db.add(kb_query)
-            db.commit()
-            
-            # Format results
-            results = []
-            for result in search_results:
-                results.append({
-                    "score": result.score,
-                    "text": result.payload.get("text", ""),
-                    "filename": result.payload.get("filename", ""),
-                    "document_id": result.payload.get("document_id", ""),
-                    "chunk_index": result.payload.get("chunk_index", 0)
-                })
+            self.query_log_writer.log(query, actual_collection_name, response_time)
             
+            for result in results:
+                result["retrieval_mode"] = retrieval_mode
             return results
             
         except Exception as e:
             print(f"Error searching collection: {e}")
             return []
-        finally:
-            db.close()
+
+    @staticmethod
+    def _needs_query_embedding(query: str, mode: str = None) -> bool:
+        """Whether _search_chunks will start with a semantic search (lexical routes need no embedding)"""
+        requested_mode = mode or config.KB_SEARCH_MODE
+        return not (requested_mode == "lexical" or (requested_mode == "auto" and looks_like_identifier_query(query)))
+
+    def _search_chunks(self, collection_name: str, query: str, limit: int, mode: str = None,
+                       query_embedding: List[float] = None):
+        """
+        Rank chunks of a collection for a query; returns (results, retrieval mode used)
+        
+        Modes: "vector" (vector store similarity), "lexical" (Postgres full-text, no embedding),
+        "hybrid" (reciprocal rank fusion of both) and "auto" (lexical for short
+        identifier-style queries such as "REQ-042", vector otherwise). Vector search
+        falls back to lexical when no query embedding could be generated.
+        """
+        requested_mode = mode or config.KB_SEARCH_MODE
+        mode = requested_mode
+        if mode == "auto":
+            mode = "lexical" if looks_like_identifier_query(query) else "vector"
+        
+        if mode == "lexical":
+            results = self.lexical_index.search(collection_name, query, limit)
+            if results or requested_mode == "lexical":
+                return results, "lexical"
+            mode = "vector"  # Auto mode: no keyword match, try semantic search
+        
+        if query_embedding is None:
+            query_embedding, _ = self._generate_query_embedding(query)
+        if not any(query_embedding):
+            # Embedding service unavailable; a zero vector would rank chunks arbitrarily
+            return self.lexical_index.search(collection_name, query, limit), "lexical_fallback"
+        
+        candidate_limit = limit * 4 if mode == "hybrid" else limit
+        vector_results = [
+            self._vector_result(hit)
+            for hit in self.vector_store.search(collection_name, query_embedding, candidate_limit)
+        ]
+        if mode != "hybrid":
+            return vector_results, "vector"
+        
+        lexical_results = self.lexical_index.search(collection_name, query, candidate_limit)
+        fused = reciprocal_rank_fusion([lexical_results, vector_results], k=config.KB_HYBRID_RRF_K)
+        return fused[:limit], "hybrid"
+
+    @staticmethod
+    def _vector_result(hit) -> Dict[str, Any]:
+        return {
+            "point_id": str(hit.id),
+            "score": hit.score,
+            "text": hit.payload.get("text", ""),
+            "filename": hit.payload.get("filename", ""),
+            "document_id": hit.payload.get("document_id", ""),
+            "chunk_index": hit.payload.get("chunk_index", 0),
+            "page_start": hit.payload.get("page_start"),
+            "page_end": hit.payload.get("page_end")
+        }
 
     def query_collection(self, collection_name: str, query: str, limit: int = 5) -> Dict[str, Any]:
         """Query collection and return results in training-compatible format"""
@@ -372,6 +440,66 @@ class KnowledgeBaseService:
                 "results": []
             }
 
+    def search_collections(self, searches: List[Tuple[str, str]], limit: int = 5,
+                           mode: str = None) -> List[Dict[str, Any]]:
+        """
+        Fan-out retrieval for several (collection name, query) pairs
+        
+        Collections are resolved in one lookup, all query embeddings are requested
+        in one batch, the searches run concurrently and their KBQuery rows are
+        queued on the batched query log writer. Results are aligned with searches.
+        """
+        if not searches:
+            return []
+        start_time = time.time()
+        
+        resolved = self._resolve_collection_names([collection_name for collection_name, _ in searches])
+        queries = [query for _, query in searches]
+        
+        # Queries that the search mode routes to the lexical index need no embedding
+        needs_embedding = [self._needs_query_embedding(query, mode) for query in queries]
+        embeddings = [None] * len(queries)
+        embed_indexes = [i for i, needed in enumerate(needs_embedding) if needed]
+        if embed_indexes:
+            batch_embeddings, _ = self.embedding_service.embed_queries([queries[i] for i in embed_indexes])
+            for i, embedding in zip(embed_indexes, batch_embeddings):
+                # A zero vector makes _search_chunks fall back to lexical ranking
+                embeddings[i] = embedding or [0.0] * config.EMBEDDING_DIMENSIONS
+        embedding_time = int((time.time() - start_time) * 1000)
+        
+        def run_search(i: int) -> Dict[str, Any]:
+            collection_name = resolved[searches[i][0]]
+            try:
+                results, retrieval_mode = self._search_chunks(
+                    collection_name, queries[i], limit, mode, query_embedding=embeddings[i]
+                )
+                return {"success": True, "collection_name": collection_name, "query": queries[i],
+                        "results": results, "retrieval_mode": retrieval_mode}
+            except Exception as e:
+                print(f"Error searching collection {collection_name}: {e}")
+                return {"success": False, "collection_name": collection_name, "query": queries[i],
+                        "results": [], "error": str(e)}
+        
+        workers = max(1, min(len(searches), config.KB_FANOUT_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kb-fanout") as executor:
+            outcomes = list(executor.map(run_search, range(len(searches))))
+        
+        total_time = int((time.time() - start_time) * 1000)
+        self.query_log_writer.log_many([
+            {"query_text": outcome["query"], "collection_name": outcome["collection_name"], "response_time_ms": total_time}
+            for outcome in outcomes
+        ])
+        print(f"🔍 Fan-out retrieval: {len(searches)} searches over {len(set(resolved.values()))} collections "
+              f"in {total_time}ms (embedding {embedding_time}ms)")
+        return outcomes
+
+    def _resolve_collection_names(self, collection_names: List[str]) -> Dict[str, str]:
+        """Map requested collection names to existing ones, using the default collection for unknown names"""
+        existing = {name for name in collection_names if self.collection_registry.exists(name)}
+        missing = [name for name in dict.fromkeys(collection_names) if name not in existing]
+        fallback = self._ensure_collection_exists_or_get_default(missing[0]) if missing else None
+        return {name: name if name in existing else fallback for name in collection_names}
+
     def get_collection_documents(self, collection_name: str) -> List[Dict[str, Any]]:
         """Get all documents in a collection"""
         db = next(get_db())
@@ -403,103 +531,255 @@ class KnowledgeBaseService:
     # Helper methods (keep existing Qdrant-based implementations)
     def _extract_text_content(self, file_content: bytes, content_type: str, filename: str) -> str:
         """Extract text content from various file types"""
-        try:
-            if content_type == "application/pdf" or filename.lower().endswith('.pdf'):
-                # PDF extraction
-                import io
-                pdf_file = io.BytesIO(file_content)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\\n"
-                return text.strip()
-            
-            elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" or filename.lower().endswith('.docx'):
-                # DOCX extraction
-                import io
-                docx_file = io.BytesIO(file_content)
-                doc = docx.Document(docx_file)
-                text = ""
-                for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\\n"
-                return text.strip()
-            
-            elif content_type.startswith("text/") or filename.lower().endswith(('.txt', '.md', '.py', '.js', '.html', '.css')):
-                # Text file
-                return file_content.decode('utf-8', errors='ignore')
-            
-            else:
-                # Try to decode as text
-                return file_content.decode('utf-8', errors='ignore')
-                
-        except Exception as e:
-            print(f"Error extracting text content: {e}")
-            return ""
+        segments = self._iter_text_segments(file_content, content_type or "", filename)
+        return "\n".join(segment.text for segment in segments).strip()
+
+    def _iter_text_segments(self, file_content: bytes, content_type: str, filename: str) -> Iterator[TextSegment]:
+        """Yield text page by page (PDF), paragraph by paragraph (DOCX) or in line blocks (text)"""
+        return iter_text_segments(file_content, content_type, filename)
+
+    def _iter_chunks(self, segments: Iterable[TextSegment], chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Split a stream of text segments into word-bounded chunks"""
+        return iter_chunks(segments, chunk_size)
 
     def _chunk_text(self, text: str, chunk_size: int = 1000) -> List[str]:
         """Split text into chunks"""
-        chunks = []
-        words = text.split()
-        current_chunk = []
-        current_size = 0
+        segments = [TextSegment(text, None, 1, 1)]
+        return [chunk["text"] for chunk in self._iter_chunks(segments, chunk_size)]
+
+    def _ingest_chunks(self, chunks: Iterator[Dict[str, Any]], collection_name: str, document_id: str,
+                       build_payload: Callable[[int, Dict[str, Any]], Dict[str, Any]],
+                       progress_callback: Optional[Callable[[int, int], None]] = None,
+                       label: str = "", start_chunk: int = 0) -> Dict[str, Any]:
+        """
+        Embed a chunk stream one bounded window at a time and write it through the bulk writer
+        
+        Chunks before start_chunk were flushed by an earlier run and are skipped.
+        Point ids are derived from (document_id, chunk_index) so replays overwrite
+        rather than duplicate.
+        """
+        start_time = time.time()
+        window_size = max(1, config.KB_INGEST_WINDOW_CHUNKS)
+        stats = {"chunks": 0, "stored": 0, "failed": 0, "resumed_from": start_chunk,
+                 "batches": 0, "cache_hits": 0, "cache_misses": 0}
+        writer = VectorBulkWriter(
+            self.vector_store, collection_name,
+            on_flush=lambda flushed: self._checkpoint_document(document_id, flushed),
+            flushed=start_chunk
+        )
         
-        for word in words:
-            if current_size + len(word) > chunk_size and current_chunk:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [word]
-                current_size = len(word)
+        window: List[Dict[str, Any]] = []
+        chunk_iter = iter(chunks)
+        exhausted = False
+        while not exhausted:
+            window = []
+            for chunk in chunk_iter:
+                window.append(chunk)
+                if len(window) >= window_size:
+                    break
             else:
-                current_chunk.append(word)
-                current_size += len(word) + 1  # +1 for space
+                exhausted = True
+            if not window:
+                break
+            
+            first_index = stats["chunks"]
+            stats["chunks"] += len(window)
+            pending = [
+                (first_index + offset, chunk) for offset, chunk in enumerate(window)
+                if first_index + offset >= start_chunk
+            ]
+            
+            if pending:
+                embeddings, embedding_stats = self.embedding_service.embed_texts([chunk["text"] for _, chunk in pending])
+                
+                lexical_rows = []
+                for (chunk_index, chunk), embedding in zip(pending, embeddings):
+                    point_id = self._chunk_point_id(document_id, chunk_index)
+                    payload = build_payload(chunk_index, chunk)
+                    # Chunks stay keyword-searchable even if their embedding failed
+                    lexical_rows.append(self._lexical_row(point_id, payload))
+                    if embedding is None:
+                        print(f"Error processing chunk {chunk_index + 1} for {label}: embedding failed")
+                        stats["failed"] += 1
+                        writer.add(None)
+                        continue
+                    writer.add(VectorPoint(point_id, embedding, payload))
+                self.lexical_index.add_chunks(collection_name, lexical_rows)
+                
+                for key in ("batches", "cache_hits", "cache_misses"):
+                    stats[key] += embedding_stats.get(key, 0)
+            
+            # Total chunk count is unknown while streaming; estimate it from source progress
+            progress = window[-1].get("progress") or 0.0
+            estimated_total = stats["chunks"] if exhausted or progress <= 0 else max(stats["chunks"], round(stats["chunks"] / progress))
+            print(f"Processing {label}: {stats['chunks']}/~{estimated_total} chunks embedded")
+            if progress_callback:
+                progress_callback(stats["chunks"], estimated_total)
         
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+        # Wait for pipelined upserts to be applied and verify this run's points are stored
+        document_filter = {"must": [{"key": "kb_document_id", "match": {"value": document_id}}]}
+        run_filter = {"must": document_filter["must"] + [{"key": "chunk_index", "range": {"gte": start_chunk}}]}
+        writer.finish(run_filter, writer.points_written)
+        stats["stored"] = self.vector_store.count(collection_name, document_filter)
         
-        return chunks
+        elapsed = time.time() - start_time
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 2) if elapsed > 0 else float(stats["chunks"])
+        return stats
 
-    def _generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding using Ollama"""
+    @staticmethod
+    def _lexical_row(point_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Lexical index row for a chunk point"""
+        return {
+            "point_id": point_id,
+            "kb_document_id": payload.get("kb_document_id"),
+            "filename": payload.get("filename"),
+            "chunk_index": payload.get("chunk_index"),
+            "page_start": payload.get("page_start"),
+            "page_end": payload.get("page_end"),
+            "text": payload.get("text", "")
+        }
+
+    @staticmethod
+    def _chunk_point_id(document_id: str, chunk_index: int) -> str:
+        """Deterministic vector point id for a document chunk"""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"docsmait:{document_id}:{chunk_index}"))
+
+    def _begin_document(self, db: Session, document_id: Optional[str], filename: str, content_type: str,
+                        size_bytes: int, collection_name: str):
+        """
+        Create the KBDocument row for an ingestion, or pick up an interrupted one
+        
+        Returns (kb_document, start_chunk). The row is committed immediately so that
+        flush checkpoints survive a failed or interrupted run.
+        """
+        kb_document = db.query(KBDocument).filter(KBDocument.id == document_id).first() if document_id else None
+        if kb_document and kb_document.status != "completed":
+            kb_document.status = "processing"
+            db.commit()
+            return kb_document, kb_document.chunks_flushed or 0
+        if kb_document:
+            return kb_document, 0
+        
+        kb_document = KBDocument(
+            id=document_id or str(uuid.uuid4()),
+            filename=filename,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            collection_name=collection_name,
+            status="processing",
+            chunks_flushed=0
+        )
+        db.add(kb_document)
+        self._count_pending_document(db, collection_name, 1)
+        db.commit()
+        return kb_document, 0
+
+    def _completed_document_result(self, kb_document: KBDocument, start_time: float) -> Dict[str, Any]:
+        """Result for a resumable ingestion whose document was already completed"""
+        return {
+            "success": True,
+            "document_id": kb_document.id,
+            "chunks_created": kb_document.chunk_count or 0,
+            "processing_time": round(time.time() - start_time, 2),
+            "message": f"Document '{kb_document.filename}' was already added"
+        }
+
+    def _checkpoint_document(self, document_id: str, chunks_flushed: int) -> None:
+        """Record how many chunks of a document have been handed to the vector store"""
+        db = next(get_db())
         try:
-            response = self.ollama_client.embeddings(model=config.DEFAULT_EMBEDDING_MODEL, prompt=text)
-            return response['embedding']
+            db.query(KBDocument).filter(KBDocument.id == document_id).update(
+                {"chunks_flushed": chunks_flushed}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error checkpointing document {document_id}: {e}")
+        finally:
+            db.close()
+
+    def _abort_document(self, collection_name: str, document_id: Optional[str], keep_for_resume: bool) -> None:
+        """Mark a failed ingestion for resume, or remove its partial vectors and record"""
+        if not document_id:
+            return
+        db = next(get_db())
+        try:
+            kb_document = db.query(KBDocument).filter(KBDocument.id == document_id).first()
+            if kb_document is None or kb_document.status == "completed":
+                return
+            if keep_for_resume:
+                kb_document.status = "failed"
+            else:
+                self._delete_document_points(collection_name, document_id)
+                self.lexical_index.delete_document(document_id)
+                db.delete(kb_document)
+                self._count_pending_document(db, kb_document.collection_name, -1)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error cleaning up document {document_id}: {e}")
+        finally:
+            db.close()
+
+    def _delete_document_points(self, collection_name: str, document_id: str) -> None:
+        """Remove vectors already stored for a KB document (cleanup after a failed ingestion)"""
+        try:
+            self.vector_store.delete_by_filter(collection_name, {
+                "must": [
+                    {
+                        "key": "kb_document_id",
+                        "match": {"value": document_id}
+                    }
+                ]
+            })
         except Exception as e:
-            print(f"Error generating embedding: {e}")
+            print(f"Error cleaning up vectors for document {document_id}: {e}")
+
+    def _generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding using Ollama"""
+        return self._generate_query_embedding(text)[0]
+
+    def _generate_query_embedding(self, text: str):
+        """Generate a query embedding through the shared memo; returns (embedding, cache hit)"""
+        embedding, cached = self.embedding_service.embed_query(text)
+        if embedding is None:
+            print("Error generating embedding, using zero vector")
             # Return zero vector as fallback
-            return [0.0] * config.EMBEDDING_DIMENSIONS
+            return [0.0] * config.EMBEDDING_DIMENSIONS, False
+        return embedding, cached
 
     def get_statistics(self) -> Dict[str, Any]:
-        """Get Knowledge Base statistics"""
+        """
+        Get Knowledge Base statistics
+        
+        Served from rollups maintained at write time: the per-collection counters
+        on kb_collections and today's row of kb_query_daily_counts. Use
+        rebuild_statistics() to recompute them if they ever drift.
+        """
         db = next(get_db())
         try:
-            # Count total documents
-            total_documents = db.query(KBDocument).count()
-            
-            # Count documents that are successfully indexed (completed status)
-            documents_indexed = db.query(KBDocument).filter(KBDocument.status == "completed").count()
-            
-            # Count queries today
-            today = date.today()
-            queries_today = db.query(KBQuery).filter(
-                func.date(KBQuery.timestamp) == today
-            ).count()
+            documents_indexed, pending_documents, total_size_bytes, last_updated = db.query(
+                func.coalesce(func.sum(KBCollection.document_count), 0),
+                func.coalesce(func.sum(KBCollection.pending_document_count), 0),
+                func.coalesce(func.sum(KBCollection.total_size_bytes), 0),
+                func.max(KBCollection.last_document_at)
+            ).one()
+            
+            # Today's bucket is a primary key lookup
+            queries_today = db.query(KBQueryDailyCount.query_count).filter(
+                KBQueryDailyCount.query_date == func.current_date()
+            ).scalar() or 0
             
             # For simplicity, search queries today is the same as total queries today
             search_queries_today = queries_today
             
-            # Calculate total index size (sum of all document sizes in MB)
-            total_size_bytes = db.query(func.sum(KBDocument.size_bytes)).scalar() or 0
-            index_size_mb = total_size_bytes / (1024 * 1024)
-            
-            # Get last updated date from most recent document
-            last_doc = db.query(KBDocument).order_by(KBDocument.upload_date.desc()).first()
-            last_updated = last_doc.upload_date if last_doc else None
-            
             return {
-                "documents_indexed": documents_indexed,
-                "total_documents": total_documents,
-                "queries_today": queries_today,
-                "search_queries_today": search_queries_today,
-                "index_size_mb": round(index_size_mb, 2),
+                "documents_indexed": int(documents_indexed),
+                "total_documents": int(documents_indexed + pending_documents),
+                "queries_today": int(queries_today),
+                "search_queries_today": int(search_queries_today),
+                "index_size_mb": round(total_size_bytes / (1024 * 1024), 2),
                 "last_updated": last_updated
             }
             
@@ -516,6 +796,59 @@ class KnowledgeBaseService:
         finally:
             db.close()
 
+    def rebuild_statistics(self) -> Dict[str, Any]:
+        """
+        Recompute the statistics rollups from kb_documents and kb_queries
+        
+        Locks the rollup rows first, so ingests and query log flushes that commit
+        meanwhile wait and are applied on top of the recomputed values.
+        """
+        db = next(get_db())
+        try:
+            collections = db.query(KBCollection).with_for_update().all()
+            db.execute(text("LOCK TABLE kb_query_daily_counts IN EXCLUSIVE MODE"))
+            
+            completed = KBDocument.status == "completed"
+            document_stats = {
+                row.collection_name: row
+                for row in db.query(
+                    KBDocument.collection_name,
+                    func.count(KBDocument.id).filter(completed).label("indexed"),
+                    func.count(KBDocument.id).filter(~completed).label("pending"),
+                    func.coalesce(func.sum(KBDocument.size_bytes).filter(completed), 0).label("size_bytes"),
+                    func.max(KBDocument.upload_date).label("last_document_at")
+                ).group_by(KBDocument.collection_name).all()
+            }
+            for collection in collections:
+                row = document_stats.get(collection.name)
+                collection.document_count = row.indexed if row else 0
+                collection.pending_document_count = row.pending if row else 0
+                collection.total_size_bytes = row.size_bytes if row else 0
+                collection.last_document_at = row.last_document_at if row else None
+            
+            query_date = func.coalesce(KBQuery.query_date, func.date(KBQuery.timestamp))
+            db.query(KBQueryDailyCount).delete(synchronize_session=False)
+            db.execute(insert(KBQueryDailyCount).from_select(
+                ["query_date", "query_count"],
+                select(query_date, func.count(KBQuery.id)).group_by(query_date)
+            ))
+            days = db.query(func.count(KBQueryDailyCount.query_date)).scalar()
+            
+            db.commit()
+            return {
+                "success": True,
+                "collections": len(collections),
+                "documents": sum(row.indexed + row.pending for row in document_stats.values()),
+                "query_days": days
+            }
+            
+        except Exception as e:
+            db.rollback()
+            print(f"Error rebuilding statistics: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            db.close()
+
     def get_config(self, key: str, default: str = None) -> str:
         """Get configuration value"""
         db = next(get_db())
@@ -545,6 +878,8 @@ class KnowledgeBaseService:
                 db.add(config_item)
             
             db.commit()
+            if key == "default_collection":
+                self.collection_registry.collections_changed()
             return True
             
         except Exception as e:
@@ -556,21 +891,18 @@ class KnowledgeBaseService:
     
     def _get_default_collection_name(self) -> str:
         """Get the default collection name"""
-        return self.get_config("default_collection", config.DEFAULT_COLLECTION_NAME)
+        return self.collection_registry.default_name()
     
     def _ensure_collection_exists_or_get_default(self, collection_name: str) -> str:
         """Check if collection exists, if not return default collection name"""
-        db = next(get_db())
         try:
-            collection = db.query(KBCollection).filter(KBCollection.name == collection_name).first()
-            if collection:
+            if self.collection_registry.exists(collection_name):
                 return collection_name
             
             # Collection doesn't exist, check if default collection exists
             default_name = self._get_default_collection_name()
-            default_collection = db.query(KBCollection).filter(KBCollection.name == default_name).first()
             
-            if default_collection:
+            if self.collection_registry.exists(default_name):
                 print(f"Collection '{collection_name}' not found, using default collection '{default_name}'")
                 return default_name
             
@@ -593,54 +925,62 @@ class KnowledgeBaseService:
         except Exception as e:
             print(f"Error checking collection existence: {e}")
             return collection_name
-        finally:
-            db.close()
 
-    def query_knowledge_base(self, message: str, collection_name: str = None) -> Dict[str, Any]:
-        """Query knowledge base using RAG (Retrieval Augmented Generation)"""
-        db = next(get_db())
+    def _lookup_answer_and_embed(self, collection_key: Optional[Tuple[str, str]], collection_version: int,
+                                 message: str):
+        """
+        Answer-cache lookup for a chat message; returns (cached answer, query embedding,
+        embedding cache hit, embedding ms)
         
-        if collection_name is None:
-            collection_name = config.DEFAULT_COLLECTION_NAME
-        
-        # Check if collection exists, fallback to default if not
-        actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
+        The exact cache key is checked before anything is embedded. The query is then
+        embedded only if retrieval starts with a semantic search or a near-duplicate
+        cache lookup is enabled; otherwise the embedding and its cache flag are None.
+        """
+        if collection_key:
+            cached_answer = self.answer_cache.lookup(
+                collection_key, message, config.DEFAULT_CHAT_MODEL, collection_version
+            )
+            if cached_answer:
+                return cached_answer, None, None, 0
         
-        start_time = time.time()
+        similar_lookup = bool(collection_key) and self.answer_cache.wants_embedding(message)
+        if not (similar_lookup or self._needs_query_embedding(message)):
+            return None, None, None, 0
         
-        try:
-            # Step 1: Generate embedding for the query
-            embedding_start = time.time()
-            query_embedding = self._generate_embedding(message)
-            embedding_time = int((time.time() - embedding_start) * 1000)
-            
-            # Step 2: Search for relevant documents (reduced from 5 to 3 for speed)
-            retrieval_start = time.time()
-            search_limit = min(3, config.RAG_SIMILARITY_SEARCH_LIMIT)  # Reduced limit for faster response
-            search_results = self.qdrant_client.search(
-                collection_name=actual_collection_name,
-                query_vector=query_embedding,
-                limit=search_limit,
-                with_payload=True
+        embedding_start = time.time()
+        query_embedding, embedding_cached = self._generate_query_embedding(message)
+        embedding_time = int((time.time() - embedding_start) * 1000)
+        cached_answer = None
+        if similar_lookup:
+            cached_answer = self.answer_cache.lookup_similar(
+                collection_key, message, config.DEFAULT_CHAT_MODEL, collection_version, query_embedding
             )
-            retrieval_time = int((time.time() - retrieval_start) * 1000)
-            
-            # Step 3: Format context from search results
-            context = ""
-            sources = []
-            
-            for i, result in enumerate(search_results):
-                context += f"Source {i+1}: {result.payload.get('text', '')}\n\n"
-                sources.append({
-                    "filename": result.payload.get("filename", "Unknown"),
-                    "score": round(result.score, 3),
-                    "text_preview": result.payload.get("text", "")[:config.KB_TEXT_PREVIEW_LENGTH] + "..." if len(result.payload.get("text", "")) > config.KB_TEXT_PREVIEW_LENGTH else result.payload.get("text", "")
-                })
-            
-            # Step 4: Generate response using Ollama LLM
-            llm_start = time.time()
-            
-            prompt = f"""You are a helpful assistant answering questions based on the provided context. 
+        return cached_answer, query_embedding, embedding_cached, embedding_time
+
+    def _retrieve_rag_context(self, collection_name: str, message: str, query_embedding: Optional[List[float]]):
+        """Search a collection for RAG context; returns (results, context, sources, retrieval ms, mode)"""
+        retrieval_start = time.time()
+        search_limit = min(3, config.RAG_SIMILARITY_SEARCH_LIMIT)  # Reduced limit for faster response
+        search_results, retrieval_mode = self._search_chunks(
+            collection_name, message, search_limit, query_embedding=query_embedding
+        )
+        retrieval_time = int((time.time() - retrieval_start) * 1000)
+        
+        context = ""
+        sources = []
+        for i, result in enumerate(search_results):
+            text = result["text"]
+            context += f"Source {i+1}: {text}\n\n"
+            sources.append({
+                "filename": result["filename"] or "Unknown",
+                "score": round(result["score"], 3),
+                "text_preview": text[:config.KB_TEXT_PREVIEW_LENGTH] + "..." if len(text) > config.KB_TEXT_PREVIEW_LENGTH else text
+            })
+        return search_results, context, sources, retrieval_time, retrieval_mode
+
+    @staticmethod
+    def _build_rag_prompt(context: str, message: str) -> str:
+        return f"""You are a helpful assistant answering questions based on the provided context. 
             
 Context:
 {context}
@@ -654,52 +994,96 @@ Instructions:
 - Reference the sources when appropriate
 
 Answer:"""
+
+    def query_knowledge_base(self, message: str, collection_name: str = None) -> Dict[str, Any]:
+        """Query knowledge base using RAG (Retrieval Augmented Generation)"""
+        if collection_name is None:
+            collection_name = config.DEFAULT_COLLECTION_NAME
+        
+        # Check if collection exists, fallback to default if not
+        actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
+        
+        start_time = time.time()
+        
+        try:
+            # Step 1: Answer cache (same or near-identical question against unchanged collection
+            # content), embedding the query only when the cache or retrieval needs it
+            collection_key, collection_version = self._get_collection_cache_key(actual_collection_name)
+            cached_answer, query_embedding, embedding_cached, embedding_time = self._lookup_answer_and_embed(
+                collection_key, collection_version, message
+            )
+            if cached_answer:
+                return self._cached_answer_response(
+                    cached_answer, message, actual_collection_name, start_time,
+                    embedding_time, embedding_cached
+                )
+            
+            # Step 2: Search for relevant documents and format context
+            search_results, context, sources, retrieval_time, retrieval_mode = self._retrieve_rag_context(
+                actual_collection_name, message, query_embedding
+            )
+            
+            # Step 3: Generate response using Ollama LLM
+            llm_start = time.time()
+            prompt = self._build_rag_prompt(context, message)
             
+            queue_time = 0
             try:
-                response = self.ollama_client.generate(
-                    model=config.DEFAULT_CHAT_MODEL,
-                    prompt=prompt,
-                    stream=False
-                )
+                with llm_scheduler.slot("interactive") as queue_seconds:
+                    queue_time = int(queue_seconds * 1000)
+                    response = self.ollama_client.generate(
+                        model=config.DEFAULT_CHAT_MODEL,
+                        prompt=prompt,
+                        stream=False
+                    )
                 llm_response = response['response']
+                
+                if collection_key:
+                    self.answer_cache.store(
+                        collection_key, message, config.DEFAULT_CHAT_MODEL, collection_version,
+                        query_embedding if query_embedding and any(query_embedding) else None, llm_response, sources
+                    )
+            except LLMQueueFullError:
+                raise  # Surfaced by the API as 429 with Retry-After
             except Exception as e:
                 print(f"Error generating LLM response: {e}")
                 llm_response = "I apologize, but I'm having trouble generating a response at the moment. Please try again later."
             
             llm_time = int((time.time() - llm_start) * 1000)
             
-            # Step 5: Log the query
+            # Step 4: Log the query (buffered, off the request path)
             total_time = int((time.time() - start_time) * 1000)
-            kb_query = KBQuery(
-                query_text=message,
-                collection_name=actual_collection_name,
-                response_time_ms=total_time
-            )
-            db.add(kb_query)
-            db.commit()
+            self.query_log_writer.log(message, actual_collection_name, total_time)
             
             # Enhanced performance metrics
             performance_stats = {
                 "query_embedding_time_ms": embedding_time,
                 "retrieval_time_ms": retrieval_time, 
+                "llm_queue_time_ms": queue_time,
                 "llm_response_time_ms": llm_time,
                 "total_time_ms": total_time,
                 "chunks_retrieved": len(search_results),
                 "context_length": len(context),
-                "model_used": config.DEFAULT_CHAT_MODEL
+                "retrieval_mode": retrieval_mode,
+                "model_used": config.DEFAULT_CHAT_MODEL,
+                "query_embedding_cache": "skipped" if embedding_cached is None else ("hit" if embedding_cached else "miss"),
+                "query_embedding_cache_hit_rate": self.embedding_service.query_cache.get_stats()["hit_rate"],
+                "answer_cache": "miss"
             }
             
             # Print performance breakdown for monitoring
             print(f"🔍 RAG Performance Breakdown:")
-            print(f"   Embedding: {embedding_time}ms")
+            print(f"   Embedding: {embedding_time}ms "
+                  f"({'skipped' if embedding_cached is None else 'cached' if embedding_cached else 'computed'})")
             print(f"   Retrieval: {retrieval_time}ms ({len(search_results)} chunks)")
-            print(f"   LLM ({config.DEFAULT_CHAT_MODEL}): {llm_time}ms")
+            print(f"   LLM ({config.DEFAULT_CHAT_MODEL}): {llm_time}ms (queued {queue_time}ms)")
             print(f"   Total: {total_time}ms")
             
             return {
                 "response": llm_response,
                 "sources": sources,
                 "performance": performance_stats,
+                "cached": False,
                 # Keep old keys for backward compatibility
                 "query_embedding_time": embedding_time,
                 "retrieval_time": retrieval_time,
@@ -707,6 +1091,8 @@ Answer:"""
                 "total_time": total_time
             }
             
+        except LLMQueueFullError:
+            raise
         except Exception as e:
             print(f"Error querying knowledge base: {e}")
             return {
@@ -717,13 +1103,143 @@ Answer:"""
                 "llm_response_time": 0,
                 "total_time": 0
             }
-        finally:
-            db.close()
+
+    def _cached_answer_response(self, cached_answer: Dict[str, Any], message: str,
+                                collection_name: str, start_time: float, embedding_time: int,
+                                embedding_cached: Optional[bool]) -> Dict[str, Any]:
+        """Build the chat response for an answer served from the answer cache"""
+        total_time = int((time.time() - start_time) * 1000)
+        self.query_log_writer.log(message, collection_name, total_time)
+        
+        print(f"🔍 RAG answer served from cache ({cached_answer['match']} match, "
+              f"similarity {cached_answer['similarity']}) in {total_time}ms")
+        
+        return {
+            "response": cached_answer["response"],
+            "sources": cached_answer["sources"],
+            "performance": {
+                "query_embedding_time_ms": embedding_time,
+                "retrieval_time_ms": 0,
+                "llm_response_time_ms": 0,
+                "total_time_ms": total_time,
+                "chunks_retrieved": len(cached_answer["sources"]),
+                "model_used": config.DEFAULT_CHAT_MODEL,
+                "query_embedding_cache": "skipped" if embedding_cached is None else ("hit" if embedding_cached else "miss"),
+                "answer_cache": cached_answer["match"],
+                "answer_cache_similarity": cached_answer["similarity"]
+            },
+            "cached": True,
+            "query_embedding_time": embedding_time,
+            "retrieval_time": 0,
+            "llm_response_time": 0,
+            "total_time": total_time
+        }
+
+    def stream_knowledge_base(self, message: str, collection_name: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of query_knowledge_base
+        
+        Yields events as they become available:
+        - {"type": "sources", "sources": [...], "cached": bool} once retrieval is done
+        - {"type": "token", "content": "..."} for each fragment produced by the LLM
+        - {"type": "done", "performance": {...}} with the timing breakdown
+        - {"type": "error", "error": "..."} if the query fails
+        """
+        if collection_name is None:
+            collection_name = config.DEFAULT_COLLECTION_NAME
+        
+        actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
+        start_time = time.time()
+        
+        try:
+            collection_key, collection_version = self._get_collection_cache_key(actual_collection_name)
+            cached_answer, query_embedding, embedding_cached, embedding_time = self._lookup_answer_and_embed(
+                collection_key, collection_version, message
+            )
+            if cached_answer:
+                result = self._cached_answer_response(
+                    cached_answer, message, actual_collection_name, start_time,
+                    embedding_time, embedding_cached
+                )
+                yield {"type": "sources", "sources": result["sources"], "cached": True}
+                yield {"type": "token", "content": result["response"]}
+                yield {"type": "done", "performance": result["performance"], "cached": True}
+                return
+            
+            search_results, context, sources, retrieval_time, retrieval_mode = self._retrieve_rag_context(
+                actual_collection_name, message, query_embedding
+            )
+            yield {"type": "sources", "sources": sources, "cached": False}
+            
+            llm_start = time.time()
+            first_token_time = None
+            response_parts = []
+            llm_failed = False
+            queue_time = 0
+            try:
+                with llm_scheduler.slot("interactive") as queue_seconds:
+                    queue_time = int(queue_seconds * 1000)
+                    for part in self.ollama_client.generate(
+                        model=config.DEFAULT_CHAT_MODEL,
+                        prompt=self._build_rag_prompt(context, message),
+                        stream=True
+                    ):
+                        token = part.get("response", "")
+                        if token:
+                            if first_token_time is None:
+                                first_token_time = int((time.time() - llm_start) * 1000)
+                            response_parts.append(token)
+                            yield {"type": "token", "content": token}
+            except LLMQueueFullError as e:
+                # Sources were already sent, so the rejection travels as an event
+                yield {"type": "error", "error": "The AI service is busy. Please try again in a moment.",
+                       "retry_after": e.retry_after}
+                return
+            except Exception as e:
+                print(f"Error streaming LLM response: {e}")
+                llm_failed = True
+                fallback = "I apologize, but I'm having trouble generating a response at the moment. Please try again later."
+                yield {"type": "token", "content": fallback if not response_parts else f"\n\n{fallback}"}
+            
+            llm_time = int((time.time() - llm_start) * 1000)
+            llm_response = "".join(response_parts)
+            if collection_key and not llm_failed and llm_response:
+                self.answer_cache.store(
+                    collection_key, message, config.DEFAULT_CHAT_MODEL, collection_version,
+                    query_embedding if query_embedding and any(query_embedding) else None, llm_response, sources
+                )
+            
+            total_time = int((time.time() - start_time) * 1000)
+            self.query_log_writer.log(message, actual_collection_name, total_time)
+            
+            print(f"🔍 RAG stream: embedding {embedding_time}ms, retrieval {retrieval_time}ms, queued {queue_time}ms, "
+                  f"first token {first_token_time}ms, LLM {llm_time}ms, total {total_time}ms")
+            
+            yield {
+                "type": "done",
+                "cached": False,
+                "performance": {
+                    "query_embedding_time_ms": embedding_time,
+                    "retrieval_time_ms": retrieval_time,
+                    "llm_queue_time_ms": queue_time,
+                    "first_token_time_ms": first_token_time,
+                    "llm_response_time_ms": llm_time,
+                    "total_time_ms": total_time,
+                    "chunks_retrieved": len(search_results),
+                    "context_length": len(context),
+                    "retrieval_mode": retrieval_mode,
+                    "model_used": config.DEFAULT_CHAT_MODEL,
+                    "query_embedding_cache": "skipped" if embedding_cached is None else ("hit" if embedding_cached else "miss"),
+                    "answer_cache": "miss"
+                }
+            }
+            
+        except Exception as e:
+            print(f"Error streaming knowledge base query: {e}")
+            yield {"type": "error", "error": "I apologize, but I encountered an error while processing your question. Please try again later."}
 
     def query_knowledge_base_with_context(self, query: str, document_context: str = None, collection_name: str = None, max_results: int = 5) -> Dict[str, Any]:
         """Query knowledge base with additional document context for AI-assisted document creation"""
-        db = next(get_db())
-        
         # Safety checks for query parameter
         if query is None:
             return {
@@ -769,19 +1285,18 @@ Answer:"""
         start_time = time.time()
         
         try:
-            # Step 1: Generate embedding for the query
+            # Step 1: Generate embedding for the query (lexical retrieval skips the embedding call)
             embedding_start = time.time()
-            query_embedding = self._generate_embedding(query)
+            query_embedding, embedding_cached = None, None
+            if self._needs_query_embedding(query):
+                query_embedding, embedding_cached = self._generate_query_embedding(query)
             embedding_time = int((time.time() - embedding_start) * 1000)
             
             # Step 2: Search for relevant documents
             retrieval_start = time.time()
             search_limit = min(max_results, config.RAG_SIMILARITY_SEARCH_LIMIT)
-            search_results = self.qdrant_client.search(
-                collection_name=actual_collection_name,
-                query_vector=query_embedding,
-                limit=search_limit,
-                with_payload=True
+            search_results, retrieval_mode = self._search_chunks(
+                actual_collection_name, query, search_limit, query_embedding=query_embedding
             )
             retrieval_time = int((time.time() - retrieval_start) * 1000)
             
@@ -790,11 +1305,12 @@ Answer:"""
             sources = []
             
             for i, result in enumerate(search_results):
-                kb_context += f"Knowledge Base Source {i+1}: {result.payload.get('text', '')}\n\n"
+                text = result["text"]
+                kb_context += f"Knowledge Base Source {i+1}: {text}\n\n"
                 sources.append({
-                    "filename": result.payload.get("filename", "Unknown"),
-                    "score": round(result.score, 3),
-                    "text_preview": result.payload.get("text", "")[:config.KB_TEXT_PREVIEW_LENGTH] + "..." if len(result.payload.get("text", "")) > config.KB_TEXT_PREVIEW_LENGTH else result.payload.get("text", "")
+                    "filename": result["filename"] or "Unknown",
+                    "score": round(result["score"], 3),
+                    "text_preview": text[:config.KB_TEXT_PREVIEW_LENGTH] + "..." if len(text) > config.KB_TEXT_PREVIEW_LENGTH else text
                 })
             
             # Step 4: Create enhanced prompt with document context
@@ -830,25 +1346,18 @@ Answer:"""
                 print(f"KB Query with Context Prompt:\n{prompt}\n")
             
             try:
-                response = self.ollama_client.generate(
-                    model=config.GENERAL_PURPOSE_LLM,
-                    prompt=prompt,
-                    stream=False
-                )
+                with llm_scheduler.slot("interactive"):
+                    response = self.ollama_client.generate(
+                        model=config.GENERAL_PURPOSE_LLM,
+                        prompt=prompt,
+                        stream=False
+                    )
                 
                 llm_response_time = int((time.time() - llm_start) * 1000)
                 total_time = int((time.time() - start_time) * 1000)
                 
-                # Log query to database
-                query_log = KBQuery(
-                    query_text=query,
-                    collection_name=actual_collection_name,
-                    response_text=response['response'][:1000],  # Truncate for storage
-                    response_time_ms=total_time,
-                    result_count=len(search_results)
-                )
-                db.add(query_log)
-                db.commit()
+                # Log query (buffered, off the request path)
+                self.query_log_writer.log(query, actual_collection_name, total_time)
                 
                 return {
                     "response": response['response'],
@@ -857,12 +1366,16 @@ Answer:"""
                     "retrieval_time": retrieval_time,
                     "llm_response_time": llm_response_time,
                     "total_time": total_time,
+                    "query_embedding_cache": "skipped" if embedding_cached is None else ("hit" if embedding_cached else "miss"),
                     "document_context_provided": bool(document_context and document_context.strip()),
                     "knowledge_base_results": len(search_results),
+                    "retrieval_mode": retrieval_mode,
                     "collection_used": actual_collection_name,
                     "prompt": prompt if hasattr(config, 'SHOW_PROMPT') and config.SHOW_PROMPT else None
                 }
                 
+            except LLMQueueFullError:
+                raise
             except Exception as llm_error:
                 print(f"LLM Error: {llm_error}")
                 return {
@@ -875,6 +1388,8 @@ Answer:"""
                     "error": "LLM service error"
                 }
                 
+        except LLMQueueFullError:
+            raise
         except Exception as e:
             print(f"Error in query_knowledge_base_with_context: {e}")
             return {
@@ -886,8 +1401,6 @@ Answer:"""
                 "total_time": 0,
                 "error": str(e)
             }
-        finally:
-            db.close()
 
     def reset_knowledge_base(self, collection_name: str = None) -> bool:
         """Reset knowledge base collection (admin only)"""
@@ -905,20 +1418,24 @@ Answer:"""
             if collection:
                 collection.document_count = 0
                 collection.total_size_bytes = 0
+                collection.pending_document_count = 0
+                collection.last_document_at = None
                 collection.updated_date = datetime.utcnow()
+                self._bump_content_version(db, collection.name)
             
-            # Delete all vectors from Qdrant collection
+            # Delete all vectors from the vector collection
             try:
-                self.qdrant_client.delete_collection(collection_name)
+                self.vector_store.delete_collection(collection_name)
                 # Recreate the collection
-                self.qdrant_client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(size=config.EMBEDDING_DIMENSIONS, distance=Distance.COSINE)
-                )
+                quantization = (collection.vector_quantization if collection else None) or config.KB_VECTOR_QUANTIZATION
+                self.vector_store.create_collection(collection_name, config.EMBEDDING_DIMENSIONS, quantization)
             except Exception as e:
-                print(f"Error resetting Qdrant collection: {e}")
+                print(f"Error resetting vector collection: {e}")
+            
+            self.lexical_index.delete_collection(collection_name)
             
             db.commit()
+            self.collection_registry.collections_changed()
             return True
             
         except Exception as e:
@@ -940,38 +1457,46 @@ Answer:"""
             collection_name = document.collection_name
             filename = document.filename
             size_bytes = document.size_bytes
+            counted_in_stats = document.status == "completed"
             
             # Delete from PostgreSQL
             db.delete(document)
             
-            # Delete from Qdrant (all chunks for this document)
+            # Delete from the vector store (all chunks for this document)
             try:
-                self.qdrant_client.delete(
-                    collection_name=collection_name,
-                    points_selector={
-                        "filter": {
-                            "must": [
-                                {
-                                    "key": "document_id",
-                                    "match": {"value": document_id}
-                                }
-                            ]
+                self.vector_store.delete_by_filter(collection_name, {
+                    # Text chunks may carry the source document_id in their payload,
+                    # so also match the KB document reference
+                    "should": [
+                        {
+                            "key": "document_id",
+                            "match": {"value": document_id}
+                        },
+                        {
+                            "key": "kb_document_id",
+                            "match": {"value": document_id}
                         }
-                    }
-                )
+                    ]
+                })
                 
             except Exception as e:
-                print(f"Error deleting from Qdrant: {e}")
-                # Continue with PostgreSQL deletion even if Qdrant fails
+                print(f"Error deleting from vector store: {e}")
+                # Continue with PostgreSQL deletion even if the vector store fails
+            
+            self.lexical_index.delete_document(document_id)
             
             # Update collection stats
             collection = db.query(KBCollection).filter(KBCollection.name == collection_name).first()
-            if collection:
-                collection.document_count = max(0, (collection.document_count or 0) - 1)
-                collection.total_size_bytes = max(0, (collection.total_size_bytes or 0) - size_bytes)
+            if collection and counted_in_stats:
+                self._adjust_collection_totals(db, collection_name, -1, -size_bytes)
                 collection.updated_date = datetime.utcnow()
+            elif collection:
+                self._count_pending_document(db, collection_name, -1)
+            if collection:
+                self._bump_content_version(db, collection.name)
             
             db.commit()
+            self.collection_registry.collections_changed()
             
             return {
                 "success": True,
@@ -986,112 +1511,93 @@ Answer:"""
             db.close()
 
     def add_text_to_collection(self, collection_name: str, text_content: str, 
-                             filename: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+                             filename: str, metadata: Dict[str, Any] = None,
+                             progress_callback: Optional[Callable[[int, int], None]] = None,
+                             document_id: str = None) -> Dict[str, Any]:
         """Add text content directly to collection (for system-generated content)"""
         db = next(get_db())
         start_time = time.time()
+        resumable = document_id is not None
+        actual_collection_name = collection_name
         
         try:
             # Check if collection exists, create if not, or fallback to default
-            collection = db.query(KBCollection).filter(KBCollection.name == collection_name).first()
-            actual_collection_name = collection_name
-            
+            collection, actual_collection_name = self._get_or_create_system_collection(db, collection_name)
             if not collection:
-                # Try to auto-create collection for specific types
-                create_result = self.create_collection(
-                    name=collection_name,
-                    description=f"Auto-created collection for {collection_name}",
-                    created_by="system",
-                    tags=["auto-created"]
-                )
-                if create_result.get("success"):
-                    collection = db.query(KBCollection).filter(KBCollection.name == collection_name).first()
-                else:
-                    # Creation failed, fallback to default collection
-                    actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
-                    collection = db.query(KBCollection).filter(KBCollection.name == actual_collection_name).first()
-                    if not collection:
-                        return {"success": False, "error": f"Could not create collection '{collection_name}' or use default collection"}
+                return {"success": False, "error": f"Could not create collection '{collection_name}' or use default collection"}
             
             if not text_content.strip():
                 return {"success": False, "error": "Text content is empty"}
             
-            # Create document record in PostgreSQL
-            document_id = str(uuid.uuid4())
-            kb_document = KBDocument(
-                id=document_id,
-                filename=filename,
-                content_type="text/plain",
-                size_bytes=len(text_content.encode('utf-8')),
-                collection_name=actual_collection_name,
-                status="processing"
+            # Create (or resume) document record in PostgreSQL
+            kb_document, start_chunk = self._begin_document(
+                db, document_id, filename, "text/plain", len(text_content.encode('utf-8')), actual_collection_name
+            )
+            document_id = kb_document.id
+            if kb_document.status == "completed":
+                return self._completed_document_result(kb_document, start_time)
+            
+            # Stream chunks through batched embedding and pipelined vector store upserts
+            segments = [TextSegment(text_content, None, 1, 1)]
+            chunks = self._iter_chunks(segments, config.DEFAULT_CHUNK_SIZE)
+            
+            def build_payload(chunk_index: int, chunk: Dict[str, Any]) -> Dict[str, Any]:
+                payload = {
+                    "document_id": document_id,
+                    "filename": filename,
+                    "chunk_index": chunk_index,
+                    "text": chunk["text"],
+                    "collection": actual_collection_name
+                }
+                
+                # Add custom metadata if provided
+                if metadata:
+                    payload.update(metadata)
+                
+                # Metadata may carry its own document_id (the source document),
+                # so keep an unambiguous reference to the KB document
+                payload["kb_document_id"] = document_id
+                return payload
+            
+            ingest_stats = self._ingest_chunks(
+                chunks, actual_collection_name, document_id, build_payload,
+                progress_callback=progress_callback, label=filename, start_chunk=start_chunk
             )
-            db.add(kb_document)
-            
-            # Process text into chunks and create embeddings
-            chunks = self._chunk_text(text_content, config.DEFAULT_CHUNK_SIZE)
-            vectors = []
-            
-            for i, chunk in enumerate(chunks):
-                try:
-                    # Generate embedding using Ollama
-                    embedding = self._generate_embedding(chunk)
-                    
-                    # Merge metadata with default payload
-                    payload = {
-                        "document_id": document_id,
-                        "filename": filename,
-                        "chunk_index": i,
-                        "text": chunk,
-                        "collection": actual_collection_name
-                    }
-                    
-                    # Add custom metadata if provided
-                    if metadata:
-                        payload.update(metadata)
-                    
-                    point = PointStruct(
-                        id=str(uuid.uuid4()),
-                        vector=embedding,
-                        payload=payload
-                    )
-                    vectors.append(point)
-                    
-                except Exception as e:
-                    print(f"Error processing chunk {i}: {e}")
-                    continue
-            
-            # Store vectors in Qdrant
-            if vectors:
-                self.qdrant_client.upsert(
-                    collection_name=actual_collection_name,
-                    points=vectors
-                )
             
             # Update document record
-            kb_document.chunk_count = len(vectors)
+            kb_document.chunk_count = ingest_stats["stored"]
+            kb_document.chunks_flushed = ingest_stats["chunks"]
             kb_document.status = "completed"
             
             # Update collection stats
-            collection.document_count += 1
-            collection.total_size_bytes += len(text_content.encode('utf-8'))
+            self._adjust_collection_totals(db, actual_collection_name, 1, len(text_content.encode('utf-8')))
+            self._count_pending_document(db, actual_collection_name, -1)
             collection.updated_date = datetime.utcnow()
+            self._bump_content_version(db, collection.name)
             
             db.commit()
+            self.collection_registry.collections_changed()
             
             processing_time = time.time() - start_time
             
             return {
                 "success": True,
                 "document_id": document_id,
-                "chunks_created": len(vectors),
+                "chunks_created": ingest_stats["stored"],
                 "processing_time": round(processing_time, 2),
+                "embedding_stats": ingest_stats,
                 "message": f"Text content '{filename}' added successfully to {actual_collection_name}"
             }
             
+        except IngestionCancelled:
+            # Not a failure: the job owning this document decides what to discard
+            db.rollback()
+            self._abort_document(actual_collection_name, document_id, keep_for_resume=resumable)
+            raise
         except Exception as e:
             db.rollback()
             print(f"Error adding text to collection: {e}")
+            self._abort_document(actual_collection_name, document_id, keep_for_resume=resumable)
             processing_time = time.time() - start_time
             return {
                 "success": False, 
@@ -1101,6 +1607,311 @@ Answer:"""
         finally:
             db.close()
 
+    def index_document_revision(self, collection_name: str, source_id: str, text_content: str,
+                                filename: str, metadata: Dict[str, Any] = None,
+                                legacy_match: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Incrementally (re-)index a revision of a source document
+        
+        One KBDocument is kept per source_id. Chunks are identified by content hash,
+        so only new chunks are embedded and upserted, and points for chunks that no
+        longer exist in the revision are deleted. Revisions of the same source are
+        serialized with a transaction-scoped advisory lock.
+        
+        legacy_match optionally identifies points this source created before it was
+        indexed incrementally (payload key -> value, None meaning the key must be
+        absent); they are removed the first time the source is indexed.
+        """
+        db = next(get_db())
+        start_time = time.time()
+        
+        try:
+            collection, actual_collection_name = self._get_or_create_system_collection(db, collection_name)
+            if not collection:
+                return {"success": False, "error": f"Could not create collection '{collection_name}' or use default collection"}
+            
+            if not text_content.strip():
+                return {"success": False, "error": "Text content is empty"}
+            
+            size_bytes = len(text_content.encode('utf-8'))
+            
+            # Serialize concurrent revisions of one source until commit, so two
+            # approvals cannot both miss the KBDocument and each create one
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:lock_key))"),
+                {"lock_key": f"kb_source:{actual_collection_name}:{source_id}"}
+            )
+            kb_document = db.query(KBDocument).filter(
+                KBDocument.source_id == source_id,
+                KBDocument.collection_name == actual_collection_name
+            ).first()
+            is_new_document = kb_document is None
+            
+            if is_new_document:
+                kb_document = KBDocument(
+                    id=str(uuid.uuid4()),
+                    filename=filename,
+                    content_type="text/plain",
+                    size_bytes=0,
+                    collection_name=actual_collection_name,
+                    source_id=source_id,
+                    status="processing"
+                )
+                db.add(kb_document)
+            document_id = kb_document.id
+            
+            # Chunk the revision; point ids are derived from content so unchanged
+            # chunks map onto the points already stored for this source
+            chunks = self._chunk_text(text_content, config.DEFAULT_CHUNK_SIZE)
+            occurrences: Dict[str, int] = {}
+            revision = []
+            for chunk_index, chunk in enumerate(chunks):
+                hash_value = chunk_hash(chunk)
+                occurrence = occurrences.get(hash_value, 0)
+                occurrences[hash_value] = occurrence + 1
+                point_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"docsmait:{source_id}:{hash_value}:{occurrence}"))
+                revision.append((point_id, chunk_index, hash_value, chunk))
+            
+            existing = self._get_source_points(actual_collection_name, source_id)
+            revision_ids = {point_id for point_id, _, _, _ in revision}
+            added = [item for item in revision if item[0] not in existing]
+            removed_ids = [point_id for point_id in existing if point_id not in revision_ids]
+            kept = [item for item in revision if item[0] in existing]
+            
+            base_payload = {
+                "document_id": document_id,
+                "filename": filename,
+                "collection": actual_collection_name
+            }
+            if metadata:
+                base_payload.update(metadata)
+            base_payload["kb_document_id"] = document_id
+            base_payload["source_id"] = source_id
+            
+            # Embed and upsert only the chunks that changed
+            embedding_stats = {}
+            stored = 0
+            if added:
+                embeddings, embedding_stats = self.embedding_service.embed_texts([item[3] for item in added])
+                points = []
+                for (point_id, chunk_index, hash_value, chunk), embedding in zip(added, embeddings):
+                    if embedding is None:
+                        print(f"Error processing chunk {chunk_index + 1} for {filename}: embedding failed")
+                        continue
+                    payload = dict(base_payload)
+                    payload.update({"chunk_index": chunk_index, "chunk_hash": hash_value, "text": chunk})
+                    points.append(VectorPoint(point_id, embedding, payload))
+                if points:
+                    self.vector_store.upsert(actual_collection_name, points)
+                    stored = len(points)
+            
+            # Unchanged chunks keep their vectors; refresh revision metadata and positions
+            if kept:
+                self.vector_store.set_payload(actual_collection_name, base_payload, [item[0] for item in kept])
+                moved = {
+                    point_id: {"chunk_index": chunk_index}
+                    for point_id, chunk_index, _, _ in kept
+                    if existing[point_id] != chunk_index
+                }
+                if moved:
+                    self.vector_store.set_payloads(actual_collection_name, moved)
+            
+            if removed_ids:
+                self.vector_store.delete_points(actual_collection_name, removed_ids)
+                self.lexical_index.delete_points(removed_ids)
+            
+            self.lexical_index.add_chunks(actual_collection_name, [
+                self._lexical_row(point_id, dict(base_payload, chunk_index=chunk_index, text=chunk))
+                for point_id, chunk_index, _, chunk in revision
+            ])
+            
+            if is_new_document and legacy_match:
+                self._delete_legacy_points(db, actual_collection_name, source_id, legacy_match)
+            
+            # Update document record and collection stats
+            previous_size = kb_document.size_bytes or 0
+            kb_document.filename = filename
+            kb_document.size_bytes = size_bytes
+            kb_document.chunk_count = len(kept) + stored
+            kb_document.upload_date = datetime.utcnow()
+            kb_document.status = "completed"
+            
+            self._adjust_collection_totals(
+                db, actual_collection_name, 1 if is_new_document else 0, size_bytes - previous_size
+            )
+            collection.last_document_at = kb_document.upload_date
+            collection.updated_date = datetime.utcnow()
+            self._bump_content_version(db, collection.name)
+            
+            db.commit()
+            self.collection_registry.collections_changed()
+            
+            processing_time = time.time() - start_time
+            print(f"Indexed {filename} ({source_id}): {len(kept)} unchanged, {stored} added, "
+                  f"{len(removed_ids)} removed chunks in {processing_time:.2f}s")
+            
+            return {
+                "success": True,
+                "document_id": document_id,
+                "chunks_total": len(revision),
+                "chunks_unchanged": len(kept),
+                "chunks_added": stored,
+                "chunks_removed": len(removed_ids),
+                "processing_time": round(processing_time, 2),
+                "embedding_stats": embedding_stats,
+                "message": f"Text content '{filename}' indexed in {actual_collection_name}"
+            }
+            
+        except Exception as e:
+            db.rollback()
+            print(f"Error indexing document revision: {e}")
+            processing_time = time.time() - start_time
+            return {
+                "success": False,
+                "error": f"Failed to index document revision: {str(e)}",
+                "processing_time": round(processing_time, 2)
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def _bump_content_version(db: Session, collection_name: str) -> None:
+        """
+        Mark collection content as changed so cached answers for it are ignored
+        
+        An in-place UPDATE, so two concurrent commits always yield two distinct versions.
+        """
+        db.query(KBCollection).filter(KBCollection.name == collection_name).update({
+            KBCollection.content_version: func.coalesce(KBCollection.content_version, 0) + 1
+        }, synchronize_session=False)
+
+    @staticmethod
+    def _adjust_collection_totals(db: Session, collection_name: str, documents: int, size_bytes: int) -> None:
+        """
+        Adjust the collection's indexed document count and total size
+        
+        Runs as an in-place UPDATE in the caller's transaction, so concurrent
+        writers (ingestion jobs, re-indexing, deletes) cannot lose each other's updates.
+        """
+        db.query(KBCollection).filter(KBCollection.name == collection_name).update({
+            KBCollection.document_count: func.greatest(
+                func.coalesce(KBCollection.document_count, 0) + documents, 0
+            ),
+            KBCollection.total_size_bytes: func.greatest(
+                func.coalesce(KBCollection.total_size_bytes, 0) + size_bytes, 0
+            )
+        }, synchronize_session=False)
+
+    @staticmethod
+    def _count_pending_document(db: Session, collection_name: str, delta: int) -> None:
+        """
+        Adjust the collection's pending (processing or failed) document counter
+        
+        Runs as an in-place UPDATE in the caller's transaction. A new document
+        also becomes the collection's last_document_at.
+        """
+        values = {
+            KBCollection.pending_document_count: func.greatest(
+                func.coalesce(KBCollection.pending_document_count, 0) + delta, 0
+            )
+        }
+        if delta > 0:
+            values[KBCollection.last_document_at] = func.now()
+        db.query(KBCollection).filter(KBCollection.name == collection_name).update(
+            values, synchronize_session=False
+        )
+
+    def _get_collection_cache_key(self, collection_name: str):
+        """Return ((collection id, name), content version) for answer caching, or (None, None)"""
+        collection = self.collection_registry.get(collection_name)
+        if not collection:
+            return None, None
+        return (collection["id"], collection_name), collection["content_version"]
+
+    def _get_or_create_system_collection(self, db: Session, collection_name: str):
+        """Get collection for system-generated content, auto-creating it or falling back to default"""
+        collection = db.query(KBCollection).filter(KBCollection.name == collection_name).first()
+        if collection:
+            return collection, collection_name
+        
+        # Try to auto-create collection for specific types
+        create_result = self.create_collection(
+            name=collection_name,
+            description=f"Auto-created collection for {collection_name}",
+            created_by="system",
+            tags=["auto-created"]
+        )
+        if create_result.get("success"):
+            return db.query(KBCollection).filter(KBCollection.name == collection_name).first(), collection_name
+        
+        # Creation failed, fallback to default collection
+        actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
+        collection = db.query(KBCollection).filter(KBCollection.name == actual_collection_name).first()
+        return collection, actual_collection_name
+
+    def _get_source_points(self, collection_name: str, source_id: str) -> Dict[str, int]:
+        """Return {point_id: chunk_index} for all points indexed for a source document"""
+        source_filter = {"must": [{"key": "source_id", "match": {"value": source_id}}]}
+        points: Dict[str, int] = {}
+        offset = None
+        while True:
+            records, offset = self.vector_store.scroll(
+                collection_name, scroll_filter=source_filter, limit=256, offset=offset
+            )
+            for record in records:
+                points[record.id] = record.payload.get("chunk_index")
+            if offset is None:
+                break
+        return points
+
+    def _delete_legacy_points(self, db: Session, collection_name: str, source_id: str,
+                              legacy_match: Dict[str, Any]) -> None:
+        """
+        Delete what a source wrote before incremental indexing (one copy per approval)
+        
+        Removes the legacy points, their KBDocument rows and lexical chunks, and takes
+        the documents out of the collection stats in the caller's transaction.
+        """
+        must = [{"is_empty": {"key": "source_id"}}]
+        for key, value in legacy_match.items():
+            if value is None:
+                must.append({"is_empty": {"key": key}})
+            else:
+                must.append({"key": key, "match": {"value": value}})
+        legacy_filter = {"must": must}
+        
+        legacy_document_ids = set()
+        offset = None
+        while True:
+            records, offset = self.vector_store.scroll(
+                collection_name, scroll_filter=legacy_filter, limit=256, offset=offset
+            )
+            for record in records:
+                kb_document_id = record.payload.get("kb_document_id")
+                if kb_document_id:
+                    legacy_document_ids.add(kb_document_id)
+            if offset is None:
+                break
+        
+        try:
+            self.vector_store.delete_by_filter(collection_name, legacy_filter)
+        except Exception as e:
+            print(f"Error removing legacy vectors for {source_id}: {e}")
+        
+        if not legacy_document_ids:
+            return
+        legacy_documents = db.query(KBDocument).filter(
+            KBDocument.id.in_(legacy_document_ids),
+            KBDocument.collection_name == collection_name
+        ).all()
+        for document in legacy_documents:
+            if document.status == "completed":
+                self._adjust_collection_totals(db, collection_name, -1, -(document.size_bytes or 0))
+            else:
+                self._count_pending_document(db, collection_name, -1)
+            db.delete(document)
+            self.lexical_index.delete_document(document.id)
+
     def set_default_collection(self, collection_name: str) -> Dict[str, Any]:
         """Set a collection as the default collection"""
         db = next(get_db())
@@ -1121,6 +1932,7 @@ Answer:"""
             self.update_config("default_collection", collection_name)
             
             db.commit()
+            self.collection_registry.collections_changed()
             
             return {
                 "success": True,
@@ -1134,8 +1946,9 @@ Answer:"""
         finally:
             db.close()
 
-    def update_collection(self, collection_name: str, description: str = None, tags: List[str] = None) -> Dict[str, Any]:
-        """Update collection metadata"""
+    def update_collection(self, collection_name: str, description: str = None, tags: List[str] = None,
+                          quantization: str = None) -> Dict[str, Any]:
+        """Update collection metadata; a new quantization mode re-encodes the stored vectors"""
         db = next(get_db())
         try:
             # Check if collection exists
@@ -1148,9 +1961,15 @@ Answer:"""
                 collection.description = description
             if tags is not None:
                 collection.tags = tags
+            if quantization is not None and quantization != (collection.vector_quantization or "none"):
+                if quantization not in QUANTIZATION_MODES:
+                    return {"success": False, "error": f"Unknown quantization '{quantization}' (expected one of {', '.join(QUANTIZATION_MODES)})"}
+                self.vector_store.set_quantization(collection_name, quantization)
+                collection.vector_quantization = quantization
             
             collection.updated_date = datetime.utcnow()
             db.commit()
+            self.collection_registry.collections_changed()
             
             return {
                 "success": True,
@@ -1160,6 +1979,7 @@ Answer:"""
                     "description": collection.description,
                     "tags": collection.tags or [],
                     "is_default": collection.is_default,
+                    "vector_quantization": collection.vector_quantization or "none",
                     "document_count": collection.document_count,
                     "total_size_bytes": collection.total_size_bytes,
                     "created_date": collection.created_date.isoformat(),
@@ -1213,11 +2033,14 @@ Answer:"""
             # Delete the collection itself
             db.delete(collection)
             
-            # Delete Qdrant collection
+            # Delete vector collection
             try:
-                self.qdrant_client.delete_collection(collection_name)
+                self.vector_store.delete_collection(collection_name)
             except Exception as e:
-                print(f"Warning: Failed to delete Qdrant collection '{collection_name}': {e}")
+                print(f"Warning: Failed to delete vector collection '{collection_name}': {e}")
+            
+            self.answer_cache.invalidate_collection(collection_name)
+            self.lexical_index.delete_collection(collection_name)
             
             # If this was the default collection, set another one as default
             if collection.is_default:
@@ -1231,6 +2054,7 @@ Answer:"""
                     self.update_config("default_collection", "")
             
             db.commit()
+            self.collection_registry.collections_changed()
             
             return {
                 "success": True,
@@ -1246,6 +2070,12 @@ Answer:"""
 
     # ========== Training Methods ==========
     
+    def _topic_collections(self, topics: List[str]) -> List[str]:
+        """Collection names for training topics, resolved in one lookup (unknown topics use the default collection)"""
+        requested = [topic.replace(' ', '_').lower() for topic in topics]
+        resolved = self._resolve_collection_names(requested)
+        return list(dict.fromkeys(resolved[name] for name in requested if resolved[name]))
+
     def generate_learning_content_multi_topics(self, topics: List[str]) -> Dict[str, Any]:
         """Generate comprehensive learning content from multiple KB collections based on topics"""
         try:
@@ -1255,17 +2085,8 @@ Answer:"""
                     "error": "No topics provided"
                 }
             
-            # Get available collections
-            collections = self.get_collections()
-            available_collections = [c['name'] for c in collections]
-            
             # Validate topics and convert to collection names (with fallback)
-            valid_collections = []
-            for topic in topics:
-                collection_name = topic.replace(' ', '_').lower()
-                actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
-                if actual_collection_name not in valid_collections:  # Avoid duplicates
-                    valid_collections.append(actual_collection_name)
+            valid_collections = self._topic_collections(topics)
             
             if not valid_collections:
                 return {
@@ -1273,15 +2094,16 @@ Answer:"""
                     "error": f"No valid knowledge base collections found for topics: {', '.join(topics)}"
                 }
             
-            # Combine content from all selected collections
+            # Combine content from all selected collections (searched concurrently)
             all_content = []
             seen_content = set()
             total_source_docs = 0
             
-            for collection_name in valid_collections:
-                # Query content from each collection
-                query_result = self.query_collection(collection_name, f"overview of {collection_name.replace('_', ' ')}", limit=20)
-                
+            query_results = self.search_collections(
+                [(collection_name, f"overview of {collection_name.replace('_', ' ')}") for collection_name in valid_collections],
+                limit=20
+            )
+            for query_result in query_results:
                 if query_result.get("success"):
                     for result in query_result.get("results", []):
                         content = result.get("text", "").strip()
@@ -1447,7 +2269,7 @@ Take the assessment to test your knowledge of this material.
             }
     
     def generate_assessment_questions_multi_topics(self, topics: List[str], num_questions: int = 20) -> Dict[str, Any]:
-        """Generate True/False questions from multiple KB collections"""
+        """Sample True/False questions from the question banks of multiple KB collections"""
         try:
             if not topics:
                 return {
@@ -1455,17 +2277,8 @@ Take the assessment to test your knowledge of this material.
                     "error": "No topics provided"
                 }
             
-            # Get available collections
-            collections = self.get_collections()
-            available_collections = [c['name'] for c in collections]
-            
             # Validate topics and convert to collection names (with fallback)
-            valid_collections = []
-            for topic in topics:
-                collection_name = topic.replace(' ', '_').lower()
-                actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
-                if actual_collection_name not in valid_collections:  # Avoid duplicates
-                    valid_collections.append(actual_collection_name)
+            valid_collections = self._topic_collections(topics)
             
             if not valid_collections:
                 return {
@@ -1473,252 +2286,61 @@ Take the assessment to test your knowledge of this material.
                     "error": f"No valid knowledge base collections found for topics: {', '.join(topics)}"
                 }
             
-            # Collect content from all selected collections
-            content_pieces = []
-            for collection_name in valid_collections:
-                # Query diverse content from each collection
-                query_result = self.query_collection(collection_name, f"information about {collection_name.replace('_', ' ')}", limit=15)
-                
-                if query_result.get("success"):
-                    for result in query_result.get("results", []):
-                        content = result.get("text", "").strip()
-                        if content and len(content) > 50:  # Only meaningful content
-                            content_pieces.append(content)
-            
-            if len(content_pieces) < 3:
+            # Banks are generated in the background; requests never wait on the LLM
+            sample = self.question_bank_service.sample_questions(valid_collections, num_questions)
+            if not sample["questions"]:
                 return {
                     "success": False,
-                    "error": f"Insufficient content found for generating questions about topics: {', '.join(topics)}"
+                    "error": f"Assessment questions for {', '.join(topics)} are still being prepared. Please try again in a few minutes.",
+                    "pending_collections": sample["pending_collections"]
                 }
             
-            # Generate questions using AI
-            topics_str = ", ".join(topics)
-            questions_prompt = f"""Create exactly {min(num_questions, 20)} True/False questions based on content about these topics: {topics_str}.
-
-Requirements:
-- Questions should cover all topics proportionally
-- Each question should be clear and unambiguous
-- Mix of True and False answers (roughly 50/50 split)
-- Questions should test key concepts and facts across topics
-- Include some questions that test connections between topics
-- Avoid overly complex or trick questions
-- Focus on important information that learners should know
-
-Content to base questions on:
-{chr(10).join(content_pieces[:12])}
-
-Format your response as a JSON array with this exact structure:
-[
-  {{"question": "Question text here", "answer": true}},
-  {{"question": "Another question", "answer": false}}
-]
-
-Provide only the JSON array, no other text."""
-
-            ai_response = self.ai_service.generate_response(questions_prompt, max_tokens=2000)
-            
-            questions = []
-            
-            if ai_response.get("success"):
-                try:
-                    # Try to parse AI response as JSON
-                    response_text = ai_response.get("response", "")
-                    # Extract JSON if wrapped in text
-                    if response_text.strip().startswith('['):
-                        json_start = response_text.find('[')
-                        json_end = response_text.rfind(']') + 1
-                        json_str = response_text[json_start:json_end]
-                        ai_questions = json.loads(json_str)
-                        
-                        # Convert to our format
-                        for i, q in enumerate(ai_questions[:num_questions]):
-                            if isinstance(q, dict) and 'question' in q and 'answer' in q:
-                                question_id = str(uuid.uuid4())
-                                questions.append({
-                                    "id": question_id,
-                                    "question": q['question'],
-                                    "correct_answer": bool(q['answer'])
-                                })
-                                
-                except (json.JSONDecodeError, KeyError, TypeError) as e:
-                    print(f"Failed to parse AI questions: {e}")
-                    questions = []
-            
-            # Fallback: Generate basic questions from topics
-            if len(questions) < min(5, num_questions):
-                fallback_questions = []
-                for topic in topics[:3]:  # Use first 3 topics for fallback
-                    fallback_questions.extend([
-                        {
-                            "id": str(uuid.uuid4()),
-                            "question": f"{topic} content is important for compliance and quality management.",
-                            "correct_answer": True
-                        },
-                        {
-                            "id": str(uuid.uuid4()),
-                            "question": f"{topic} documents should be regularly reviewed and updated.",
-                            "correct_answer": True
-                        },
-                        {
-                            "id": str(uuid.uuid4()),
-                            "question": f"{topic} documents require no approval process.",
-                            "correct_answer": False
-                        }
-                    ])
-                
-                # Add fallback questions if we don't have enough
-                needed = min(num_questions, 20) - len(questions)
-                questions.extend(fallback_questions[:needed])
-            
-            # Ensure we don't exceed requested number
-            questions = questions[:num_questions]
-            
             return {
                 "success": True,
                 "topics": topics,
-                "questions": questions,
-                "total_questions": len(questions)
+                "questions": sample["questions"],
+                "total_questions": len(sample["questions"]),
+                "pending_collections": sample["pending_collections"]
             }
             
         except Exception as e:
-            print(f"Error generating multi-topic assessment questions: {e}")
+            print(f"Error sampling multi-topic assessment questions: {e}")
             return {
                 "success": False,
                 "error": f"Failed to generate assessment questions: {str(e)}"
             }
 
     def generate_assessment_questions(self, document_type: str, num_questions: int = 20) -> Dict[str, Any]:
-        """Generate True/False questions from KB collection"""
+        """Sample True/False questions from a KB collection's question bank"""
         try:
             # Clean collection name and get actual collection (with fallback)
             collection_name = document_type.replace(' ', '_').lower()
             actual_collection_name = self._ensure_collection_exists_or_get_default(collection_name)
             
-            # Query diverse content from the collection
-            query_result = self.query_collection(actual_collection_name, f"information about {document_type}", limit=30)
-            
-            if not query_result.get("success"):
-                return {
-                    "success": False,
-                    "error": "Failed to retrieve content from knowledge base"
-                }
-            
-            # Collect content for question generation
-            content_pieces = []
-            for result in query_result.get("results", []):
-                content = result.get("text", "").strip()
-                if content and len(content) > 50:  # Only meaningful content
-                    content_pieces.append(content)
-            
-            if len(content_pieces) < 3:
+            sample = self.question_bank_service.sample_questions([actual_collection_name], num_questions)
+            if not sample["questions"]:
                 return {
                     "success": False,
-                    "error": f"Insufficient content found for generating questions about '{document_type}'"
+                    "error": f"Assessment questions for '{document_type}' are still being prepared. Please try again in a few minutes.",
+                    "pending_collections": sample["pending_collections"]
                 }
             
-            # Generate questions using AI
-            questions_prompt = f"""Create exactly {min(num_questions, 20)} True/False questions based on the following content about {document_type}.
-
-Requirements:
-- Each question should be clear and unambiguous
-- Mix of True and False answers (roughly 50/50 split)
-- Questions should test key concepts and facts
-- Avoid overly complex or trick questions
-- Focus on important information that learners should know
-
-Content to base questions on:
-{chr(10).join(content_pieces[:8])}
-
-Format your response as a JSON array with this exact structure:
-[
-  {{"question": "Question text here", "answer": true}},
-  {{"question": "Another question", "answer": false}}
-]
-
-Provide only the JSON array, no other text."""
-
-            ai_response = self.ai_service.generate_response(questions_prompt, max_tokens=1500)
-            
-            questions = []
-            
-            if ai_response.get("success"):
-                try:
-                    # Try to parse AI response as JSON
-                    response_text = ai_response.get("response", "")
-                    # Extract JSON if wrapped in text
-                    if response_text.strip().startswith('['):
-                        json_start = response_text.find('[')
-                        json_end = response_text.rfind(']') + 1
-                        json_str = response_text[json_start:json_end]
-                        ai_questions = json.loads(json_str)
-                        
-                        # Convert to our format
-                        for i, q in enumerate(ai_questions[:num_questions]):
-                            if isinstance(q, dict) and 'question' in q and 'answer' in q:
-                                question_id = str(uuid.uuid4())
-                                questions.append({
-                                    "id": question_id,
-                                    "question": q['question'],
-                                    "correct_answer": bool(q['answer'])
-                                })
-                                
-                except (json.JSONDecodeError, KeyError, TypeError) as e:
-                    print(f"Failed to parse AI questions: {e}")
-                    questions = []
-            
-            # Fallback: Generate basic questions from content
-            if len(questions) < min(5, num_questions):
-                fallback_questions = [
-                    {
-                        "id": str(uuid.uuid4()),
-                        "question": f"{document_type} documents are important for compliance and quality management.",
-                        "correct_answer": True
-                    },
-                    {
-                        "id": str(uuid.uuid4()),
-                        "question": f"{document_type} content should be regularly reviewed and updated.",
-                        "correct_answer": True
-                    },
-                    {
-                        "id": str(uuid.uuid4()),
-                        "question": f"{document_type} documents require no approval process.",
-                        "correct_answer": False
-                    },
-                    {
-                        "id": str(uuid.uuid4()),
-                        "question": f"All {document_type} documents must follow the same format regardless of content.",
-                        "correct_answer": False
-                    },
-                    {
-                        "id": str(uuid.uuid4()),
-                        "question": f"{document_type} documents help maintain organizational knowledge.",
-                        "correct_answer": True
-                    }
-                ]
-                
-                # Add fallback questions if we don't have enough
-                needed = min(num_questions, 20) - len(questions)
-                questions.extend(fallback_questions[:needed])
-            
-            # Ensure we don't exceed requested number
-            questions = questions[:num_questions]
-            
             return {
                 "success": True,
                 "document_type": document_type,
-                "questions": questions,
-                "total_questions": len(questions)
+                "questions": sample["questions"],
+                "total_questions": len(sample["questions"])
             }
             
         except Exception as e:
-            print(f"Error generating assessment questions: {e}")
+            print(f"Error sampling assessment questions: {e}")
             return {
                 "success": False,
                 "error": f"Failed to generate assessment questions: {str(e)}"
             }
     
     def evaluate_assessment(self, question_ids: List[str], answers: List[bool], user_id: int) -> Dict[str, Any]:
-        """Evaluate submitted assessment answers"""
+        """Evaluate submitted assessment answers against the stored question bank answers"""
         try:
             if len(question_ids) != len(answers):
                 return {
@@ -1726,27 +2348,28 @@ Provide only the JSON array, no other text."""
                     "error": "Number of questions and answers must match"
                 }
             
-            # This is a simplified implementation
-            # In a real system, you'd store questions and retrieve correct answers
-            # For now, we'll simulate scoring based on typical assessment patterns
+            if not question_ids:
+                return {
+                    "success": False,
+                    "error": "No answers submitted"
+                }
             
-            total_questions = len(answers)
+            answer_key = self.question_bank_service.get_answer_key(question_ids)
+            unknown = [question_id for question_id in question_ids if question_id not in answer_key]
+            if unknown:
+                return {
+                    "success": False,
+                    "error": f"{len(unknown)} of the submitted questions are no longer available. Please start a new assessment."
+                }
             
-            # Simulate realistic scoring (this would normally check against stored correct answers)
-            # For demonstration, assume roughly 70-85% correct for random answers with some knowledge
+            total_questions = len(answers)
             correct_count = 0
             correct_answers = []
             questions_with_answers = []
             
-            # In a real implementation, you'd retrieve stored questions by ID
-            # For now, simulate results
-            import random
-            random.seed(hash(str(question_ids)) + user_id)  # Consistent results per user/question set
-            
-            for i, (question_id, user_answer) in enumerate(zip(question_ids, answers)):
-                # Simulate correct answer (this would come from database in real implementation)
-                simulated_correct = random.choice([True, False])
-                is_correct = user_answer == simulated_correct
+            for question_id, user_answer in zip(question_ids, answers):
+                correct_answer = answer_key[question_id]
+                is_correct = user_answer == correct_answer
                 
                 if is_correct:
                     correct_count += 1
@@ -1755,7 +2378,7 @@ Provide only the JSON array, no other text."""
                 questions_with_answers.append({
                     "question_id": question_id,
                     "user_answer": user_answer,
-                    "correct_answer": simulated_correct,
+                    "correct_answer": correct_answer,
                     "is_correct": is_correct
                 })
             
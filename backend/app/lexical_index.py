@@ -0,0 +1,165 @@
+# backend/app/lexical_index.py
+"""
+Lexical Index for Docsmait Knowledge Base
+
+PostgreSQL full-text index over KB chunk text:
+- One kb_chunks row per Qdrant point, written at ingest time
+- tsvector column generated by PostgreSQL, searched through a GIN index
+- Answers keyword and identifier queries ("REQ-042", "ISO 14971 clause 7")
+  without an embedding round-trip
+- Reciprocal rank fusion for hybrid lexical + vector rankings
+"""
+import logging
+import re
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import String, cast, func
+from sqlalchemy.dialects.postgresql import TSQUERY, insert
+
+from .config import config
+from .database_config import get_db
+from .db_models import KBChunk
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEARCH_CONFIG = "english"  # Must match the kb_chunks.search_vector expression
+
+# Requirement ids, standard numbers and clause references: REQ-042, ISO 14971, IEC 62304 5.1
+_IDENTIFIER_PATTERN = re.compile(r"\b[A-Za-z]{2,}[-_ ]?\d+(?:[.\-]\d+)*\b|\b\d+(?:\.\d+)+\b")
+
+
+def looks_like_identifier_query(query: str) -> bool:
+    """Short queries naming an identifier are better served lexically"""
+    return len(query.split()) <= 6 and bool(_IDENTIFIER_PATTERN.search(query))
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """Fuse ranked result lists (keyed by point_id) by summing 1 / (k + rank)"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            entry = fused.setdefault(result["point_id"], dict(result, score=0.0))
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda result: result["score"], reverse=True)
+
+
+class LexicalIndex:
+    """Full-text index of KB chunks in PostgreSQL"""
+
+    def __init__(self):
+        self.enabled = config.KB_LEXICAL_INDEX_ENABLED
+
+    def add_chunks(self, collection_name: str, chunks: List[Dict[str, Any]]) -> None:
+        """
+        Index chunks (point_id, kb_document_id, filename, chunk_index, text, page_start, page_end)
+
+        Existing rows are updated so replays and re-indexed revisions stay consistent.
+        """
+        if not self.enabled or not chunks:
+            return
+
+        db = next(get_db())
+        try:
+            rows = [{
+                "point_id": chunk["point_id"],
+                "collection_name": collection_name,
+                "kb_document_id": chunk.get("kb_document_id"),
+                "filename": chunk.get("filename"),
+                "chunk_index": chunk.get("chunk_index"),
+                "page_start": chunk.get("page_start"),
+                "page_end": chunk.get("page_end"),
+                "text": chunk["text"]
+            } for chunk in chunks]
+            statement = insert(KBChunk).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=[KBChunk.point_id],
+                set_={
+                    "collection_name": statement.excluded.collection_name,
+                    "kb_document_id": statement.excluded.kb_document_id,
+                    "filename": statement.excluded.filename,
+                    "chunk_index": statement.excluded.chunk_index,
+                    "page_start": statement.excluded.page_start,
+                    "page_end": statement.excluded.page_end,
+                    "text": statement.excluded.text
+                }
+            )
+            db.execute(statement)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Lexical index update failed for '{collection_name}': {e}")
+        finally:
+            db.close()
+
+    def delete_points(self, point_ids: List[str]) -> None:
+        self._delete(KBChunk.point_id.in_(point_ids), f"{len(point_ids)} points")
+
+    def delete_document(self, kb_document_id: str) -> None:
+        self._delete(KBChunk.kb_document_id == kb_document_id, f"document {kb_document_id}")
+
+    def delete_collection(self, collection_name: str) -> None:
+        self._delete(KBChunk.collection_name == collection_name, f"collection '{collection_name}'")
+
+    def search(self, collection_name: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank chunks of a collection by full-text relevance
+
+        All query terms must match first; if nothing does, any term may match.
+        """
+        if not self.enabled or not query.strip():
+            return []
+
+        db = next(get_db())
+        try:
+            strict_query = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, query)
+            results = self._ranked(db, collection_name, strict_query, limit)
+            if not results:
+                any_term_query = cast(
+                    func.replace(cast(func.plainto_tsquery(TEXT_SEARCH_CONFIG, query), String), "&", "|"),
+                    TSQUERY
+                )
+                results = self._ranked(db, collection_name, any_term_query, limit)
+            return results
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Lexical search failed for '{collection_name}': {e}")
+            return []
+        finally:
+            db.close()
+
+    def _ranked(self, db, collection_name: str, ts_query, limit: int) -> List[Dict[str, Any]]:
+        rank = func.ts_rank_cd(KBChunk.search_vector, ts_query)
+        rows = db.query(
+            KBChunk.point_id, KBChunk.text, KBChunk.filename, KBChunk.kb_document_id,
+            KBChunk.chunk_index, KBChunk.page_start, KBChunk.page_end, rank.label("rank")
+        ).filter(
+            KBChunk.collection_name == collection_name,
+            KBChunk.search_vector.op("@@")(ts_query)
+        ).order_by(rank.desc()).limit(limit).all()
+        return [{
+            "point_id": row.point_id,
+            "score": float(row.rank),
+            "text": row.text,
+            "filename": row.filename or "",
+            "document_id": row.kb_document_id or "",
+            "chunk_index": row.chunk_index or 0,
+            "page_start": row.page_start,
+            "page_end": row.page_end
+        } for row in rows]
+
+    def _delete(self, condition, label: str) -> None:
+        if not self.enabled:
+            return
+        db = next(get_db())
+        try:
+            db.query(KBChunk).filter(condition).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Lexical index cleanup failed for {label}: {e}")
+        finally:
+            db.close()
+
+
+# Create global lexical index instance
+lexical_index = LexicalIndex()
@@ -0,0 +1,231 @@
+# backend/app/llm_scheduler.py
+"""
+LLM Scheduler for Docsmait
+
+Admission control in front of Ollama, which only serves OLLAMA_NUM_PARALLEL
+requests per model at once:
+- Per-class FIFO queues, served in priority order:
+  interactive (KB chat, AI assist) > batch (training content, automated
+  review) > background (question banks, ingestion embeddings)
+- At most OLLAMA_NUM_PARALLEL calls in flight, with slots reserved for
+  interactive traffic so long batch work cannot occupy all of them
+- Bounded queues: a caller that would exceed its class bound is rejected
+  with LLMQueueFullError carrying an estimated retry-after
+- Queue-time and occupancy metrics per class
+
+Slots work from both worker threads (blocking) and event loops (awaitable),
+so the sync Ollama client, AIService and background workers share one queue.
+Generation and embedding models are scheduled separately, as Ollama applies
+OLLAMA_NUM_PARALLEL per loaded model.
+"""
+import asyncio
+import logging
+import math
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ["interactive", "batch", "background"]
+
+
+class LLMQueueFullError(Exception):
+    """Raised when a priority class queue is at its bound"""
+
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(f"The AI service is busy ({priority} queue full), retry in {retry_after}s")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued caller, woken through a threading.Event or an asyncio future"""
+
+    __slots__ = ("priority", "enqueued_at", "event", "loop", "future", "granted")
+
+    def __init__(self, priority: str, loop: Optional[asyncio.AbstractEventLoop]):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+
+    def wake(self) -> bool:
+        if self.loop is None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            return False  # Event loop already closed; nobody is waiting any more
+        return True
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class LLMScheduler:
+    """Priority admission queue limiting concurrent calls to one Ollama model"""
+
+    def __init__(self, name: str, max_concurrency: int, reserved_interactive: int, queue_limits: Dict[str, int]):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        # Batch and background together may use the slots not reserved for interactive calls
+        self.shared_limit = max(1, self.max_concurrency - max(0, reserved_interactive))
+        self.queue_limits = {priority: max(0, queue_limits.get(priority, 0)) for priority in PRIORITY_CLASSES}
+        self._lock = threading.Lock()
+        self._queues = {priority: deque() for priority in PRIORITY_CLASSES}
+        self._running = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._wait_samples = {priority: deque(maxlen=200) for priority in PRIORITY_CLASSES}
+        self._service_samples = deque(maxlen=50)
+        self._counters = {priority: {"admitted": 0, "queued": 0, "rejected": 0} for priority in PRIORITY_CLASSES}
+
+    # ========== Admission ==========
+
+    @contextmanager
+    def slot(self, priority: str) -> Iterator[float]:
+        """Blocking slot for worker threads; yields the seconds spent queued"""
+        waiter = self._enter(priority, None)
+        if waiter is not None:
+            waiter.event.wait()
+        start = time.monotonic()
+        try:
+            yield start - waiter.enqueued_at if waiter else 0.0
+        finally:
+            self._release(priority, time.monotonic() - start)
+
+    @asynccontextmanager
+    async def async_slot(self, priority: str) -> AsyncIterator[float]:
+        """Awaitable slot for coroutines (on any event loop); yields the seconds spent queued"""
+        waiter = self._enter(priority, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+        start = time.monotonic()
+        try:
+            yield start - waiter.enqueued_at if waiter else 0.0
+        finally:
+            self._release(priority, time.monotonic() - start)
+
+    def _enter(self, priority: str, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Waiter]:
+        """Take a free slot (returns None) or enqueue a waiter; raises LLMQueueFullError at the bound"""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown LLM priority class '{priority}' (expected one of {PRIORITY_CLASSES})")
+        with self._lock:
+            # Callers never overtake queued work of the same or a higher class
+            ahead = sum(len(self._queues[p]) for p in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(priority) + 1])
+            if ahead == 0 and self._can_run(priority):
+                self._grant(priority, 0.0)
+                return None
+            limit = self.queue_limits[priority]
+            if limit and len(self._queues[priority]) >= limit:
+                self._counters[priority]["rejected"] += 1
+                retry_after = self._estimate_retry_after(ahead)
+                logger.warning(f"{self.name} scheduler rejected a {priority} call, retry after {retry_after}s")
+                raise LLMQueueFullError(priority, retry_after)
+            waiter = _Waiter(priority, loop)
+            self._queues[priority].append(waiter)
+            self._counters[priority]["queued"] += 1
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Forget a cancelled waiter, giving back its slot if it was granted meanwhile"""
+        with self._lock:
+            if not waiter.granted:
+                self._queues[waiter.priority].remove(waiter)
+                self._dispatch()  # Lower classes may have been held back by this waiter
+                return
+        self._release(waiter.priority, None)
+
+    def _release(self, priority: str, service_seconds: Optional[float]) -> None:
+        with self._lock:
+            self._running[priority] -= 1
+            if service_seconds is not None:
+                self._service_samples.append(service_seconds)
+            self._dispatch()
+
+    def _can_run(self, priority: str) -> bool:
+        if sum(self._running.values()) >= self.max_concurrency:
+            return False
+        if priority == "interactive":
+            return True
+        return self._running["batch"] + self._running["background"] < self.shared_limit
+
+    def _grant(self, priority: str, wait_seconds: float) -> None:
+        self._running[priority] += 1
+        self._counters[priority]["admitted"] += 1
+        self._wait_samples[priority].append(wait_seconds)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued waiters in priority order (caller holds the lock)"""
+        now = time.monotonic()
+        for priority in PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            while queue and self._can_run(priority):
+                waiter = queue.popleft()
+                if waiter.wake():
+                    waiter.granted = True
+                    self._grant(priority, now - waiter.enqueued_at)
+
+    def _estimate_retry_after(self, ahead: int) -> int:
+        """Seconds until a caller behind `ahead` queued calls would likely start"""
+        service_seconds = statistics.mean(self._service_samples) if self._service_samples else 10.0
+        return max(1, math.ceil((ahead + 1) * service_seconds / self.max_concurrency))
+
+    # ========== Metrics ==========
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                waits = sorted(self._wait_samples[priority])
+                classes[priority] = {
+                    "running": self._running[priority],
+                    "queued_now": len(self._queues[priority]),
+                    "queue_limit": self.queue_limits[priority] or None,
+                    **self._counters[priority],
+                    "queue_time_ms": {
+                        "samples": len(waits),
+                        "p50": round(statistics.median(waits) * 1000, 1) if waits else None,
+                        "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else None,
+                        "max": round(waits[-1] * 1000, 1) if waits else None
+                    }
+                }
+            service_seconds = statistics.mean(self._service_samples) if self._service_samples else None
+            return {
+                "name": self.name,
+                "max_concurrency": self.max_concurrency,
+                "shared_limit": self.shared_limit,
+                "running": sum(self._running.values()),
+                "avg_service_seconds": round(service_seconds, 2) if service_seconds is not None else None,
+                "classes": classes
+            }
+
+
+def _create_scheduler(name: str) -> LLMScheduler:
+    return LLMScheduler(
+        name,
+        config.OLLAMA_NUM_PARALLEL,
+        config.LLM_SCHEDULER_RESERVED_INTERACTIVE_SLOTS,
+        {
+            "interactive": config.LLM_SCHEDULER_INTERACTIVE_QUEUE_LIMIT,
+            "batch": config.LLM_SCHEDULER_BATCH_QUEUE_LIMIT,
+            "background": config.LLM_SCHEDULER_BACKGROUND_QUEUE_LIMIT
+        }
+    )
+
+
+# Create global scheduler instances (chat/generation model, embedding model)
+llm_scheduler = _create_scheduler("generation")
+embedding_scheduler = _create_scheduler("embedding")
@@ -0,0 +1,184 @@
+# backend/app/long_document.py
+"""
+Long Document Support for Docsmait AI document assistance
+
+Documents longer than the AI context window are processed map-reduce style
+by AIService instead of being truncated:
+- split_sections: cuts the document at markdown headings, then packs or
+  splits the pieces into sections that fit the context window
+- Per-section analysis results are cached by section hash, so re-running
+  after a small edit only recomputes the sections whose text changed
+- Prompts for the map (per section) and reduce (combine) steps
+- reduce_partials: condenses the per-section findings in a bounded number
+  of rounds until they fit the context window
+
+Section boundaries follow headings wherever possible, which keeps them
+stable across edits: changing a paragraph only moves boundaries within its
+own heading block.
+"""
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cache_utils import TTLCache
+from .config import config
+
+_HEADING = re.compile(r"^#{1,6}\s", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n\s*\n")
+_SEPARATOR = "\n\n"
+
+MAX_REDUCE_ROUNDS = 4  # Intermediate reduce rounds before the final reduce truncates its input
+
+MAP_INSTRUCTIONS = (
+    "You are reviewing one part of a longer document. Report findings and suggestions "
+    "for this part only, as concise bullet points. Do not rewrite the part."
+)
+
+REDUCE_INSTRUCTIONS = (
+    "The document was too long to review at once, so each part was reviewed separately. "
+    "Combine the findings below into one coherent answer for the whole document: merge "
+    "duplicates, keep the document order, and refer to parts by their headings."
+)
+
+INTERMEDIATE_REDUCE_INSTRUCTIONS = (
+    "Condense the following findings about consecutive parts of a document into one list, "
+    "merging duplicates and keeping every distinct finding and the part it refers to."
+)
+
+
+def _split_blocks(content: str) -> List[str]:
+    """Heading blocks (a heading and the text up to the next heading)"""
+    starts = [match.start() for match in _HEADING.finditer(content)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    blocks = [content[start:end] for start, end in zip(starts, starts[1:] + [len(content)])]
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Pack the paragraphs of a too-long block into pieces of at most max_chars"""
+    pieces, current = [], ""
+    for paragraph in _BLANK_LINES.split(block):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if not paragraph:
+            continue
+        if current and len(current) + 2 + len(paragraph) > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_sections(content: str, max_chars: int) -> List[str]:
+    """Split a document into sections of at most max_chars, preferring heading boundaries"""
+    max_chars = max(200, max_chars)
+    pieces: List[str] = []
+    for block in _split_blocks(content):
+        pieces.extend([block] if len(block) <= max_chars else _split_oversized(block, max_chars))
+
+    # Merge consecutive short pieces (e.g. many small headings) to limit LLM calls
+    sections: List[str] = []
+    for piece in pieces:
+        if sections and len(sections[-1]) + 2 + len(piece) <= max_chars:
+            sections[-1] = f"{sections[-1]}\n\n{piece}"
+        else:
+            sections.append(piece)
+    return sections
+
+
+def section_title(section: str) -> str:
+    """First line of a section, used to label its findings"""
+    first_line = section.strip().split("\n", 1)[0].lstrip("#").strip()
+    return first_line[:80] + ("..." if len(first_line) > 80 else "")
+
+
+def section_cache_key(model: str, prompt: str, section: str, options: Dict[str, Any]) -> str:
+    """Key of one section's analysis; independent of the section's position"""
+    section_hash = hashlib.sha256(section.encode("utf-8")).hexdigest()
+    material = json.dumps([model, prompt, section_hash, options], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def group_partials(partials: List[str], budget: int) -> List[List[str]]:
+    """
+    Group consecutive findings into reduce inputs of at most budget characters
+
+    Findings are cut so that any two fit one group, so every group except
+    possibly the last holds at least two and each reduce round shrinks the list.
+    """
+    limit = max(1, (budget - len(_SEPARATOR)) // 2)
+    groups: List[List[str]] = []
+    current: List[str] = []
+    for partial in partials:
+        partial = partial[:limit]
+        if len(current) >= 2 and len(_SEPARATOR.join(current + [partial])) > budget:
+            groups.append(current)
+            current = []
+        current.append(partial)
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def reduce_partials(
+    partials: List[str],
+    budget: int,
+    condense: Callable[[List[str]], Awaitable[Tuple[bool, str]]]
+) -> Tuple[bool, List[str], int]:
+    """
+    Condense findings in rounds until they fit budget or MAX_REDUCE_ROUNDS is reached
+
+    condense(group) returns (success, combined findings or error message). A
+    trailing single-finding group is carried over without an LLM call.
+
+    Returns:
+        Tuple[bool, List[str], int]: (success, findings - or [error message]
+        on failure, rounds run)
+    """
+    rounds = 0
+    while len(_SEPARATOR.join(partials)) > budget and len(partials) > 1 and rounds < MAX_REDUCE_ROUNDS:
+        groups = group_partials(partials, budget)
+        results = await asyncio.gather(*[condense(group) for group in groups if len(group) > 1])
+        failed = [result for success, result in results if not success]
+        if failed:
+            return False, [failed[0]], rounds
+        partials = [result for _, result in results]
+        if len(groups[-1]) == 1:
+            partials.append(groups[-1][0])
+        rounds += 1
+    return True, partials, rounds
+
+
+class SectionCache:
+    """TTL/LRU cache of per-section analysis results"""
+
+    def __init__(self):
+        self.cache = TTLCache(
+            config.AI_SECTION_CACHE_SIZE,
+            config.AI_SECTION_CACHE_TTL_SECONDS,
+            name="ai_sections"
+        )
+
+    def lookup(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def store(self, key: str, result: str) -> None:
+        self.cache.put(key, result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.cache.get_stats()
+
+
+# Create global section cache instance
+section_cache = SectionCache()
@@ -1,10 +1,12 @@
 # backend/app/main.py
 from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from . import models, services, auth
 from .user_service import user_service
 from .config import config
 from .kb_service_pg import kb_service
+from .ingestion_job_service import ingestion_job_service, JOB_STATUSES
 from .projects_service_pg import projects_service
 from .templates_service_pg import templates_service
 from .documents_service import documents_service
@@ -12,6 +14,7 @@ from .documents_service_v2 import documents_service_v2
 from .publish_document_service import PublishDocumentService
 from .ai_service import ai_service
 from .ai_config import ai_config
+from .llm_scheduler import LLMQueueFullError, llm_scheduler, embedding_scheduler
 from .audit_service import AuditService
 from .code_review_service import CodeReviewService
 from .automated_review_service import AutomatedReviewService, get_or_create_ai_reviewer
@@ -27,6 +30,7 @@ from .database_service import db_service
 from .init_db import init_database
 from datetime import timedelta
 from typing import List, Optional
+import json
 
 app = FastAPI(title="Docsmait API")
 
@@ -36,6 +40,15 @@ app = FastAPI(title="Docsmait API")
 # documents_service imported from documents_service module
 publish_document_service = PublishDocumentService()
 
+@app.exception_handler(LLMQueueFullError)
+async def llm_queue_full_handler(request: Request, exc: LLMQueueFullError):
+    """LLM scheduler queue at its bound: ask the client to come back later"""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.on_event("startup")
 async def startup_event():
     # Initialize PostgreSQL database
@@ -45,6 +58,22 @@ async def startup_event():
         print("⚠️  This may be normal on first startup. Run setup script if needed.")
     else:
         print("✅ Database initialized successfully")
+    
+    # Open the shared Ollama client on the server's event loop
+    await ai_service.pool.startup()
+    
+    # Start background KB ingestion workers
+    ingestion_job_service.start_workers()
+    # Keep assessment question banks in step with collection content
+    kb_service.question_bank_service.start_worker()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    ingestion_job_service.stop_workers()
+    kb_service.question_bank_service.stop_worker()
+    # Write buffered KB query log rows before exiting
+    kb_service.query_log_writer.shutdown()
+    await ai_service.pool.shutdown()
 
 @app.get("/health")
 def health_check():
@@ -186,8 +215,43 @@ def upload_document(
     file: UploadFile = File(...),
     user_id: int = Depends(auth.verify_token)
 ):
-    """Upload and process a document"""
-    result = kb_service.process_document(file, collection_name)
+    """Upload a document and queue it for background processing (poll /kb/jobs/{job_id})"""
+    result = ingestion_job_service.submit_upload(file, collection_name, user_id=user_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=result["error"])
+    return result
+
+@app.post("/kb/bulk_upload")
+def bulk_upload_documents(
+    collection_name: str = Form(config.DEFAULT_COLLECTION_NAME),
+    chunk_size: Optional[int] = Form(None),
+    file: UploadFile = File(...),
+    user_id: int = Depends(auth.verify_token)
+):
+    """Upload a zip/tar archive of documents and queue a bulk ingestion job (per-file summary in the job result)"""
+    result = ingestion_job_service.submit_bulk_archive(file, collection_name, chunk_size=chunk_size, user_id=user_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=result["error"])
+    return result
+
+@app.post("/kb/bulk_ingest_directory")
+def bulk_ingest_directory(
+    directory: str,
+    collection_name: str = config.DEFAULT_COLLECTION_NAME,
+    chunk_size: Optional[int] = None,
+    user_id: int = Depends(auth.verify_token)
+):
+    """Queue a bulk ingestion job for a server-side directory (admin only)"""
+    user = user_service.get_user_by_id(user_id)
+    if not user or not (user.is_admin or user.is_super_admin):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    
+    result = ingestion_job_service.submit_bulk_directory(directory, collection_name, chunk_size=chunk_size, user_id=user_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result["error"])
     return result
 
 @app.post("/kb/add_text")
@@ -198,8 +262,52 @@ def add_text_to_kb(
     metadata: dict = None,
     user_id: int = Depends(auth.verify_token)
 ):
-    """Add text content directly to knowledge base"""
-    result = kb_service.add_text_to_collection(collection_name, text_content, filename, metadata)
+    """Queue text content for background addition to the knowledge base"""
+    result = ingestion_job_service.submit_text(collection_name, text_content, filename, metadata, user_id=user_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result["error"])
+    return result
+
+@app.get("/kb/jobs")
+def list_ingestion_jobs(
+    job_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    user_id: int = Depends(auth.verify_token)
+):
+    """List recent KB ingestion jobs"""
+    if job_status and job_status not in JOB_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid status. Must be one of: {', '.join(JOB_STATUSES)}"
+        )
+    return ingestion_job_service.list_jobs(job_status, limit)
+
+@app.get("/kb/jobs/{job_id}")
+def get_ingestion_job(job_id: str, user_id: int = Depends(auth.verify_token)):
+    """Get KB ingestion job progress (chunks done/total, throughput, ETA)"""
+    job = ingestion_job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@app.post("/kb/jobs/{job_id}/cancel")
+def cancel_ingestion_job(job_id: str, user_id: int = Depends(auth.verify_token)):
+    """Cancel a queued or running KB ingestion job"""
+    result = ingestion_job_service.cancel_job(job_id)
+    if not result.get("success"):
+        if result["error"] == "Job not found":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result["error"])
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=result["error"])
+    return result
+
+@app.post("/kb/jobs/{job_id}/retry")
+def retry_ingestion_job(job_id: str, user_id: int = Depends(auth.verify_token)):
+    """Re-queue a failed KB ingestion job (resumes from the last flushed chunk)"""
+    result = ingestion_job_service.retry_job(job_id)
+    if not result.get("success"):
+        if result["error"] == "Job not found":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result["error"])
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=result["error"])
     return result
 
 @app.post("/kb/chat", response_model=models.ChatResponse)
@@ -208,6 +316,15 @@ def chat_with_kb(message: models.ChatMessage, user_id: int = Depends(auth.verify
     result = kb_service.query_knowledge_base(message.message, message.collection_name)
     return result
 
+@app.post("/kb/chat/stream")
+def chat_with_kb_stream(message: models.ChatMessage, user_id: int = Depends(auth.verify_token)):
+    """Chat with Knowledge Base using RAG, streaming NDJSON events (sources, tokens, done)"""
+    events = kb_service.stream_knowledge_base(message.message, message.collection_name)
+    return StreamingResponse(
+        (json.dumps(event) + "\n" for event in events),
+        media_type="application/x-ndjson"
+    )
+
 @app.post("/kb/query_with_context")
 def query_kb_with_context(query_data: models.KnowledgeBaseQueryWithContext, user_id: int = Depends(auth.verify_token)):
     """Query Knowledge Base with document context for AI-assisted document creation"""
@@ -219,11 +336,55 @@ def query_kb_with_context(query_data: models.KnowledgeBaseQueryWithContext, user
     )
     return result
 
+@app.get("/kb/search")
+def search_kb(
+    query: str = Query(..., min_length=1),
+    collection_name: Optional[str] = None,
+    limit: int = Query(5, ge=1, le=50),
+    mode: Optional[str] = Query(None, pattern="^(vector|lexical|hybrid|auto)$"),
+    user_id: int = Depends(auth.verify_token)
+):
+    """Search a collection without LLM generation (vector, lexical, hybrid or auto retrieval)"""
+    collection_name = collection_name or config.DEFAULT_COLLECTION_NAME
+    results = kb_service.search_collection(collection_name, query, limit, mode)
+    return {"query": query, "collection_name": collection_name, "results": results}
+
 @app.get("/kb/stats", response_model=models.KBStats)
 def get_kb_statistics(user_id: int = Depends(auth.verify_token)):
     """Get Knowledge Base statistics"""
     return kb_service.get_statistics()
 
+@app.post("/kb/stats/rebuild")
+def rebuild_kb_statistics(user_id: int = Depends(auth.verify_token)):
+    """Recompute Knowledge Base statistics rollups from scratch (admin only)"""
+    user = user_service.get_user_by_id(user_id)
+    if not user or not (user.is_admin or user.is_super_admin):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    
+    result = kb_service.rebuild_statistics()
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+@app.get("/kb/embedding_cache/stats")
+def get_embedding_cache_statistics(user_id: int = Depends(auth.verify_token)):
+    """Get embedding cache hit/miss counters"""
+    return kb_service.embedding_service.cache.get_stats()
+
+@app.get("/kb/cache/stats")
+def get_kb_cache_statistics(user_id: int = Depends(auth.verify_token)):
+    """Get hit rates for all Knowledge Base caches"""
+    return {
+        "embedding_cache": kb_service.embedding_service.cache.get_stats(),
+        "query_embedding_cache": kb_service.embedding_service.query_cache.get_stats(),
+        "answer_cache": kb_service.answer_cache.get_stats(),
+        "collection_registry": kb_service.collection_registry.get_stats(),
+        "query_log": kb_service.query_log_writer.get_stats()
+    }
+
 @app.post("/kb/reset")
 def reset_knowledge_base(
     collection_name: str = config.DEFAULT_COLLECTION_NAME, 
@@ -253,7 +414,8 @@ def create_collection(
         name=collection.name,
         description=collection.description,
         tags=collection.tags,
-        created_by=user.username if user else None
+        created_by=user.username if user else None,
+        quantization=collection.quantization
     )
 
 @app.get("/kb/collections", response_model=List[dict])
@@ -281,7 +443,8 @@ def update_collection(
     return kb_service.update_collection(
         collection_name=collection_name,
         description=collection.description,
-        tags=collection.tags
+        tags=collection.tags,
+        quantization=collection.quantization
     )
 
 @app.delete("/kb/collections/{collection_name}")
@@ -343,7 +506,7 @@ def generate_learning_content(request: models.TrainingLearningRequest, user_id:
 
 @app.post("/training/assessment")
 def generate_assessment_questions(request: models.TrainingAssessmentRequest, user_id: int = Depends(auth.verify_token)):
-    """Generate True/False questions from multiple KB collections"""
+    """Sample True/False questions from the question banks of multiple KB collections"""
     try:
         print(f"Training assessment request received: topics={request.topics}, num_questions={request.num_questions}")
         
@@ -368,6 +531,26 @@ def submit_assessment(request: models.AssessmentSubmissionRequest, user_id: int
     """Submit assessment answers and get evaluation"""
     return kb_service.evaluate_assessment(request.question_ids, request.answers, user_id)
 
+@app.get("/training/question-banks")
+def list_question_banks(user_id: int = Depends(auth.verify_token)):
+    """Get assessment question bank status for every KB collection"""
+    return {"success": True, "banks": kb_service.question_bank_service.list_banks()}
+
+@app.post("/training/question-banks/{collection_name}/regenerate")
+def regenerate_question_bank(collection_name: str, user_id: int = Depends(auth.verify_token)):
+    """Queue a collection's assessment question bank for regeneration (admin only)"""
+    user = user_service.get_user_by_id(user_id)
+    if not user or not (user.is_admin or user.is_super_admin):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    
+    result = kb_service.question_bank_service.request_regeneration(collection_name)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
 @app.get("/training/results")
 def get_training_results(user_id: int = Depends(auth.verify_token)):
     """Get training results for authenticated user"""
@@ -973,7 +1156,9 @@ async def ai_assist_document(
             user_input=request.user_input,
             custom_prompt=request.custom_prompt,
             model=request.model,
-            debug_mode=request.debug_mode
+            debug_mode=request.debug_mode,
+            regenerate=request.regenerate,
+            long_document=request.long_document
         )
         
         return models.AIAssistResponse(
@@ -982,12 +1167,35 @@ async def ai_assist_document(
             error_message=response if not success else None,
             metadata=metadata
         )
+    except LLMQueueFullError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"AI assistance failed: {str(e)}"
         )
 
+@app.post("/ai/assist/stream")
+async def ai_assist_document_stream(
+    request: models.AIAssistRequest,
+    user_id: int = Depends(auth.verify_token)
+):
+    """AI-assisted document editing, streaming NDJSON events (start, tokens, done)"""
+    async def event_lines():
+        async for event in ai_service.stream_document_assistance(
+            user_id=user_id,
+            document_type=request.document_type,
+            document_content=request.document_content,
+            user_input=request.user_input,
+            custom_prompt=request.custom_prompt,
+            model=request.model,
+            regenerate=request.regenerate,
+            long_document=request.long_document
+        ):
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
 @app.get("/ai/config/prompts")
 def get_ai_prompts(user_id: int = Depends(auth.verify_token)):
     """Get all AI prompts configuration"""
@@ -1078,13 +1286,24 @@ async def get_available_models(user_id: int = Depends(auth.verify_token)):
     }
 
 @app.get("/ai/health")
-async def check_ai_health(user_id: int = Depends(auth.verify_token)):
-    """Check AI service health"""
-    is_healthy = await ai_service.check_ollama_health()
+async def check_ai_health(probe: bool = False, user_id: int = Depends(auth.verify_token)):
+    """Check AI service health from the circuit breaker; probe=true also calls Ollama"""
+    if probe:
+        is_healthy = await ai_service.probe_ollama()
+    else:
+        is_healthy = await ai_service.check_ollama_health()
     return {
         "healthy": is_healthy,
         "service": "ollama",
-        "base_url": ai_config.get_ai_settings().get("ollama_base_url", "unknown")
+        "base_url": ai_config.get_ai_settings().get("ollama_base_url", "unknown"),
+        "circuit_breaker": ai_service.pool.breaker.snapshot(),
+        "connection_pool": ai_service.pool.get_stats(),
+        "assist_cache": ai_service.cache.get_stats(),
+        "section_cache": ai_service.section_cache.get_stats(),
+        "scheduler": {
+            "generation": llm_scheduler.get_stats(),
+            "embedding": embedding_scheduler.get_stats()
+        }
     }
 
 @app.post("/ai/feedback")
@@ -1102,8 +1321,10 @@ def submit_ai_feedback(
         processing_time=0.0,
         feedback=feedback.feedback_rating
     )
+    # A poorly rated answer should not be served again from the assist cache
+    cache_evicted = ai_service.cache.evict_for_feedback(feedback.cache_key, feedback.feedback_rating)
     
-    return {"success": True, "message": "Feedback submitted successfully"}
+    return {"success": True, "message": "Feedback submitted successfully", "cache_evicted": cache_evicted}
 
 # ========== Review Management Endpoints ==========
 
@@ -49,6 +49,8 @@ class ChatResponse(BaseModel):
     query_embedding_time: float
     retrieval_time: float
     llm_response_time: float
+    performance: Optional[dict] = None
+    cached: bool = False
 
 class UserSignup(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -95,10 +97,12 @@ class CollectionCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100, pattern="^[a-zA-Z0-9_-]+$")
     description: str = Field(default="", max_length=500)
     tags: List[str] = Field(default=[])
+    quantization: Optional[str] = Field(default=None, pattern="^(none|scalar|binary)$")  # Default: KB_VECTOR_QUANTIZATION
 
 class CollectionUpdate(BaseModel):
     description: Optional[str] = Field(default=None, max_length=500)
     tags: Optional[List[str]] = Field(default=None)
+    quantization: Optional[str] = Field(default=None, pattern="^(none|scalar|binary)$")  # Re-encodes stored vectors
 
 class ProjectCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -288,6 +292,8 @@ class AIAssistRequest(BaseModel):
     custom_prompt: Optional[str] = Field(default=None, max_length=2000)
     model: Optional[str] = Field(default=None, max_length=50)
     debug_mode: bool = Field(default=False, description="Enable detailed logging for debugging")
+    regenerate: bool = Field(default=False, description="Bypass the response cache and generate a new answer")
+    long_document: Optional[bool] = Field(default=None, description="Analyze the document section by section and combine the results (default: when longer than the context window)")
 
 class AIAssistResponse(BaseModel):
     success: bool
@@ -311,6 +317,7 @@ class AISettingsUpdate(BaseModel):
 class AIUsageFeedback(BaseModel):
     feedback_rating: int = Field(..., ge=1, le=5)
     feedback_comment: Optional[str] = Field(default="", max_length=500)
+    cache_key: Optional[str] = Field(default=None, max_length=64, description="metadata.cache_key of the rated answer")
 
 # ========== Code Review Management Models ==========
 
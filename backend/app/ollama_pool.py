@@ -0,0 +1,311 @@
+# backend/app/ollama_pool.py
+"""
+Ollama Connection Pool for Docsmait
+
+Shared HTTP access to Ollama for AIService:
+- One long-lived httpx.AsyncClient with keep-alive limits, opened at app
+  startup on the server's event loop and closed on shutdown
+- Circuit breaker (closed / open / half-open) fed by the outcome of real
+  calls instead of a pre-flight /api/tags probe: connection errors, timeouts
+  and 5xx responses count as failures, any other response as success
+- Recent call latencies and breaker state for /ai/health
+- A sync facade for threads without an event loop (training, automated
+  review, background workers): coroutines are submitted to a dedicated
+  background loop thread that owns its own pooled client, so sync callers
+  reuse connections and can cancel or time out a call
+"""
+import asyncio
+import concurrent.futures
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional
+
+import httpx
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+BREAKER_STATES = ["closed", "open", "half_open"]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Ollama while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, latency_window: int = 100):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()  # Also used from worker threads with their own loops
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._last_error: Optional[str] = None
+        self._last_failure_at: Optional[float] = None
+        self._latencies = deque(maxlen=latency_window)
+        self._counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_available(self) -> bool:
+        """Whether a call would be admitted: closed, half-open, or open past its reset timeout"""
+        with self._lock:
+            return self._state != "open" or time.monotonic() >= self._opened_at + self.reset_timeout
+
+    def acquire(self) -> None:
+        """Admit a call or raise CircuitOpenError; an expired open state admits one trial call"""
+        with self._lock:
+            if self._state == "open":
+                retry_after = self._opened_at + self.reset_timeout - time.monotonic()
+                if retry_after > 0:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpenError(retry_after)
+                self._state = "half_open"
+                self._trial_in_flight = False
+            if self._state == "half_open":
+                if self._trial_in_flight:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpenError(1.0)
+                self._trial_in_flight = True
+            self._counters["calls"] += 1
+
+    def record_success(self, latency_seconds: float) -> None:
+        with self._lock:
+            if self._state != "closed":
+                logger.info(f"{self.name} circuit closed")
+            self._state = "closed"
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            self._latencies.append(latency_seconds)
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._counters["failures"] += 1
+            self._last_error = error
+            self._last_failure_at = time.time()
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self._state != "open":
+                    logger.warning(f"{self.name} circuit opened after {self._consecutive_failures} failure(s): {error}")
+                    self._counters["opened"] += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a half-open trial whose outcome is unknown (e.g. the caller was cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            last_latency = self._latencies[-1] if self._latencies else None
+            latencies = sorted(self._latencies)
+            retry_in = None
+            if self._state == "open":
+                retry_in = round(max(0.0, self._opened_at + self.reset_timeout - time.monotonic()), 1)
+            snapshot = {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "retry_in_seconds": retry_in,
+                "last_error": self._last_error,
+                "last_failure_at": self._last_failure_at,
+                **self._counters
+            }
+        snapshot["latency_ms"] = {
+            "samples": len(latencies),
+            "last": round(last_latency * 1000, 1) if last_latency is not None else None,
+            "p50": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+            "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else None
+        }
+        return snapshot
+
+
+class OllamaConnectionPool:
+    """Long-lived, pooled Ollama HTTP client guarded by a circuit breaker"""
+
+    def __init__(self):
+        self.default_timeout = config.AI_TIMEOUT
+        self.limits = httpx.Limits(
+            max_connections=config.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=config.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.OLLAMA_KEEPALIVE_EXPIRY_SECONDS
+        )
+        self.breaker = CircuitBreaker(
+            "Ollama", config.OLLAMA_BREAKER_FAILURE_THRESHOLD, config.OLLAMA_BREAKER_RESET_SECONDS
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Background loop serving synchronous callers (started on first use)
+        self._sync_lock = threading.Lock()
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_client: Optional[httpx.AsyncClient] = None
+
+    async def startup(self) -> None:
+        """Open the shared client on the running (server) event loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.default_timeout, limits=self.limits)
+            self._loop = asyncio.get_running_loop()
+
+    async def shutdown(self) -> None:
+        """Close the shared client and stop the sync facade loop (cancelling its calls)"""
+        await asyncio.get_running_loop().run_in_executor(None, self.stop_sync_loop)
+        if self._client is not None:
+            client, self._client, self._loop = self._client, None, None
+            await client.aclose()
+
+    @asynccontextmanager
+    async def _client_context(self) -> AsyncIterator[httpx.AsyncClient]:
+        loop = asyncio.get_running_loop()
+        if self._client is not None and loop is self._loop:
+            yield self._client
+            return
+        if self._sync_client is not None and loop is self._sync_loop:
+            yield self._sync_client
+            return
+        # Connections of an AsyncClient belong to the loop that opened them, so
+        # callers on any other loop (or before startup) get a short-lived client
+        async with httpx.AsyncClient(timeout=self.default_timeout) as client:
+            yield client
+
+    # ========== Sync facade ==========
+
+    def submit(self, coroutine: Awaitable) -> concurrent.futures.Future:
+        """Schedule a coroutine on the background loop; cancel() on the result cancels the call"""
+        loop = self._ensure_sync_loop()
+        if threading.current_thread() is self._sync_thread:
+            coroutine.close()
+            raise RuntimeError("Blocking on the Ollama sync loop from its own thread would deadlock")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    def run_sync(self, coroutine: Awaitable, timeout: float = None) -> Any:
+        """
+        Run a coroutine for a synchronous caller and return its result
+
+        Safe from any thread, including one that is running its own event loop.
+        On timeout (or if the waiting thread is interrupted) the call is
+        cancelled, which also gives back its LLM scheduler slot or queue place.
+        """
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def _ensure_sync_loop(self) -> asyncio.AbstractEventLoop:
+        with self._sync_lock:
+            if self._sync_loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(
+                    target=self._run_sync_loop, args=(loop, ready), name="ollama-sync-loop", daemon=True
+                )
+                thread.start()
+                ready.wait()
+                self._sync_loop, self._sync_thread = loop, thread
+            return self._sync_loop
+
+    def _run_sync_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        client = httpx.AsyncClient(timeout=self.default_timeout, limits=self.limits)
+        self._sync_client = client
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            if self._sync_client is client:
+                self._sync_client = None
+            loop.run_until_complete(client.aclose())
+            loop.close()
+
+    def stop_sync_loop(self) -> None:
+        """Cancel in-flight sync calls, close the background client and stop its loop"""
+        with self._sync_lock:
+            loop, thread = self._sync_loop, self._sync_thread
+            self._sync_loop = self._sync_thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=10)
+
+    def _record_response(self, response: httpx.Response, start: float) -> None:
+        if response.status_code >= 500:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            self.breaker.record_success(time.monotonic() - start)
+
+    async def request(self, method: str, url: str, timeout: float = None, **kwargs) -> httpx.Response:
+        """Send one request; raises CircuitOpenError while the breaker is open"""
+        self.breaker.acquire()
+        start = time.monotonic()
+        recorded = False
+        try:
+            async with self._client_context() as client:
+                response = await client.request(method, url, timeout=timeout or self.default_timeout, **kwargs)
+            self._record_response(response, start)
+            recorded = True
+            return response
+        except httpx.TransportError as e:
+            self.breaker.record_failure(f"{type(e).__name__}: {e}")
+            recorded = True
+            raise
+        finally:
+            if not recorded:
+                self.breaker.release()
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, timeout: float = None, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Streaming request; the outcome is recorded when the response headers arrive"""
+        self.breaker.acquire()
+        start = time.monotonic()
+        recorded = False
+        try:
+            async with self._client_context() as client:
+                async with client.stream(method, url, timeout=timeout or self.default_timeout, **kwargs) as response:
+                    self._record_response(response, start)
+                    recorded = True
+                    yield response
+        except httpx.TransportError as e:
+            # Also covers read timeouts mid-stream after the headers were recorded
+            self.breaker.record_failure(f"{type(e).__name__}: {e}")
+            recorded = True
+            raise
+        finally:
+            if not recorded:
+                self.breaker.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pooled": self._client is not None,
+            "sync_loop_running": self._sync_loop is not None,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry_seconds": self.limits.keepalive_expiry
+        }
+
+
+# Create global Ollama connection pool instance
+ollama_pool = OllamaConnectionPool()
@@ -0,0 +1,154 @@
+# backend/app/query_log_writer.py
+"""
+Query Log Writer for Docsmait Knowledge Base
+
+Buffers KBQuery rows off the request path:
+- Bounded in-memory queue; rows are dropped (and counted) when it is full
+- Background thread flushes by batch size or interval with one multi-row insert
+- The daily query count rollup (kb_query_daily_counts) is bumped in the same
+  transaction, so /kb/stats never has to count kb_queries
+- Graceful flush on shutdown
+- Counters for queued, flushed, dropped and failed rows
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .config import config
+from .database_config import get_db
+from .db_models import KBQuery, KBQueryDailyCount
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLogWriter:
+    """Asynchronous, batched writer for kb_queries rows"""
+
+    def __init__(self):
+        self.batch_size = max(1, config.KB_QUERY_LOG_BATCH_SIZE)
+        self.flush_interval = config.KB_QUERY_LOG_FLUSH_INTERVAL_SECONDS
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, config.KB_QUERY_LOG_QUEUE_SIZE))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One insert at a time (worker vs. explicit flush)
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._counters = {"queued": 0, "flushed": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    def log(self, query_text: str, collection_name: str, response_time_ms: int) -> None:
+        """Queue a query log row without blocking the caller"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait({
+                "query_text": query_text,
+                "collection_name": collection_name,
+                "response_time_ms": response_time_ms
+            })
+            self._count("queued")
+        except queue.Full:
+            self._count("dropped")
+
+    def log_many(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.log(row["query_text"], row["collection_name"], row["response_time_ms"])
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of rows written"""
+        written = 0
+        while True:
+            rows = self._drain(self.batch_size)
+            if not rows:
+                return written
+            written += self._write(rows)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop the background thread and flush remaining rows"""
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        written = self.flush()
+        if written:
+            logger.info(f"Flushed {written} queued KB query log rows on shutdown")
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None or self._stop_event.is_set():
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="kb-query-log", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            rows = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size and not self._stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=min(remaining, 0.5)))
+                except queue.Empty:
+                    continue
+            if rows:
+                self._write(rows)
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        with self._flush_lock:
+            db = next(get_db())
+            try:
+                db.execute(insert(KBQuery), rows)
+                db.execute(self._daily_count_upsert(len(rows)))
+                db.commit()
+                with self._lock:
+                    self._counters["flushed"] += len(rows)
+                    self._counters["batches"] += 1
+                return len(rows)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to write {len(rows)} KB query log rows: {e}")
+                with self._lock:
+                    self._counters["failed"] += len(rows)
+                return 0
+            finally:
+                db.close()
+
+    @staticmethod
+    def _daily_count_upsert(count: int):
+        """Add count to today's bucket; current_date matches the kb_queries.query_date default"""
+        statement = pg_insert(KBQueryDailyCount).values(query_date=func.current_date(), query_count=count)
+        return statement.on_conflict_do_update(
+            index_elements=[KBQueryDailyCount.query_date],
+            set_={"query_count": KBQueryDailyCount.query_count + statement.excluded.query_count}
+        )
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update({
+            "pending": self._queue.qsize(),
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval
+        })
+        return stats
+
+
+# Create global query log writer instance
+query_log_writer = QueryLogWriter()
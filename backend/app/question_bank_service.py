@@ -0,0 +1,459 @@
+# backend/app/question_bank_service.py
+"""
+Question Bank Service for Docsmait Training
+
+Pre-generated True/False assessment questions per Knowledge Base collection:
+- A background worker regenerates a collection's bank whenever its
+  content_version changes, debounced so a bulk ingestion triggers one run
+- Questions and correct answers are persisted in PostgreSQL
+  (kb_assessment_questions); a new bank replaces the old one in one transaction
+- Workers claim banks with SELECT ... FOR UPDATE SKIP LOCKED, so several
+  backend processes can share the work
+- Assessment requests sample stored questions and never wait on the LLM;
+  submissions are scored against the stored answers
+- Replaced questions are retired rather than deleted, so assessments that are
+  in progress during a regeneration can still be submitted
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, insert, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .ai_service import ai_service
+from .config import config
+from .database_config import get_db
+from .db_models import KBAssessmentQuestion, KBCollection, KBQuestionBank
+from .vector_store import vector_store
+
+logger = logging.getLogger(__name__)
+
+BANK_STATUSES = ["pending", "generating", "ready", "failed"]
+
+QUESTIONS_PROMPT = """Create exactly {count} True/False questions based on the following content about {topic}.
+
+Requirements:
+- Each question should be clear and unambiguous
+- Each question must be answerable from the content below
+- Mix of True and False answers (roughly 50/50 split)
+- Questions should test key concepts and facts
+- Avoid overly complex or trick questions
+- Focus on important information that learners should know
+
+Content to base questions on:
+{content}
+
+Format your response as a JSON array with this exact structure:
+[
+  {{"question": "Question text here", "answer": true}},
+  {{"question": "Another question", "answer": false}}
+]
+
+Provide only the JSON array, no other text."""
+
+
+def parse_true_false_questions(response_text: str) -> List[Tuple[str, bool]]:
+    """(question, answer) pairs from an LLM response containing a JSON array; [] if unusable"""
+    json_start = response_text.find('[')
+    json_end = response_text.rfind(']') + 1
+    if json_start < 0 or json_end <= json_start:
+        return []
+    try:
+        items = json.loads(response_text[json_start:json_end])
+    except json.JSONDecodeError:
+        return []
+
+    questions = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or not isinstance(item.get("question"), str):
+            continue
+        answer = item.get("answer")
+        if isinstance(answer, str) and answer.strip().lower() in ("true", "false"):
+            answer = answer.strip().lower() == "true"
+        question = item["question"].strip()
+        if question and isinstance(answer, bool):
+            questions.append((question, answer))
+    return questions
+
+
+class QuestionBankService:
+    """Persisted assessment question banks and their background generator"""
+
+    def __init__(self):
+        self.enabled = config.KB_QUESTION_BANK_ENABLED
+        self.bank_size = max(1, config.KB_QUESTION_BANK_SIZE)
+        self.questions_per_prompt = max(1, config.KB_QUESTION_BANK_QUESTIONS_PER_PROMPT)
+        self.chunks_per_prompt = max(1, config.KB_QUESTION_BANK_CHUNKS_PER_PROMPT)
+        self.scan_chunks = max(1, config.KB_QUESTION_BANK_SCAN_CHUNKS)
+        self.poll_interval = config.KB_QUESTION_BANK_POLL_INTERVAL_SECONDS
+        self.debounce = timedelta(seconds=config.KB_QUESTION_BANK_DEBOUNCE_SECONDS)
+        self.retry_after = timedelta(seconds=config.KB_QUESTION_BANK_RETRY_SECONDS)
+        self.stale_after = timedelta(seconds=config.KB_QUESTION_BANK_STALE_SECONDS)
+        self.retired_retention = timedelta(hours=config.KB_QUESTION_BANK_RETIRED_RETENTION_HOURS)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    # ========== Sampling and Scoring ==========
+
+    def sample_questions(self, collection_names: List[str], num_questions: int) -> Dict[str, Any]:
+        """
+        Random questions spread evenly over the collections' banks
+
+        Returns:
+            Dict: questions (id, question, collection_name - no answers) and
+            pending_collections whose bank has no questions yet
+        """
+        db = next(get_db())
+        try:
+            collection_names_by_id = {
+                row.id: row.name
+                for row in db.query(KBCollection.id, KBCollection.name).filter(
+                    KBCollection.name.in_(collection_names)
+                ).all()
+            }
+            # Each collection's questions in random order; at most num_questions per collection
+            ranked = db.query(
+                KBAssessmentQuestion.id,
+                KBAssessmentQuestion.collection_id,
+                KBAssessmentQuestion.question,
+                func.row_number().over(
+                    partition_by=KBAssessmentQuestion.collection_id, order_by=func.random()
+                ).label("position")
+            ).filter(
+                KBAssessmentQuestion.collection_id.in_(list(collection_names_by_id.keys())),
+                KBAssessmentQuestion.is_active.is_(True)
+            ).subquery()
+            rows = db.query(ranked).filter(ranked.c.position <= num_questions).order_by(ranked.c.position).all()
+        finally:
+            db.close()
+
+        by_collection: Dict[str, List[Any]] = {collection_id: [] for collection_id in collection_names_by_id}
+        for row in rows:
+            by_collection[row.collection_id].append(row)
+
+        # Round-robin so every collection contributes equally while it has questions left
+        questions = []
+        queues = [rows_for_collection for rows_for_collection in by_collection.values() if rows_for_collection]
+        while queues and len(questions) < num_questions:
+            for queue in list(queues):
+                if len(questions) >= num_questions:
+                    break
+                row = queue.pop(0)
+                questions.append({
+                    "id": row.id,
+                    "question": row.question,
+                    "collection_name": collection_names_by_id[row.collection_id]
+                })
+                if not queue:
+                    queues.remove(queue)
+        random.shuffle(questions)
+
+        pending_collections = [
+            collection_names_by_id[collection_id]
+            for collection_id, rows_for_collection in by_collection.items() if not rows_for_collection
+        ]
+        if pending_collections:
+            self._wake_event.set()
+        return {"questions": questions, "pending_collections": pending_collections}
+
+    def get_answer_key(self, question_ids: List[str]) -> Dict[str, bool]:
+        """Stored correct answers for the given question ids (unknown ids are omitted)"""
+        unique_ids = list(dict.fromkeys(question_ids))
+        if not unique_ids:
+            return {}
+        db = next(get_db())
+        try:
+            return {
+                row.id: row.correct_answer
+                for row in db.query(KBAssessmentQuestion.id, KBAssessmentQuestion.correct_answer).filter(
+                    KBAssessmentQuestion.id.in_(unique_ids)
+                ).all()
+            }
+        finally:
+            db.close()
+
+    # ========== Status ==========
+
+    def list_banks(self) -> List[Dict[str, Any]]:
+        """Question bank state for every collection"""
+        db = next(get_db())
+        try:
+            rows = db.query(KBCollection, KBQuestionBank).outerjoin(
+                KBQuestionBank, KBQuestionBank.collection_id == KBCollection.id
+            ).order_by(KBCollection.name).all()
+            return [
+                {
+                    "collection_name": collection.name,
+                    "status": bank.status if bank else "pending",
+                    "question_count": (bank.question_count or 0) if bank else 0,
+                    "up_to_date": bool(bank) and bank.content_version == (collection.content_version or 0),
+                    "generated_at": bank.generated_at.isoformat() if bank and bank.generated_at else None,
+                    "error": bank.error if bank else None
+                }
+                for collection, bank in rows
+            ]
+        finally:
+            db.close()
+
+    def request_regeneration(self, collection_name: str) -> Dict[str, Any]:
+        """Queue a collection's bank for regeneration even if its content has not changed"""
+        db = next(get_db())
+        try:
+            collection = db.query(KBCollection.id).filter(KBCollection.name == collection_name).first()
+            if not collection:
+                return {"success": False, "error": f"Collection '{collection_name}' not found"}
+
+            db.execute(pg_insert(KBQuestionBank).values(
+                collection_id=collection.id, status="pending"
+            ).on_conflict_do_nothing())
+            db.query(KBQuestionBank).filter(
+                KBQuestionBank.collection_id == collection.id,
+                KBQuestionBank.status != "generating"
+            ).update({"status": "pending", "content_version": None, "error": None}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to queue question bank regeneration for {collection_name}: {e}")
+            return {"success": False, "error": f"Failed to queue regeneration: {str(e)}"}
+        finally:
+            db.close()
+
+        self._wake_event.set()
+        return {"success": True, "collection_name": collection_name, "status": "pending"}
+
+    # ========== Worker ==========
+
+    def start_worker(self):
+        """Start the background generator thread (idempotent)"""
+        if not self.enabled or self._worker is not None:
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._worker_loop, name="kb-question-bank", daemon=True)
+        self._worker.start()
+        print("✅ Started assessment question bank worker")
+
+    def stop_worker(self):
+        """Signal the worker to stop; an interrupted bank is picked up again later"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._worker is not None:
+            self._worker.join(timeout=config.THREAD_JOIN_TIMEOUT)
+        self._worker = None
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                claimed = self._claim_next_bank()
+            except Exception as e:
+                logger.error(f"Question bank worker failed to claim a bank: {e}")
+                claimed = None
+
+            if claimed:
+                self._generate_bank(*claimed)
+                continue
+
+            self._wake_event.wait(self.poll_interval)
+            self._wake_event.clear()
+
+    def _claim_next_bank(self) -> Optional[Tuple[str, str, int]]:
+        """Claim the oldest out-of-date bank; returns (collection id, name, content version)"""
+        db = next(get_db())
+        try:
+            # Collections created since the last pass get a bank row
+            db.execute(pg_insert(KBQuestionBank).from_select(
+                ["collection_id", "status"], select(KBCollection.id, literal("pending"))
+            ).on_conflict_do_nothing())
+
+            collection_version = func.coalesce(KBCollection.content_version, 0)
+            row = db.query(KBQuestionBank, KBCollection.name, collection_version.label("content_version")).join(
+                KBCollection, KBCollection.id == KBQuestionBank.collection_id
+            ).filter(
+                or_(KBQuestionBank.content_version.is_(None), KBQuestionBank.content_version != collection_version),
+                KBCollection.updated_date < func.now() - self.debounce,
+                or_(
+                    KBQuestionBank.status.in_(["pending", "ready"]),
+                    and_(KBQuestionBank.status == "failed", KBQuestionBank.updated_at < func.now() - self.retry_after),
+                    and_(KBQuestionBank.status == "generating", KBQuestionBank.heartbeat_at < func.now() - self.stale_after)
+                )
+            ).order_by(KBQuestionBank.updated_at.asc()).with_for_update(of=KBQuestionBank, skip_locked=True).first()
+
+            if not row:
+                db.commit()
+                return None
+
+            bank, collection_name, content_version = row
+            if bank.status == "generating":
+                logger.warning(f"Reclaiming question bank for {collection_name} from worker {bank.worker_id}")
+            bank.status = "generating"
+            bank.worker_id = self.worker_id
+            bank.heartbeat_at = func.now()
+            bank.error = None
+            db.commit()
+            return bank.collection_id, collection_name, content_version
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _generate_bank(self, collection_id: str, collection_name: str, content_version: int):
+        """Generate questions from a sample of the collection's chunks and swap them in"""
+        try:
+            prompts = -(-self.bank_size // self.questions_per_prompt)
+            # Twice the chunks strictly needed, in case some prompts yield few usable questions
+            chunks = self._sample_chunks(collection_name, prompts * self.chunks_per_prompt * 2)
+            topic = collection_name.replace('_', ' ')
+
+            questions: List[Tuple[str, bool]] = []
+            seen = set()
+            for start in range(0, len(chunks), self.chunks_per_prompt):
+                if len(questions) >= self.bank_size:
+                    break
+                if self._stop_event.is_set():
+                    self._release_bank(collection_id, "pending", None)
+                    return
+
+                prompt = QUESTIONS_PROMPT.format(
+                    count=min(self.questions_per_prompt, self.bank_size - len(questions)),
+                    topic=topic,
+                    content="\n\n".join(chunks[start:start + self.chunks_per_prompt])
+                )
+                ai_response = ai_service.generate_response(
+                    prompt, max_tokens=config.KB_AI_MAX_TOKENS, priority="background"
+                )
+                if ai_response.get("success"):
+                    for question, answer in parse_true_false_questions(ai_response.get("response", "")):
+                        key = " ".join(question.lower().split())
+                        if key not in seen:
+                            seen.add(key)
+                            questions.append((question, answer))
+                else:
+                    logger.warning(f"Question generation for {collection_name} failed: {ai_response.get('error')}")
+                self._heartbeat(collection_id)
+
+            if chunks and not questions:
+                # Keep serving the previous bank rather than replacing it with nothing
+                self._release_bank(collection_id, "failed", "The LLM returned no usable questions")
+                return
+
+            self._replace_questions(collection_id, content_version, questions[:self.bank_size])
+            logger.info(f"Generated {min(len(questions), self.bank_size)} assessment questions for {collection_name}")
+
+        except Exception as e:
+            logger.error(f"Question bank generation for {collection_name} failed: {e}")
+            self._release_bank(collection_id, "failed", str(e))
+
+    def _sample_chunks(self, collection_name: str, count: int) -> List[str]:
+        """Uniform sample (reservoir) of chunk texts from the first scan_chunks points, in document order"""
+        sample: List[Dict[str, Any]] = []
+        eligible = 0
+        scanned = 0
+        offset = None
+        while scanned < self.scan_chunks:
+            records, offset = vector_store.scroll(
+                collection_name, limit=min(256, self.scan_chunks - scanned), offset=offset
+            )
+            scanned += len(records)
+            for record in records:
+                payload = record.payload or {}
+                if len(payload.get("text", "").strip()) < config.RAG_MIN_CHUNK_LENGTH:
+                    continue
+                eligible += 1
+                if len(sample) < count:
+                    sample.append(payload)
+                else:
+                    slot = random.randrange(eligible)
+                    if slot < count:
+                        sample[slot] = payload
+            if offset is None or not records:
+                break
+
+        # Neighbouring chunks of one document share a prompt
+        sample.sort(key=lambda payload: (str(payload.get("kb_document_id", "")), payload.get("chunk_index", 0)))
+        return [payload["text"].strip() for payload in sample]
+
+    def _replace_questions(self, collection_id: str, content_version: int, questions: List[Tuple[str, bool]]):
+        db = next(get_db())
+        try:
+            # Only the worker that still owns the claim may publish
+            owned = db.query(KBQuestionBank).filter(
+                KBQuestionBank.collection_id == collection_id,
+                KBQuestionBank.worker_id == self.worker_id,
+                KBQuestionBank.status == "generating"
+            ).update({
+                "status": "ready",
+                "content_version": content_version,
+                "question_count": len(questions),
+                "generated_at": func.now(),
+                "heartbeat_at": None,
+                "worker_id": None,
+                "error": None
+            }, synchronize_session=False)
+            if not owned:
+                db.rollback()
+                logger.warning(f"Question bank claim for collection {collection_id} was lost, discarding results")
+                return
+
+            db.query(KBAssessmentQuestion).filter(
+                KBAssessmentQuestion.collection_id == collection_id,
+                KBAssessmentQuestion.is_active.is_(False),
+                KBAssessmentQuestion.retired_at < func.now() - self.retired_retention
+            ).delete(synchronize_session=False)
+            db.query(KBAssessmentQuestion).filter(
+                KBAssessmentQuestion.collection_id == collection_id,
+                KBAssessmentQuestion.is_active.is_(True)
+            ).update({"is_active": False, "retired_at": func.now()}, synchronize_session=False)
+            if questions:
+                db.execute(insert(KBAssessmentQuestion), [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "collection_id": collection_id,
+                        "question": question,
+                        "correct_answer": answer,
+                        "content_version": content_version,
+                        "is_active": True
+                    }
+                    for question, answer in questions
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _heartbeat(self, collection_id: str):
+        self._update_owned_bank(collection_id, {"heartbeat_at": func.now()})
+
+    def _release_bank(self, collection_id: str, status: str, error: Optional[str]):
+        self._update_owned_bank(collection_id, {
+            "status": status, "error": error, "worker_id": None, "heartbeat_at": None
+        })
+
+    def _update_owned_bank(self, collection_id: str, values: Dict[str, Any]):
+        db = next(get_db())
+        try:
+            db.query(KBQuestionBank).filter(
+                KBQuestionBank.collection_id == collection_id,
+                KBQuestionBank.worker_id == self.worker_id
+            ).update(values, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to update question bank for collection {collection_id}: {e}")
+        finally:
+            db.close()
+
+
+# Create global question bank service instance
+question_bank_service = QuestionBankService()
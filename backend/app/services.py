@@ -1,6 +1,7 @@
 # backend/app/services.py
 # This file contains the business logic for interacting with AI models and the vector DB.
 from .settings import settings
+from .llm_scheduler import llm_scheduler, embedding_scheduler
 import ollama
 import qdrant_client
 from qdrant_client.http.models import PointStruct, UpdateStatus, VectorParams, Distance
@@ -25,10 +26,11 @@ def create_project_in_db(project):
 
 def add_document_to_kb(doc):
     try:
-        embedding = ollama_client.embeddings(
-            model=settings.EMBEDDING_MODEL,
-            prompt=doc.content
-        )['embedding']
+        with embedding_scheduler.slot("background"):
+            embedding = ollama_client.embeddings(
+                model=settings.EMBEDDING_MODEL,
+                prompt=doc.content
+            )['embedding']
 
         qdrant_client.recreate_collection(
             collection_name=doc.collection_name,
@@ -48,10 +50,11 @@ def add_document_to_kb(doc):
 
 def query_knowledge_base(query):
     try:
-        query_embedding = ollama_client.embeddings(
-            model=settings.EMBEDDING_MODEL,
-            prompt=query.query
-        )['embedding']
+        with embedding_scheduler.slot("interactive"):
+            query_embedding = ollama_client.embeddings(
+                model=settings.EMBEDDING_MODEL,
+                prompt=query.query
+            )['embedding']
 
         search_result = qdrant_client.search(
             collection_name="default_collection",
@@ -63,10 +66,11 @@ def query_knowledge_base(query):
 
         prompt = f"Using the following context, answer the question.\n\nContext: {context}\n\nQuestion: {query.query}"
         
-        response = ollama_client.chat(
-            model=settings.GENERAL_PURPOSE_LLM,
-            messages=[{'role': 'user', 'content': prompt}]
-        )
+        with llm_scheduler.slot("interactive"):
+            response = ollama_client.chat(
+                model=settings.GENERAL_PURPOSE_LLM,
+                messages=[{'role': 'user', 'content': prompt}]
+            )
         
         return response['message']['content']
     except Exception as e:
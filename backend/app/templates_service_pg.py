@@ -335,16 +335,19 @@ class TemplatesService:
                 "tags": template['tags']
             }
             
-            # Add to knowledge base
-            result = kb_service.add_text_to_collection(
+            # Re-index incrementally: only chunks changed since the last approved version are embedded
+            result = kb_service.index_document_revision(
                 collection_name=collection_name,
+                source_id=f"template:{template['id']}",
                 text_content=content,
                 filename=filename,
-                metadata=metadata
+                metadata=metadata,
+                legacy_match={"template_id": template['id']}
             )
             
             if result.get("success"):
-                print(f"✅ Template '{template['name']}' added to knowledge base collection '{collection_name}'")
+                print(f"✅ Template '{template['name']}' indexed in knowledge base collection '{collection_name}' "
+                      f"({result.get('chunks_added', 0)} added, {result.get('chunks_removed', 0)} removed chunks)")
             else:
                 print(f"❌ Failed to add template to KB: {result.get('error', 'Unknown error')}")
                 
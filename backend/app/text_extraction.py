@@ -0,0 +1,235 @@
+# backend/app/text_extraction.py
+"""
+Text Extraction for Docsmait Knowledge Base
+
+Generator pipeline used by KB ingestion:
+- iter_text_segments: PDF pages, DOCX paragraphs or text line blocks
+- iter_pdf_segments: page-range-parallel extraction for large PDFs
+- iter_chunks: word-bounded chunks built from a segment stream
+- extract_file_chunks: whole-file extraction for process-pool workers
+
+Functions here hold no service state so they can run in worker processes.
+"""
+import io
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import PyPDF2
+import docx
+
+from .config import config
+
+
+class TextExtractionError(Exception):
+    """Raised when a file fails to parse after part of its text was already yielded"""
+
+
+class TextSegment(NamedTuple):
+    """A unit of extracted text (PDF page, DOCX paragraph, block of lines)"""
+    text: str
+    page_number: Optional[int]
+    position: int  # Units of the source consumed so far (pages, paragraphs, bytes)
+    total: int     # Total units in the source
+
+
+def iter_text_segments(file_content: bytes, content_type: str, filename: str,
+                       parallel_pdf: bool = True) -> Iterator[TextSegment]:
+    """
+    Yield text page by page (PDF), paragraph by paragraph (DOCX) or in line blocks (text)
+
+    A file that cannot be parsed at all yields nothing. A failure partway
+    through raises TextExtractionError, so a truncated document is never
+    indexed as complete.
+    """
+    segments_yielded = 0
+    try:
+        for segment in _iter_source_segments(file_content, content_type, filename, parallel_pdf):
+            yield segment
+            segments_yielded += 1
+    except Exception as e:
+        if segments_yielded:
+            raise TextExtractionError(
+                f"Text extraction of {filename} failed after {segments_yielded} segments: {e}"
+            ) from e
+        print(f"Error extracting text content: {e}")
+
+
+def _iter_source_segments(file_content: bytes, content_type: str, filename: str,
+                          parallel_pdf: bool) -> Iterator[TextSegment]:
+    if content_type == "application/pdf" or filename.lower().endswith('.pdf'):
+        yield from iter_pdf_segments(file_content, parallel=parallel_pdf)
+
+    elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" or filename.lower().endswith('.docx'):
+        doc = docx.Document(io.BytesIO(file_content))
+        paragraphs = doc.paragraphs
+        total_paragraphs = len(paragraphs)
+        for paragraph_index, paragraph in enumerate(paragraphs):
+            yield TextSegment(paragraph.text, None, paragraph_index + 1, total_paragraphs)
+
+    else:
+        # Text files (and unknown types decoded as text) are read in line blocks
+        total_bytes = len(file_content)
+        consumed = 0
+        block = []
+        block_size = 0
+        reader = io.TextIOWrapper(io.BytesIO(file_content), encoding='utf-8', errors='ignore')
+        for line in reader:
+            block.append(line)
+            block_size += len(line)
+            if block_size >= config.KB_TEXT_SEGMENT_CHARS:
+                consumed += block_size
+                yield TextSegment("".join(block), None, min(consumed, total_bytes), total_bytes)
+                block = []
+                block_size = 0
+        if block:
+            yield TextSegment("".join(block), None, total_bytes, total_bytes)
+
+
+def pdf_extract_workers() -> int:
+    """Worker processes used for page-parallel PDF extraction"""
+    return config.KB_PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+
+
+def iter_pdf_segments(file_content: bytes, parallel: bool = True) -> Iterator[TextSegment]:
+    """
+    Yield PDF pages in order
+
+    Large PDFs (KB_PDF_PARALLEL_MIN_PAGES pages or more) are split into page
+    ranges extracted in worker processes; smaller ones are read sequentially
+    because process start-up costs more than it saves.
+    """
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    total_pages = len(pdf_reader.pages)
+    workers = pdf_extract_workers()
+
+    if parallel and workers > 1 and total_pages >= config.KB_PDF_PARALLEL_MIN_PAGES:
+        yield from _iter_pdf_segments_parallel(pdf_reader, file_content, total_pages, workers)
+    else:
+        yield from _iter_pdf_segments_sequential(pdf_reader, 0, total_pages)
+
+
+def _iter_pdf_segments_sequential(pdf_reader, start: int, total_pages: int) -> Iterator[TextSegment]:
+    for page_index in range(start, total_pages):
+        text = pdf_reader.pages[page_index].extract_text() or ""
+        yield TextSegment(text, page_index + 1, page_index + 1, total_pages)
+
+
+def _iter_pdf_segments_parallel(pdf_reader, file_content: bytes, total_pages: int,
+                                workers: int) -> Iterator[TextSegment]:
+    range_size = max(1, config.KB_PDF_PAGE_RANGE_SIZE)
+    page_ranges = [(start, min(start + range_size, total_pages)) for start in range(0, total_pages, range_size)]
+    max_in_flight = workers * 2  # Bound extracted-but-unconsumed pages
+
+    # Each worker parses the PDF once (initializer) and then serves page ranges
+    executor = ProcessPoolExecutor(
+        max_workers=min(workers, len(page_ranges)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_pdf_worker,
+        initargs=(file_content,)
+    )
+    try:
+        in_flight = deque()
+        next_range = 0
+        while next_range < len(page_ranges) or in_flight:
+            while next_range < len(page_ranges) and len(in_flight) < max_in_flight:
+                start, end = page_ranges[next_range]
+                in_flight.append((start, executor.submit(_extract_pdf_page_range, start, end)))
+                next_range += 1
+
+            # Consume ranges in submission order so pages come out in page order
+            start, future = in_flight.popleft()
+            try:
+                page_texts = future.result()
+            except Exception as e:
+                print(f"Parallel PDF extraction failed at page {start + 1}, continuing sequentially: {e}")
+                yield from _iter_pdf_segments_sequential(pdf_reader, start, total_pages)
+                return
+
+            for offset, text in enumerate(page_texts):
+                page_number = start + offset + 1
+                yield TextSegment(text, page_number, page_number, total_pages)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_worker_pdf_reader = None
+
+
+def _init_pdf_worker(file_content: bytes):
+    global _worker_pdf_reader
+    _worker_pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+
+
+def _extract_pdf_page_range(start: int, end: int) -> List[str]:
+    return [_worker_pdf_reader.pages[page_index].extract_text() or "" for page_index in range(start, end)]
+
+
+def iter_chunks(segments: Iterable[TextSegment], chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Split a stream of text segments into word-bounded chunks without materializing the full text"""
+    current_chunk: List[str] = []
+    current_size = 0
+    page_start = None
+    page_end = None
+    progress = 0.0
+
+    def make_chunk():
+        return {
+            "text": " ".join(current_chunk),
+            "page_start": page_start,
+            "page_end": page_end,
+            "progress": progress
+        }
+
+    for segment in segments:
+        progress = segment.position / segment.total if segment.total else 1.0
+        for word in segment.text.split():
+            if current_size + len(word) > chunk_size and current_chunk:
+                yield make_chunk()
+                current_chunk = [word]
+                current_size = len(word)
+                page_start = segment.page_number
+            else:
+                if not current_chunk:
+                    page_start = segment.page_number
+                current_chunk.append(word)
+                current_size += len(word) + 1  # +1 for space
+            page_end = segment.page_number
+
+    if current_chunk:
+        yield make_chunk()
+
+
+def extract_file_chunks(path: str, filename: str, content_type: str = None,
+                        chunk_size: int = None) -> Dict[str, Any]:
+    """
+    Read, extract and chunk one file (runs in a worker process)
+
+    Returns a picklable dict with the chunks, the file size and extraction time.
+    """
+    start_time = time.time()
+    try:
+        with open(path, "rb") as f:
+            file_content = f.read()
+        # Already running in a pool worker, so PDFs are read sequentially here
+        chunks = list(iter_chunks(
+            iter_text_segments(file_content, content_type or "", filename, parallel_pdf=False),
+            chunk_size or config.DEFAULT_CHUNK_SIZE
+        ))
+        return {
+            "success": True,
+            "filename": filename,
+            "size_bytes": len(file_content),
+            "chunks": chunks,
+            "extract_seconds": round(time.time() - start_time, 3)
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "filename": filename,
+            "error": f"Failed to extract text: {str(e)}",
+            "extract_seconds": round(time.time() - start_time, 3)
+        }
@@ -0,0 +1,103 @@
+# backend/app/vector_bulk_writer.py
+"""
+Vector Bulk Writer for Docsmait
+
+Streams points into a vector store collection for Knowledge Base ingestion:
+- Points are flushed in fixed-size batches with wait=False so Qdrant applies
+  one batch while the next is being embedded (the embedded store writes inline)
+- Failed flushes are retried with backoff before giving up
+- A flush callback lets callers checkpoint the number of chunks stored
+- finish() flushes the tail with wait=True and verifies the stored point count
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import config
+from .vector_store import VectorPoint, VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class VectorBulkWriteError(Exception):
+    """Raised when points could not be stored or verified in the vector store"""
+
+
+class VectorBulkWriter:
+    """Buffered, pipelined point writer for a single document"""
+
+    def __init__(self, vector_store: VectorStore, collection_name: str, batch_size: int = None,
+                 on_flush: Optional[Callable[[int], None]] = None, flushed: int = 0):
+        self.vector_store = vector_store
+        self.collection_name = collection_name
+        self.batch_size = max(1, batch_size or config.KB_UPSERT_BATCH_SIZE)
+        self.max_retries = max(0, config.KB_UPSERT_MAX_RETRIES)
+        self.on_flush = on_flush
+        self.flushed = flushed  # Chunks (points or skipped failures) handed to the store so far
+        self.points_written = 0
+        self.pending_operations: List[int] = []
+        self._buffer: List[VectorPoint] = []
+        self._buffered_chunks = 0
+        self._last_batch: List[VectorPoint] = []
+
+    def add(self, point: Optional[VectorPoint]) -> None:
+        """Queue one chunk's point (None for a chunk that could not be embedded)"""
+        if point is not None:
+            self._buffer.append(point)
+        self._buffered_chunks += 1
+        if self._buffered_chunks >= self.batch_size:
+            self.flush(wait=False)
+
+    def flush(self, wait: bool = False) -> None:
+        """Send buffered points to the vector store"""
+        if self._buffered_chunks == 0:
+            return
+
+        if self._buffer:
+            result = self._upsert_with_retry(self._buffer, wait)
+            operation_id = getattr(result, "operation_id", None)
+            if not wait and operation_id is not None:
+                self.pending_operations.append(operation_id)
+            self.points_written += len(self._buffer)
+            self._last_batch = self._buffer
+
+        self.flushed += self._buffered_chunks
+        self._buffer = []
+        self._buffered_chunks = 0
+
+        if self.on_flush:
+            self.on_flush(self.flushed)
+
+    def finish(self, points_filter: Dict[str, Any], expected_points: int) -> None:
+        """
+        Flush remaining points and wait until all pending operations are applied
+
+        Qdrant applies updates to a collection in order, so waiting on the final
+        upsert covers every earlier wait=False batch; the exact count check then
+        confirms nothing was dropped.
+        """
+        has_tail = bool(self._buffer)
+        self.flush(wait=True)
+        if not has_tail and self.pending_operations and self._last_batch:
+            # Nothing left to send; re-send the last batch (same ids, idempotent) and wait on it
+            self._upsert_with_retry(self._last_batch, wait=True)
+
+        stored = self.vector_store.count(self.collection_name, points_filter)
+        if stored < expected_points:
+            raise VectorBulkWriteError(
+                f"Expected {expected_points} points in '{self.collection_name}' but found {stored}"
+            )
+        self.pending_operations = []
+
+    def _upsert_with_retry(self, points: List[VectorPoint], wait: bool):
+        attempt = 0
+        while True:
+            try:
+                return self.vector_store.upsert(self.collection_name, points, wait=wait)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise VectorBulkWriteError(f"Upsert of {len(points)} points failed: {e}") from e
+                delay = min(2 ** attempt * 0.5, 10)
+                logger.warning(f"Vector upsert failed (attempt {attempt}/{self.max_retries}), retrying in {delay}s: {e}")
+                time.sleep(delay)
@@ -0,0 +1,742 @@
+# backend/app/vector_store.py
+"""
+Vector Store for Docsmait Knowledge Base
+
+One interface over the stores that hold KB chunk vectors:
+- QdrantVectorStore: the Qdrant server (VECTOR_DB=qdrant, default)
+- EmbeddedVectorStore: in-process store for small sites and CI (VECTOR_DB=embedded);
+  float32 matrices in memory-mapped files, vectorized cosine top-k and
+  append-only JSON payload sidecars, no extra container
+
+Collections can store embeddings quantized ("scalar" int8 or "binary" 1 bit per
+dimension). Searches then scan the compact codes, oversample candidates and
+rescore them with the original float vectors, which stay on disk.
+
+Filters use Qdrant's JSON filter format, of which the embedded store supports
+the subset Docsmait uses:
+    {"must": [...], "should": [...], "must_not": [...]} with conditions
+    {"key": k, "match": {"value": v}}, {"key": k, "match": {"any": [...]}},
+    {"key": k, "range": {"gte": n, ...}}, {"is_empty": {"key": k}} or a nested filter
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+COMPACT_MIN_GARBAGE = 1000  # Embedded store: dead rows/log entries tolerated before compacting
+SCORE_BLOCK_ROWS = 65536  # Embedded store: quantized codes scored per block
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def quantization_bytes_per_vector(quantization: str, dimensions: int) -> int:
+    """Bytes of the in-memory index per vector (float32 when not quantized)"""
+    if quantization == "scalar":
+        return dimensions
+    if quantization == "binary":
+        return (dimensions + 7) // 8
+    return dimensions * 4
+
+
+class VectorPoint(NamedTuple):
+    """A chunk vector to store"""
+    id: str
+    vector: List[float]
+    payload: Dict[str, Any]
+
+
+class VectorRecord(NamedTuple):
+    """A stored point returned by search (with score) or scroll"""
+    id: str
+    payload: Dict[str, Any]
+    score: Optional[float] = None
+
+
+class VectorStore:
+    """Interface implemented by the vector store backends"""
+
+    backend = ""
+
+    def create_collection(self, collection_name: str, dimensions: int, quantization: str = "none") -> None:
+        """Create a cosine-distance collection; no-op if it already exists"""
+        raise NotImplementedError
+
+    def set_quantization(self, collection_name: str, quantization: str) -> None:
+        """Switch an existing collection to another quantization mode (re-encodes stored vectors)"""
+        raise NotImplementedError
+
+    def delete_collection(self, collection_name: str) -> None:
+        raise NotImplementedError
+
+    def list_collections(self) -> List[str]:
+        raise NotImplementedError
+
+    def upsert(self, collection_name: str, points: List[VectorPoint], wait: bool = True) -> Any:
+        """Insert or replace points; with wait=False a backend may apply them asynchronously"""
+        raise NotImplementedError
+
+    def search(self, collection_name: str, vector: List[float], limit: int,
+               query_filter: Optional[Dict[str, Any]] = None) -> List[VectorRecord]:
+        """Top-k points by cosine similarity, optionally restricted by a payload filter"""
+        raise NotImplementedError
+
+    def count(self, collection_name: str, count_filter: Optional[Dict[str, Any]] = None) -> int:
+        raise NotImplementedError
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[Dict[str, Any]] = None,
+               limit: int = 256, offset: Any = None) -> Tuple[List[VectorRecord], Any]:
+        """One page of points (payloads only); returns (records, next offset or None)"""
+        raise NotImplementedError
+
+    def delete_points(self, collection_name: str, point_ids: List[str]) -> None:
+        raise NotImplementedError
+
+    def delete_by_filter(self, collection_name: str, points_filter: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def set_payload(self, collection_name: str, payload: Dict[str, Any], point_ids: List[str]) -> None:
+        """Merge the same payload keys into several points"""
+        raise NotImplementedError
+
+    def set_payloads(self, collection_name: str, payloads: Dict[str, Dict[str, Any]]) -> None:
+        """Merge per-point payload keys ({point_id: payload}) in one operation"""
+        raise NotImplementedError
+
+
+# ========== Qdrant ==========
+
+class QdrantVectorStore(VectorStore):
+    """Vector store backed by a Qdrant server"""
+
+    backend = "qdrant"
+
+    def __init__(self, url: str, oversampling: float = 1.0):
+        import qdrant_client
+        from qdrant_client.http import models
+
+        self.client = qdrant_client.QdrantClient(url=url)
+        self.models = models
+        # Applies only to quantized collections; the rest search original vectors anyway
+        self.search_params = models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=True, oversampling=oversampling)
+        )
+
+    def _filter(self, points_filter: Optional[Dict[str, Any]]):
+        return self.models.Filter(**points_filter) if points_filter else None
+
+    def _quantization_config(self, quantization: str):
+        if quantization == "scalar":
+            return self.models.ScalarQuantization(scalar=self.models.ScalarQuantizationConfig(
+                type=self.models.ScalarType.INT8, quantile=0.99, always_ram=True
+            ))
+        if quantization == "binary":
+            return self.models.BinaryQuantization(binary=self.models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def create_collection(self, collection_name: str, dimensions: int, quantization: str = "none") -> None:
+        try:
+            self.client.create_collection(
+                collection_name=collection_name,
+                # Quantized codes stay in RAM; originals move to disk and are read only for rescoring
+                vectors_config=self.models.VectorParams(
+                    size=dimensions, distance=self.models.Distance.COSINE, on_disk=quantization != "none"
+                ),
+                quantization_config=self._quantization_config(quantization)
+            )
+        except Exception as e:
+            # Collection already exists (409 Conflict)
+            if "already exists" not in str(e) and "409" not in str(e):
+                raise
+
+    def set_quantization(self, collection_name: str, quantization: str) -> None:
+        self.client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": self.models.VectorParamsDiff(on_disk=quantization != "none")},
+            quantization_config=self._quantization_config(quantization) or self.models.Disabled.DISABLED
+        )
+
+    def delete_collection(self, collection_name: str) -> None:
+        self.client.delete_collection(collection_name)
+
+    def list_collections(self) -> List[str]:
+        return [collection.name for collection in self.client.get_collections().collections]
+
+    def upsert(self, collection_name: str, points: List[VectorPoint], wait: bool = True) -> Any:
+        return self.client.upsert(
+            collection_name=collection_name,
+            points=[self.models.PointStruct(id=point.id, vector=point.vector, payload=point.payload) for point in points],
+            wait=wait
+        )
+
+    def search(self, collection_name: str, vector: List[float], limit: int,
+               query_filter: Optional[Dict[str, Any]] = None) -> List[VectorRecord]:
+        hits = self.client.search(
+            collection_name=collection_name,
+            query_vector=vector,
+            query_filter=self._filter(query_filter),
+            search_params=self.search_params,
+            limit=limit,
+            with_payload=True
+        )
+        return [VectorRecord(str(hit.id), hit.payload or {}, hit.score) for hit in hits]
+
+    def count(self, collection_name: str, count_filter: Optional[Dict[str, Any]] = None) -> int:
+        return self.client.count(
+            collection_name=collection_name, count_filter=self._filter(count_filter), exact=True
+        ).count
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[Dict[str, Any]] = None,
+               limit: int = 256, offset: Any = None) -> Tuple[List[VectorRecord], Any]:
+        records, next_offset = self.client.scroll(
+            collection_name=collection_name,
+            scroll_filter=self._filter(scroll_filter),
+            limit=limit,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        return [VectorRecord(str(record.id), record.payload or {}) for record in records], next_offset
+
+    def delete_points(self, collection_name: str, point_ids: List[str]) -> None:
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=self.models.PointIdsList(points=list(point_ids))
+        )
+
+    def delete_by_filter(self, collection_name: str, points_filter: Dict[str, Any]) -> None:
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=self.models.FilterSelector(filter=self._filter(points_filter))
+        )
+
+    def set_payload(self, collection_name: str, payload: Dict[str, Any], point_ids: List[str]) -> None:
+        self.client.set_payload(collection_name=collection_name, payload=payload, points=list(point_ids))
+
+    def set_payloads(self, collection_name: str, payloads: Dict[str, Dict[str, Any]]) -> None:
+        if not payloads:
+            return
+        self.client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                self.models.SetPayloadOperation(set_payload=self.models.SetPayload(payload=payload, points=[point_id]))
+                for point_id, payload in payloads.items()
+            ]
+        )
+
+
+# ========== Embedded (NumPy + mmap) ==========
+
+def matches_filter(payload: Dict[str, Any], points_filter: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Qdrant-style filter against a payload"""
+    if not points_filter:
+        return True
+    if not all(_matches_condition(payload, condition) for condition in points_filter.get("must") or []):
+        return False
+    should = points_filter.get("should") or []
+    if should and not any(_matches_condition(payload, condition) for condition in should):
+        return False
+    return not any(_matches_condition(payload, condition) for condition in points_filter.get("must_not") or [])
+
+
+def _matches_condition(payload: Dict[str, Any], condition: Dict[str, Any]) -> bool:
+    if "must" in condition or "should" in condition or "must_not" in condition:
+        return matches_filter(payload, condition)
+    if "is_empty" in condition:
+        value = payload.get(condition["is_empty"]["key"])
+        return value is None or value == []
+
+    value = payload.get(condition["key"])
+    if condition.get("match") is not None:
+        match = condition["match"]
+        if "value" in match:
+            return value == match["value"]
+        if "any" in match:
+            return value in match["any"]
+    if condition.get("range") is not None:
+        if value is None:
+            return False
+        bounds = condition["range"]
+        return ((bounds.get("gt") is None or value > bounds["gt"])
+                and (bounds.get("gte") is None or value >= bounds["gte"])
+                and (bounds.get("lt") is None or value < bounds["lt"])
+                and (bounds.get("lte") is None or value <= bounds["lte"]))
+    raise ValueError(f"Unsupported filter condition: {condition}")
+
+
+class _EmbeddedCollection:
+    """
+    One collection on disk: meta.json, vectors.f32 (capacity x dimensions float32,
+    L2-normalized rows), payloads.jsonl (append-only put/set/delete log) and,
+    when quantized, codes.q (int8 codes or packed sign bits per row)
+
+    State is replayed from the log and refreshed incrementally when another
+    process (e.g. a maintenance script) appends to it; compaction and
+    quantization changes bump the generation so readers reload from scratch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta_path = os.path.join(path, "meta.json")
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.codes_path = os.path.join(path, "codes.q")
+        self.log_path = os.path.join(path, "payloads.jsonl")
+        self.generation = None
+        self._load()
+
+    # ----- Disk state -----
+
+    def _read_meta(self) -> Dict[str, Any]:
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self) -> None:
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({
+                "dimensions": self.dimensions,
+                "capacity": self.capacity,
+                "rows": self.rows,
+                "generation": self.generation,
+                "quantization": self.quantization,
+                "int8_scale": self.int8_scale
+            }, f)
+        os.replace(temp_path, self.meta_path)
+
+    def _load(self) -> None:
+        meta = self._read_meta()
+        self.dimensions = meta["dimensions"]
+        self.generation = meta["generation"]
+        self.quantization = meta.get("quantization", "none")
+        self.int8_scale = meta.get("int8_scale")
+        self.ids: List[Optional[str]] = []
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.log_offset = 0
+        self.log_entries = 0
+        self.rows = 0
+        self._map_vectors(meta["capacity"])
+        self._replay()
+
+    def _map_vectors(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(max(capacity, 1), self.dimensions))
+        self.vectors_inode = os.stat(self.vectors_path).st_ino
+        self.codes = self._map_codes(self.codes_path, self.quantization, capacity)
+        alive = np.zeros(max(capacity, 1), dtype=bool)
+        if self.rows:
+            alive[:self.rows] = [point_id is not None for point_id in self.ids]
+        self.alive = alive
+
+    def _map_codes(self, path: str, quantization: str, capacity: int, mode: str = "r+"):
+        """Memory-map the quantized codes file (created or extended to capacity)"""
+        if quantization == "none":
+            return None
+        dtype = np.int8 if quantization == "scalar" else np.uint8
+        width = quantization_bytes_per_vector(quantization, self.dimensions)
+        size = max(capacity, 1) * width
+        if mode == "r+" and (not os.path.exists(path) or os.path.getsize(path) < size):
+            with open(path, "ab") as f:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode=mode, shape=(max(capacity, 1), width))
+
+    def _encode(self, matrix: np.ndarray) -> np.ndarray:
+        """Quantize normalized rows"""
+        if self.quantization == "scalar":
+            return np.clip(np.rint(matrix * self.int8_scale), -127, 127).astype(np.int8)
+        return np.packbits(matrix > 0, axis=1)
+
+    def _calibrate(self, matrix: np.ndarray) -> None:
+        """Pick the int8 scale so the 99th percentile component maps to 127"""
+        if self.quantization == "scalar" and not self.int8_scale and len(matrix):
+            self.int8_scale = float(127.0 / max(float(np.quantile(np.abs(matrix), 0.99)), 1e-6))
+
+    def _replay(self) -> None:
+        """Apply log entries appended since the last replay"""
+        with open(self.log_path, "rb") as f:
+            f.seek(self.log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Partially written entry; picked up on the next refresh
+                self._apply(json.loads(line))
+                self.log_offset += len(line)
+                self.log_entries += 1
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        if "put" in entry:
+            point_id, row = entry["put"], entry["row"]
+            previous = self.id_to_row.get(point_id)
+            if previous is not None and previous != row:
+                self._kill(previous)
+            while len(self.ids) <= row:
+                self.ids.append(None)
+                self.payloads.append(None)
+            self.rows = max(self.rows, row + 1)
+            if row >= self.capacity:
+                self._map_vectors(self._read_meta()["capacity"])
+            self.ids[row] = point_id
+            self.payloads[row] = entry["payload"]
+            self.id_to_row[point_id] = row
+            self.alive[row] = True
+        elif "set" in entry:
+            row = self.id_to_row.get(entry["set"])
+            if row is not None:
+                self.payloads[row] = dict(self.payloads[row], **entry["payload"])
+        elif "delete" in entry:
+            row = self.id_to_row.get(entry["delete"])
+            if row is not None:
+                self._kill(row)
+
+    def _kill(self, row: int) -> None:
+        self.id_to_row.pop(self.ids[row], None)
+        self.ids[row] = None
+        self.payloads[row] = None
+        self.alive[row] = False
+
+    def refresh(self) -> None:
+        """Pick up changes made by other processes"""
+        meta = self._read_meta()
+        log_size = os.path.getsize(self.log_path)
+        # Compacted, re-quantized, or deleted and recreated by another process
+        if (meta["generation"] != self.generation or log_size < self.log_offset
+                or os.stat(self.vectors_path).st_ino != self.vectors_inode):
+            self._load()
+        elif log_size > self.log_offset:
+            self._replay()
+
+    def _append_log(self, entries: List[Dict[str, Any]]) -> None:
+        with open(self.log_path, "ab") as f:
+            f.write(b"".join((json.dumps(entry) + "\n").encode("utf-8") for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @property
+    def live_count(self) -> int:
+        return len(self.id_to_row)
+
+    # ----- Writes (caller holds the exclusive file lock) -----
+
+    def upsert(self, points: List[VectorPoint]) -> None:
+        if not points:
+            return
+        matrix = np.asarray([point.vector for point in points], dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-dimensional vectors, got shape {matrix.shape}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        rows = []
+        next_row = self.rows
+        for point in points:
+            row = self.id_to_row.get(str(point.id))
+            if row is None:
+                row = next_row
+                next_row += 1
+            rows.append(row)
+        if next_row > self.capacity:
+            self._grow(next_row)
+
+        # Vectors (and codes) are durable before the log references them
+        self.vectors[rows] = matrix
+        self.vectors.flush()
+        if self.codes is not None:
+            self._calibrate(matrix)
+            self.codes[rows] = self._encode(matrix)
+            self.codes.flush()
+        entries = [{"put": str(point.id), "row": row, "payload": point.payload} for point, row in zip(points, rows)]
+        self._append_log(entries)
+        for entry in entries:
+            self._apply(entry)
+        self.log_offset = os.path.getsize(self.log_path)
+        self.log_entries += len(entries)
+        self._write_meta()
+        self._maybe_compact()
+
+    def _grow(self, required_rows: int) -> None:
+        capacity = max(1024, self.capacity)
+        while capacity < required_rows:
+            capacity *= 2
+        self.vectors.flush()
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dimensions * 4)
+        self._map_vectors(capacity)
+        self._write_meta()
+
+    def log_change(self, entries: List[Dict[str, Any]]) -> None:
+        """Persist and apply set/delete entries"""
+        if not entries:
+            return
+        self._append_log(entries)
+        for entry in entries:
+            self._apply(entry)
+        self.log_offset = os.path.getsize(self.log_path)
+        self.log_entries += len(entries)
+        self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        """Compact once dead rows or superseded log entries outnumber live points"""
+        dead_rows = self.rows - self.live_count
+        if max(dead_rows, self.log_entries - self.live_count) > max(self.live_count, COMPACT_MIN_GARBAGE):
+            self.compact()
+
+    def compact(self, quantization: str = None) -> None:
+        """Rewrite vectors, codes and log with live points only, optionally switching quantization"""
+        quantization = quantization or self.quantization
+        live_rows = [row for row in range(self.rows) if self.ids[row] is not None]
+        capacity = max(1024, len(live_rows))
+        temp_vectors = self.vectors_path + ".tmp"
+        compacted = np.memmap(temp_vectors, dtype=np.float32, mode="w+", shape=(capacity, self.dimensions))
+        for start in range(0, len(live_rows), SCORE_BLOCK_ROWS):
+            block = live_rows[start:start + SCORE_BLOCK_ROWS]
+            compacted[start:start + len(block)] = self.vectors[block]
+        compacted.flush()
+
+        temp_codes = None
+        if quantization != "none":
+            if quantization != self.quantization:
+                self.quantization, self.int8_scale = quantization, None
+                self._calibrate(np.asarray(compacted[:min(len(live_rows), SCORE_BLOCK_ROWS)]))
+            temp_codes = self.codes_path + ".tmp"
+            codes = self._map_codes(temp_codes, quantization, capacity, mode="w+")
+            for start in range(0, len(live_rows), SCORE_BLOCK_ROWS):
+                end = min(start + SCORE_BLOCK_ROWS, len(live_rows))
+                codes[start:end] = self._encode(np.asarray(compacted[start:end]))
+            codes.flush()
+            del codes
+        del compacted
+
+        temp_log = self.log_path + ".tmp"
+        with open(temp_log, "wb") as f:
+            for new_row, row in enumerate(live_rows):
+                f.write((json.dumps({"put": self.ids[row], "row": new_row, "payload": self.payloads[row]}) + "\n").encode("utf-8"))
+
+        os.replace(temp_vectors, self.vectors_path)
+        if temp_codes:
+            os.replace(temp_codes, self.codes_path)
+        elif os.path.exists(self.codes_path):
+            os.remove(self.codes_path)
+        os.replace(temp_log, self.log_path)
+        self.quantization = quantization
+        if quantization != "scalar":
+            self.int8_scale = None
+        self.generation += 1
+        self.rows = len(live_rows)
+        self.capacity = capacity
+        self._write_meta()
+        self._load()
+
+    # ----- Reads -----
+
+    def search(self, vector: List[float], limit: int, query_filter: Optional[Dict[str, Any]],
+               oversampling: float = 1.0) -> List[VectorRecord]:
+        if self.rows == 0 or limit <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        if self.codes is None:
+            scores = np.asarray(self.vectors[:self.rows] @ query)
+            rows = self._top_rows(scores, limit, query_filter)
+            return [self._record(int(row), scores[row]) for row in rows]
+
+        # Rank by the quantized codes, then rescore the oversampled candidates exactly
+        candidates = self._top_rows(self._approximate_scores(query), max(limit, int(limit * oversampling)), query_filter)
+        if len(candidates) == 0:
+            return []
+        candidates = np.sort(candidates)  # Sequential reads from the on-disk vectors
+        exact = np.asarray(self.vectors[candidates] @ query)
+        order = np.argsort(-exact)[:limit]
+        return [self._record(int(candidates[index]), exact[index]) for index in order]
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Scores from the codes, block by block so memory stays bounded"""
+        scores = np.empty(self.rows, dtype=np.float32)
+        query_bits = np.packbits(query > 0) if self.quantization == "binary" else None
+        for start in range(0, self.rows, SCORE_BLOCK_ROWS):
+            block = self.codes[start:min(start + SCORE_BLOCK_ROWS, self.rows)]
+            if query_bits is None:
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+            else:
+                # Fewer differing sign bits = closer
+                scores[start:start + len(block)] = -_POPCOUNT[np.bitwise_xor(block, query_bits)].sum(axis=1, dtype=np.int32)
+        return scores
+
+    def _top_rows(self, scores: np.ndarray, count: int, query_filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Best-scoring live rows (passing the filter), best first"""
+        scores[~self.alive[:self.rows]] = -np.inf
+        if query_filter:
+            # Walk candidates best-first until enough of them pass the filter
+            rows = []
+            for row in np.argsort(-scores):
+                if not np.isfinite(scores[row]):
+                    break
+                if matches_filter(self.payloads[row], query_filter):
+                    rows.append(row)
+                    if len(rows) >= count:
+                        break
+            return np.asarray(rows, dtype=np.int64)
+
+        k = min(count, self.live_count)
+        if k == 0:
+            return np.asarray([], dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def _record(self, row: int, score=None) -> VectorRecord:
+        return VectorRecord(self.ids[row], dict(self.payloads[row]), None if score is None else float(score))
+
+    def matching_rows(self, points_filter: Optional[Dict[str, Any]], start: int = 0) -> Iterable[int]:
+        for row in range(start, self.rows):
+            if self.ids[row] is not None and matches_filter(self.payloads[row], points_filter):
+                yield row
+
+
+class EmbeddedVectorStore(VectorStore):
+    """
+    In-process vector store on local disk
+
+    Intended for single-node deployments and CI. Threads share one in-memory
+    view per collection; other processes on the same host (maintenance
+    scripts) coordinate through a per-collection file lock and see each
+    other's writes on their next call.
+    """
+
+    backend = "embedded"
+
+    def __init__(self, root_path: str, oversampling: float = 1.0):
+        self.root_path = root_path
+        self.oversampling = oversampling
+        os.makedirs(root_path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._collections: Dict[str, _EmbeddedCollection] = {}
+
+    def _collection_path(self, collection_name: str) -> str:
+        if not collection_name or os.sep in collection_name or collection_name in (".", ".."):
+            raise ValueError(f"Invalid collection name: {collection_name!r}")
+        return os.path.join(self.root_path, collection_name)
+
+    @contextmanager
+    def _open(self, collection_name: str, exclusive: bool = False):
+        """Yield the refreshed collection while holding the thread and file locks"""
+        path = self._collection_path(collection_name)
+        with self._lock:
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                self._collections.pop(collection_name, None)
+                raise ValueError(f"Collection '{collection_name}' not found")
+            with open(os.path.join(path, ".lock"), "a+") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    collection = self._collections.get(collection_name)
+                    if collection is None:
+                        collection = self._collections[collection_name] = _EmbeddedCollection(path)
+                    else:
+                        collection.refresh()
+                    yield collection
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def create_collection(self, collection_name: str, dimensions: int, quantization: str = "none") -> None:
+        path = self._collection_path(collection_name)
+        with self._lock:
+            if os.path.exists(os.path.join(path, "meta.json")):
+                return
+            os.makedirs(path, exist_ok=True)
+            capacity = 1024
+            with open(os.path.join(path, "vectors.f32"), "wb") as f:
+                f.truncate(capacity * dimensions * 4)
+            open(os.path.join(path, "payloads.jsonl"), "wb").close()
+            temp_path = os.path.join(path, "meta.json.tmp")
+            with open(temp_path, "w") as f:
+                json.dump({
+                    "dimensions": dimensions, "capacity": capacity, "rows": 0, "generation": 0,
+                    "quantization": quantization, "int8_scale": None
+                }, f)
+            os.replace(temp_path, os.path.join(path, "meta.json"))
+
+    def set_quantization(self, collection_name: str, quantization: str) -> None:
+        with self._open(collection_name, exclusive=True) as collection:
+            if quantization != collection.quantization:
+                collection.compact(quantization)
+
+    def delete_collection(self, collection_name: str) -> None:
+        path = self._collection_path(collection_name)
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def list_collections(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.root_path)
+            if os.path.exists(os.path.join(self.root_path, name, "meta.json"))
+        )
+
+    def upsert(self, collection_name: str, points: List[VectorPoint], wait: bool = True) -> Any:
+        with self._open(collection_name, exclusive=True) as collection:
+            collection.upsert(points)
+        return None
+
+    def search(self, collection_name: str, vector: List[float], limit: int,
+               query_filter: Optional[Dict[str, Any]] = None) -> List[VectorRecord]:
+        with self._open(collection_name) as collection:
+            return collection.search(vector, limit, query_filter, self.oversampling)
+
+    def count(self, collection_name: str, count_filter: Optional[Dict[str, Any]] = None) -> int:
+        with self._open(collection_name) as collection:
+            if not count_filter:
+                return collection.live_count
+            return sum(1 for _ in collection.matching_rows(count_filter))
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[Dict[str, Any]] = None,
+               limit: int = 256, offset: Any = None) -> Tuple[List[VectorRecord], Any]:
+        with self._open(collection_name) as collection:
+            records = []
+            for row in collection.matching_rows(scroll_filter, start=int(offset or 0)):
+                if len(records) >= limit:
+                    return records, row
+                records.append(collection._record(row))
+            return records, None
+
+    def delete_points(self, collection_name: str, point_ids: List[str]) -> None:
+        with self._open(collection_name, exclusive=True) as collection:
+            collection.log_change([{"delete": str(point_id)} for point_id in point_ids
+                                   if str(point_id) in collection.id_to_row])
+
+    def delete_by_filter(self, collection_name: str, points_filter: Dict[str, Any]) -> None:
+        with self._open(collection_name, exclusive=True) as collection:
+            collection.log_change([{"delete": collection.ids[row]} for row in collection.matching_rows(points_filter)])
+
+    def set_payload(self, collection_name: str, payload: Dict[str, Any], point_ids: List[str]) -> None:
+        self.set_payloads(collection_name, {point_id: payload for point_id in point_ids})
+
+    def set_payloads(self, collection_name: str, payloads: Dict[str, Dict[str, Any]]) -> None:
+        with self._open(collection_name, exclusive=True) as collection:
+            collection.log_change([{"set": str(point_id), "payload": payload} for point_id, payload in payloads.items()
+                                   if str(point_id) in collection.id_to_row])
+
+
+def create_vector_store(backend: str = None) -> VectorStore:
+    """Vector store for the configured (or given) backend"""
+    backend = (backend or config.VECTOR_DB).lower()
+    if backend == "qdrant":
+        return QdrantVectorStore(config.QDRANT_URL, config.KB_QUANTIZATION_OVERSAMPLING)
+    if backend == "embedded":
+        return EmbeddedVectorStore(config.VECTOR_STORE_PATH, config.KB_QUANTIZATION_OVERSAMPLING)
+    raise ValueError(f"Unknown VECTOR_DB '{backend}' (expected 'qdrant' or 'embedded')")
+
+
+# Create global vector store instance
+vector_store = create_vector_store()
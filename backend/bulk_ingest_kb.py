@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Knowledge Base Bulk Ingest Script for Docsmait
+
+Loads a zip/tar archive or a directory of documents (.pdf, .docx, .txt, .md)
+into a Knowledge Base collection, using the same pipeline as bulk ingestion
+jobs: text extraction across a process pool, then shared batched embedding
+and Qdrant upserts.
+
+Features:
+- Processes directories recursively
+- Extraction workers default to one per CPU core
+- Re-running with the same --run-id skips files that were already ingested
+- Prints a per-file summary (chunks, timings, failures)
+
+Usage:
+    python bulk_ingest_kb.py PATH [--collection NAME] [--chunk-size N] [--workers N] [--run-id ID]
+"""
+
+import os
+import sys
+import uuid
+import logging
+
+# Add the app directory to Python path
+sys.path.append('/app')
+
+from app.config import config
+from app.bulk_ingest_service import bulk_ingest_service
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+def print_summary(result: dict):
+    """Print the per-file summary of a bulk ingest run"""
+    logger.info("=== Bulk Ingest Summary ===")
+    for file_summary in result.get("files", []):
+        if file_summary.get("skipped"):
+            logger.info(f"SKIP  {file_summary['filename']}: already ingested")
+        elif file_summary["success"]:
+            logger.info(f"OK    {file_summary['filename']}: {file_summary['chunks']} chunks "
+                        f"(extract {file_summary.get('extract_seconds')}s, ingest {file_summary.get('ingest_seconds')}s)")
+        else:
+            logger.info(f"FAIL  {file_summary['filename']}: {file_summary.get('error')}")
+    logger.info(f"Files: {result.get('files_total', 0)} total, {result.get('files_succeeded', 0)} succeeded, "
+                f"{result.get('files_failed', 0)} failed, {result.get('files_skipped', 0)} skipped")
+    logger.info(f"Chunks created: {result.get('chunks_created', 0)} in {result.get('processing_time', 0)}s")
+
+def main():
+    """Main entry point for the script"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk ingest documents into a Docsmait Knowledge Base collection")
+    parser.add_argument('path', help='Directory or zip/tar archive to ingest')
+    parser.add_argument('--collection', default=config.DEFAULT_COLLECTION_NAME, help='Target collection name')
+    parser.add_argument('--chunk-size', type=int, default=None, help='Chunk size (defaults to DEFAULT_CHUNK_SIZE)')
+    parser.add_argument('--workers', type=int, default=None, help='Extraction worker processes (defaults to CPU count)')
+    parser.add_argument('--run-id', default=None, help='Run id; re-use it to resume an interrupted run')
+
+    args = parser.parse_args()
+
+    if args.workers:
+        bulk_ingest_service.extract_workers = args.workers
+
+    run_id = args.run_id or str(uuid.uuid4())
+    logger.info(f"Bulk ingest run id: {run_id} (pass --run-id {run_id} to resume)")
+
+    try:
+        if os.path.isdir(args.path):
+            result = bulk_ingest_service.ingest_directory(
+                args.path, args.collection, chunk_size=args.chunk_size, run_id=run_id
+            )
+        elif os.path.isfile(args.path):
+            result = bulk_ingest_service.ingest_archive(
+                args.path, args.collection, chunk_size=args.chunk_size, run_id=run_id
+            )
+        else:
+            logger.error(f"Path not found: {args.path}")
+            sys.exit(1)
+
+        if "files" in result:
+            print_summary(result)
+        else:
+            logger.error(result.get("error", "Bulk ingest failed"))
+
+        sys.exit(0 if result.get("success") else 1)
+
+    except Exception as e:
+        logger.error(f"Bulk ingest failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
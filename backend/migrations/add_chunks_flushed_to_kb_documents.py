@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Migration: Add chunks_flushed column to kb_documents table
+Resume checkpoint for ingestions interrupted after part of a document was written to Qdrant
+"""
+
+import sys
+import os
+from sqlalchemy import create_engine, text
+
+# Add the backend app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from config import config
+
+def run_migration():
+    """Add chunks_flushed column to kb_documents table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_documents ADD COLUMN IF NOT EXISTS chunks_flushed INTEGER DEFAULT 0"))
+            
+            # Completed documents were fully written
+            conn.execute(text("""
+            UPDATE kb_documents 
+            SET chunks_flushed = COALESCE(chunk_count, 0) 
+            WHERE status = 'completed'
+            """))
+            conn.commit()
+            
+            print("✅ Successfully added 'chunks_flushed' column to kb_documents table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+def rollback_migration():
+    """Remove chunks_flushed column from kb_documents table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_documents DROP COLUMN IF EXISTS chunks_flushed"))
+            conn.commit()
+            
+            print("✅ Successfully removed 'chunks_flushed' column from kb_documents table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Rollback failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rollback":
+        success = rollback_migration()
+    else:
+        success = run_migration()
+    
+    sys.exit(0 if success else 1)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration: Add content_version column to kb_collections table
+Bumped on document add/delete/reset so cached chat answers are invalidated
+"""
+
+import sys
+import os
+from sqlalchemy import create_engine, text
+
+# Add the backend app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from config import config
+
+def run_migration():
+    """Add content_version column to kb_collections table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_collections ADD COLUMN IF NOT EXISTS content_version INTEGER DEFAULT 0"))
+            conn.execute(text("UPDATE kb_collections SET content_version = 0 WHERE content_version IS NULL"))
+            conn.commit()
+            
+            print("✅ Successfully added 'content_version' column to kb_collections table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+def rollback_migration():
+    """Remove content_version column from kb_collections table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_collections DROP COLUMN IF EXISTS content_version"))
+            conn.commit()
+            
+            print("✅ Successfully removed 'content_version' column from kb_collections table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Rollback failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rollback":
+        success = rollback_migration()
+    else:
+        success = run_migration()
+    
+    sys.exit(0 if success else 1)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Migration: Add source_id column to kb_documents table
+Used by incremental re-indexing to keep one KB document per source document/template
+"""
+
+import sys
+import os
+from sqlalchemy import create_engine, text
+
+# Add the backend app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from config import config
+
+def run_migration():
+    """Add source_id column (and index) to kb_documents table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_documents ADD COLUMN IF NOT EXISTS source_id VARCHAR(100)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_kb_documents_source_id ON kb_documents (source_id)"))
+            conn.commit()
+            
+            print("✅ Successfully added 'source_id' column to kb_documents table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+def rollback_migration():
+    """Remove source_id column from kb_documents table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS ix_kb_documents_source_id"))
+            conn.execute(text("ALTER TABLE kb_documents DROP COLUMN IF EXISTS source_id"))
+            conn.commit()
+            
+            print("✅ Successfully removed 'source_id' column from kb_documents table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Rollback failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rollback":
+        success = rollback_migration()
+    else:
+        success = run_migration()
+    
+    sys.exit(0 if success else 1)
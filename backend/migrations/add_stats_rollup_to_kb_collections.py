@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Migration: Add statistics rollup columns to kb_collections table
+pending_document_count and last_document_at back /kb/stats together with the
+kb_query_daily_counts table (created at startup). Run repair_kb_stats.py
+afterwards to backfill both.
+"""
+
+import sys
+import os
+from sqlalchemy import create_engine, text
+
+# Add the backend app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from config import config
+
+def run_migration():
+    """Add pending_document_count and last_document_at columns to kb_collections table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_collections ADD COLUMN IF NOT EXISTS pending_document_count INTEGER DEFAULT 0"))
+            conn.execute(text("ALTER TABLE kb_collections ADD COLUMN IF NOT EXISTS last_document_at TIMESTAMP WITH TIME ZONE"))
+            conn.execute(text("UPDATE kb_collections SET pending_document_count = 0 WHERE pending_document_count IS NULL"))
+            conn.commit()
+            
+            print("✅ Successfully added statistics rollup columns to kb_collections table")
+            print("   Run repair_kb_stats.py to backfill the rollups")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+def rollback_migration():
+    """Remove statistics rollup columns from kb_collections table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_collections DROP COLUMN IF EXISTS pending_document_count"))
+            conn.execute(text("ALTER TABLE kb_collections DROP COLUMN IF EXISTS last_document_at"))
+            conn.execute(text("DROP TABLE IF EXISTS kb_query_daily_counts"))
+            conn.commit()
+            
+            print("✅ Successfully removed statistics rollup columns from kb_collections table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Rollback failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rollback":
+        success = rollback_migration()
+    else:
+        success = run_migration()
+    
+    sys.exit(0 if success else 1)
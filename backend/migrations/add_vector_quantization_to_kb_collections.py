@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Migration: Add vector_quantization column to kb_collections table
+Records how each collection stores its embeddings (none, scalar int8, binary).
+Existing collections are recorded as 'none'; convert them afterwards with
+set_vector_quantization.py (or PUT /kb/collections/{name} with "quantization").
+"""
+
+import sys
+import os
+from sqlalchemy import create_engine, text
+
+# Add the backend app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from config import config
+
+def run_migration():
+    """Add vector_quantization column to kb_collections table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_collections ADD COLUMN IF NOT EXISTS vector_quantization VARCHAR(20) DEFAULT 'none'"))
+            conn.execute(text("UPDATE kb_collections SET vector_quantization = 'none' WHERE vector_quantization IS NULL"))
+            conn.commit()
+            
+            print("✅ Successfully added 'vector_quantization' column to kb_collections table")
+            print("   Run set_vector_quantization.py to quantize existing collections")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+def rollback_migration():
+    """Remove vector_quantization column from kb_collections table"""
+    engine = create_engine(config.DATABASE_URL)
+    
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE kb_collections DROP COLUMN IF EXISTS vector_quantization"))
+            conn.commit()
+            
+            print("✅ Successfully removed 'vector_quantization' column from kb_collections table")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Rollback failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rollback":
+        success = rollback_migration()
+    else:
+        success = run_migration()
+    
+    sys.exit(0 if success else 1)
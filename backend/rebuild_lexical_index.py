@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Lexical Index Rebuild Script for Docsmait
+
+Rebuilds the PostgreSQL full-text index (kb_chunks) of Knowledge Base
+collections from the chunk text stored in vector store payloads. New chunks are
+indexed at ingest time; run this once after upgrading to index existing
+collections, or whenever the lexical index has drifted.
+
+Usage:
+    python rebuild_lexical_index.py [--collection NAME] [--batch-size N]
+"""
+
+import sys
+import logging
+
+# Add the app directory to Python path
+sys.path.append('/app')
+
+from app.database_config import get_db
+from app.db_models import KBCollection
+from app.kb_service_pg import kb_service
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+def rebuild_collection(collection_name: str, batch_size: int) -> int:
+    """Re-index all chunk points of one collection; returns the number of chunks indexed"""
+    kb_service.lexical_index.delete_collection(collection_name)
+
+    indexed = 0
+    offset = None
+    while True:
+        records, offset = kb_service.vector_store.scroll(collection_name, limit=batch_size, offset=offset)
+        rows = []
+        for record in records:
+            payload = dict(record.payload)
+            if not payload.get("text"):
+                continue
+            # Points written before kb_document_id existed carry the KB document id as document_id
+            payload.setdefault("kb_document_id", payload.get("document_id"))
+            rows.append(kb_service._lexical_row(str(record.id), payload))
+        kb_service.lexical_index.add_chunks(collection_name, rows)
+        indexed += len(rows)
+        if offset is None:
+            break
+    return indexed
+
+def main():
+    """Main entry point for the script"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the Knowledge Base full-text (lexical) index")
+    parser.add_argument('--collection', default=None, help='Collection to rebuild (default: all collections)')
+    parser.add_argument('--batch-size', type=int, default=256, help='Points read from the vector store per batch')
+
+    args = parser.parse_args()
+
+    if not kb_service.lexical_index.enabled:
+        logger.error("Lexical index is disabled (KB_LEXICAL_INDEX_ENABLED=false)")
+        sys.exit(1)
+
+    if args.collection:
+        collection_names = [args.collection]
+    else:
+        db = next(get_db())
+        try:
+            collection_names = [row.name for row in db.query(KBCollection.name).all()]
+        finally:
+            db.close()
+
+    failed = 0
+    for collection_name in collection_names:
+        try:
+            indexed = rebuild_collection(collection_name, args.batch_size)
+            logger.info(f"{collection_name}: {indexed} chunks indexed")
+        except Exception as e:
+            failed += 1
+            logger.error(f"{collection_name}: rebuild failed: {e}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
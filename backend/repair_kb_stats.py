@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Knowledge Base Statistics Repair Script for Docsmait
+
+Recomputes the statistics rollups behind /kb/stats from scratch: the
+per-collection document counters on kb_collections and the daily query
+counts in kb_query_daily_counts. The rollups are maintained at write time;
+run this once after upgrading to backfill them, or whenever they have drifted
+(e.g. after manual database edits).
+
+Usage:
+    python repair_kb_stats.py
+"""
+
+import sys
+import logging
+
+# Add the app directory to Python path
+sys.path.append('/app')
+
+from app.kb_service_pg import kb_service
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main entry point for the script"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recompute Knowledge Base statistics rollups")
+    parser.parse_args()
+
+    result = kb_service.rebuild_statistics()
+    if not result["success"]:
+        logger.error(f"Statistics repair failed: {result['error']}")
+        sys.exit(1)
+
+    logger.info(f"Rebuilt statistics for {result['collections']} collections "
+                f"({result['documents']} documents, {result['query_days']} days of queries)")
+    logger.info(f"Current statistics: {kb_service.get_statistics()}")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
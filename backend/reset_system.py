@@ -29,7 +29,7 @@ try:
     from backend.app.database_config import get_db, engine
     from backend.app.config import config
     from backend.app.db_models import *
-    import qdrant_client
+    from backend.app.vector_store import create_vector_store
     from sqlalchemy.orm import Session
     from sqlalchemy import text
 except ImportError as e:
@@ -155,18 +155,15 @@ def reset_knowledge_base():
     print("🧠 Resetting knowledge base...")
     
     try:
-        qdrant_client_instance = qdrant_client.QdrantClient(url=config.QDRANT_URL)
-        
-        # Get all collections
-        collections = qdrant_client_instance.get_collections()
+        vector_store = create_vector_store()
         
         # Delete all collections
-        for collection in collections.collections:
+        for collection_name in vector_store.list_collections():
             try:
-                qdrant_client_instance.delete_collection(collection.name)
-                print(f"  ✅ Deleted collection: {collection.name}")
+                vector_store.delete_collection(collection_name)
+                print(f"  ✅ Deleted collection: {collection_name}")
             except Exception as e:
-                print(f"  ⚠️  Warning deleting collection {collection.name}: {e}")
+                print(f"  ⚠️  Warning deleting collection {collection_name}: {e}")
         
         print("✅ Knowledge base reset complete")
         
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Vector Quantization Script for Docsmait
+
+Converts existing Knowledge Base collections to another embedding storage
+mode (none, scalar int8, binary). Stored vectors are re-encoded in place by
+the vector store; documents do not need to be re-ingested. Run after the
+add_vector_quantization_to_kb_collections migration.
+
+Usage:
+    python set_vector_quantization.py --mode scalar [--collection NAME]
+"""
+
+import sys
+import logging
+
+# Add the app directory to Python path
+sys.path.append('/app')
+
+from app.kb_service_pg import kb_service
+from app.vector_store import QUANTIZATION_MODES
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main entry point for the script"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Change how Knowledge Base collections store embeddings")
+    parser.add_argument('--mode', required=True, choices=QUANTIZATION_MODES, help='Quantization mode')
+    parser.add_argument('--collection', default=None, help='Collection to convert (default: all collections)')
+
+    args = parser.parse_args()
+
+    if args.collection:
+        collection_names = [args.collection]
+    else:
+        collection_names = [collection["name"] for collection in kb_service.list_collections()]
+
+    failed = 0
+    for collection_name in collection_names:
+        result = kb_service.update_collection(collection_name, quantization=args.mode)
+        if result["success"]:
+            logger.info(f"{collection_name}: vectors stored as '{args.mode}'")
+        else:
+            failed += 1
+            logger.error(f"{collection_name}: {result['error']}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from typing import Dict, Any, Optional
 st.set_page_config(page_title="AI Settings", page_icon="🤖", layout="wide")
 
 from config import BACKEND_URL
+from stream_utils import iter_stream_events
 
 def get_auth_headers():
     """Get authentication headers"""
@@ -76,7 +77,7 @@ def check_ai_health() -> Optional[Dict[str, Any]]:
         return None
     
     try:
-        response = requests.get(f"{BACKEND_URL}/ai/health", headers=headers, timeout=10)
+        response = requests.get(f"{BACKEND_URL}/ai/health", headers=headers, params={"probe": True}, timeout=15)
         if response.status_code == 200:
             return response.json()
         else:
@@ -276,10 +277,17 @@ def main():
                     if health_info and health_info.get("healthy"):
                         st.success("✅ AI Service is healthy")
                         st.info(f"Service: {health_info.get('service', 'Unknown')}")
+                        latency = health_info.get("circuit_breaker", {}).get("latency_ms", {})
+                        if latency.get("p50") is not None:
+                            st.caption(f"Recent latency: p50 {latency['p50']} ms, p95 {latency['p95']} ms")
                     else:
                         st.error("❌ AI Service is not available")
                         if "error" in health_info:
                             st.error(f"Error: {health_info['error']}")
+                        breaker = health_info.get("circuit_breaker", {})
+                        if breaker.get("state") == "open":
+                            st.warning(f"Circuit breaker open after repeated failures "
+                                       f"({breaker.get('last_error')}); retrying in {breaker.get('retry_in_seconds')}s")
         
         with col2:
             st.subheader("Available Models")
@@ -304,6 +312,42 @@ def main():
         
         st.divider()
         
+        st.subheader("Try the Assistant")
+        test_doc_type = st.text_input("Document Type", value="general", key="test_doc_type")
+        test_input = st.text_input("Requirements", value="Improve clarity", key="test_user_input")
+        test_content = st.text_area("Document Content", height=150, key="test_doc_content")
+        test_regenerate = st.checkbox("Regenerate (ignore cached answer)", key="test_regenerate")
+        
+        if st.button("▶️ Run", key="test_assist") and test_content.strip():
+            metadata = {}
+            
+            def stream_assistance():
+                for event in iter_stream_events(
+                    f"{BACKEND_URL}/ai/assist/stream",
+                    {"document_type": test_doc_type, "document_content": test_content, "user_input": test_input,
+                     "regenerate": test_regenerate}
+                ):
+                    if event["type"] == "token":
+                        yield event["content"]
+                    elif event["type"] == "done":
+                        metadata.update(event.get("metadata", {}))
+                    elif event["type"] == "error":
+                        st.error(event["error"])
+            
+            st.write_stream(stream_assistance())
+            if metadata.get("cache_hit"):
+                st.caption(f"⚡ Cached answer from {metadata.get('model_used')}")
+            elif metadata.get("long_document"):
+                sections = metadata["long_document"]
+                st.caption(f"📑 {metadata.get('model_used')}: {sections['sections']} sections "
+                           f"({sections['sections_cached']} cached, {sections['sections_failed']} failed), "
+                           f"total {metadata.get('processing_time', 0):.1f}s")
+            elif metadata:
+                st.caption(f"🤖 {metadata.get('model_used')}: first token {metadata.get('first_token_time') or 0:.1f}s, "
+                           f"total {metadata.get('processing_time', 0):.1f}s")
+        
+        st.divider()
+        
         st.subheader("Usage Statistics")
         st.info("📊 Usage analytics and prompt effectiveness metrics coming soon")
 
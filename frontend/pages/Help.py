@@ -821,10 +821,18 @@ with help_tabs[11]:
         st.markdown("### 📊 API Endpoints")
         st.markdown("""
         **Core Endpoints**:
-        - `POST /kb/upload` - Upload documents to collections
-        - `POST /kb/add_text` - Add text content directly
-        - `POST /kb/chat` - RAG-based chat with collections
+        - `POST /kb/upload` - Upload documents to collections (returns an ingestion job id)
+        - `POST /kb/add_text` - Add text content directly (returns an ingestion job id)
+        - `GET /kb/jobs/{id}` - Ingestion progress (chunks done/total, throughput, ETA)
+        - `POST /kb/jobs/{id}/cancel` - Cancel a queued or running ingestion job
+        - `POST /kb/jobs/{id}/retry` - Retry a failed ingestion job (resumes where it stopped)
+        - `POST /kb/bulk_upload` - Bulk ingest a zip/tar archive (per-file summary in the job result)
+        - `POST /kb/bulk_ingest_directory` - Bulk ingest a server-side directory (admin only)
+        - `POST /kb/chat` - RAG-based chat with collections (429 with Retry-After while the AI queue is full)
+        - `POST /kb/chat/stream` - Streaming chat (NDJSON: sources, tokens, then timings)
+        - `GET /kb/search` - Retrieval only; `mode` = vector, lexical (full-text, no embedding), hybrid or auto
         - `GET /kb/stats` - Collection and usage statistics
+        - `POST /kb/stats/rebuild` - Recompute statistics rollups from scratch (admin only)
         - `POST /kb/reset` - Reset collections (admin only)
         - `POST /kb/collections` - Create new collection
         - `GET /kb/collections` - List all collections
@@ -836,6 +844,8 @@ with help_tabs[11]:
         - `POST /training/learn` - Generate learning content from KB
         - `POST /training/assess` - Generate assessments from KB content
         - `POST /training/submit` - Submit assessment answers
+        - `GET /training/question-banks` - Assessment question bank status per collection
+        - `POST /training/question-banks/{collection}/regenerate` - Queue question bank regeneration (admin)
         """)
     
     st.markdown("### 🚀 Key Features")
@@ -269,7 +269,7 @@ with main_tabs[1]:
     with col3:
         if st.button("🎯 Generate Assessment", type="primary"):
             if assessment_topics:
-                with st.spinner(f"Generating {num_questions} True/False questions from Knowledge Base..."):
+                with st.spinner(f"Preparing {num_questions} True/False questions from Knowledge Base..."):
                     result = generate_assessment_questions(assessment_topics, num_questions)
                 
                 if result.get("success"):
@@ -278,6 +278,8 @@ with main_tabs[1]:
                     st.session_state.user_answers = [None] * len(result.get("questions", []))
                     topics_display = ", ".join(assessment_topics)
                     st.success(f"✅ Generated {len(result.get('questions', []))} questions for {topics_display}")
+                    if result.get("pending_collections"):
+                        st.info(f"ℹ️ Questions for {', '.join(result['pending_collections'])} are still being prepared and were not included.")
                 else:
                     st.error(f"❌ Failed to generate assessment: {result.get('error', 'Unknown error')}")
             else:
@@ -2,9 +2,11 @@
 import streamlit as st
 import requests
 import json
+import time
 from datetime import datetime
 from auth_utils import require_auth, setup_authenticated_sidebar, get_auth_headers, BACKEND_URL
-from config import DEFAULT_COLLECTION_NAME
+from config import DEFAULT_COLLECTION_NAME, KB_REQUEST_TIMEOUT
+from stream_utils import iter_stream_events
 
 require_auth()
 
@@ -151,40 +153,32 @@ with tab2:
     with col_btn2:
         scrape_button = st.button("🌐 Scrape Websites", type="primary", disabled=not website_urls)
     
-    # File upload processing
+    # File upload processing - files are queued as background ingestion jobs
     if upload_button and uploaded_files:
         progress_bar = st.progress(0)
         status_placeholder = st.empty()
         results = []
+        jobs = {}
         
-        for i, uploaded_file in enumerate(uploaded_files):
+        for uploaded_file in uploaded_files:
             file_size_kb = uploaded_file.size / 1024 if uploaded_file.size else 0
-            status_placeholder.write(f"Processing {uploaded_file.name} ({file_size_kb:.1f} KB)...")
+            status_placeholder.write(f"Uploading {uploaded_file.name} ({file_size_kb:.1f} KB)...")
             
             try:
                 # Prepare file for upload
                 files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
                 data = {"collection_name": collection_name}
                 
-                # Use longer timeout for large files (5 minutes base + 1 minute per MB)
-                timeout_seconds = 300 + (file_size_kb / 1024 * 60)  # 5 min + 1 min/MB
-                
                 response = requests.post(
                     f"{BACKEND_URL}/kb/upload",
                     files=files,
                     data=data,
                     headers=get_auth_headers(),
-                    timeout=timeout_seconds
+                    timeout=KB_REQUEST_TIMEOUT + (file_size_kb / 1024 * 10)  # Transfer only; processing runs in background
                 )
                 
                 if response.status_code == 200:
-                    result = response.json()
-                    results.append({
-                        "filename": uploaded_file.name,
-                        "status": "✅ Success",
-                        "chunks": result.get("chunks_created", 0),
-                        "time": result.get("processing_time", 0)
-                    })
+                    jobs[response.json()["job_id"]] = uploaded_file.name
                 else:
                     error_msg = response.json().get("detail", "Unknown error")
                     results.append({
@@ -194,25 +188,61 @@ with tab2:
                         "time": 0
                     })
             
-            except requests.exceptions.Timeout:
-                results.append({
-                    "filename": uploaded_file.name,
-                    "status": f"⏱️ Timeout: File processing took longer than {timeout_seconds/60:.1f} minutes",
-                    "chunks": 0,
-                    "time": 0
-                })
             except Exception as e:
-                error_msg = str(e)
-                if "timeout" in error_msg.lower():
-                    error_msg = f"Processing timeout - file may be too large or system busy"
                 results.append({
                     "filename": uploaded_file.name,
-                    "status": f"❌ Error: {error_msg}",
+                    "status": f"❌ Error: {str(e)}",
                     "chunks": 0,
                     "time": 0
                 })
+        
+        # Poll job progress until every queued file has finished
+        pending = dict(jobs)
+        job_progress = {}
+        while pending:
+            for job_id, filename in list(pending.items()):
+                try:
+                    job_response = requests.get(
+                        f"{BACKEND_URL}/kb/jobs/{job_id}",
+                        headers=get_auth_headers(),
+                        timeout=KB_REQUEST_TIMEOUT
+                    )
+                except requests.exceptions.RequestException:
+                    continue
+                if job_response.status_code != 200:
+                    continue
+                
+                job = job_response.json()
+                job_progress[job_id] = job.get("progress") or 0
+                
+                if job["status"] in ("completed", "failed", "cancelled"):
+                    job_progress[job_id] = 1
+                    job_result = job.get("result") or {}
+                    if job["status"] == "completed":
+                        status_text = "✅ Success"
+                    elif job["status"] == "cancelled":
+                        status_text = "🚫 Cancelled"
+                    else:
+                        status_text = f"❌ Failed: {job.get('error', 'Unknown error')}"
+                    results.append({
+                        "filename": filename,
+                        "status": status_text,
+                        "chunks": job_result.get("chunks_created", 0),
+                        "time": job_result.get("processing_time", 0)
+                    })
+                    del pending[job_id]
+                elif job["status"] == "running":
+                    eta = f", ETA {job['eta_seconds']:.0f}s" if job.get("eta_seconds") is not None else ""
+                    rate = f" at {job['chunks_per_second']} chunks/sec" if job.get("chunks_per_second") else ""
+                    total = job.get("chunks_total") or "?"
+                    status_placeholder.write(f"Processing {filename}: {job.get('chunks_done', 0)}/{total} chunks{rate}{eta}")
+                else:
+                    status_placeholder.write(f"{filename} is queued...")
             
-            progress_bar.progress((i + 1) / len(uploaded_files))
+            if jobs:
+                progress_bar.progress(min(1.0, sum(job_progress.values()) / len(jobs)))
+            if pending:
+                time.sleep(1)
         
         # Display results
         status_placeholder.empty()
@@ -234,6 +264,47 @@ with tab2:
             if st.button("📝 Upload More Documents", type="primary"):
                 st.rerun()
     
+    # Active ingestion jobs (e.g. from earlier sessions or other users)
+    with st.expander("⏳ Ingestion Jobs"):
+        try:
+            jobs_response = requests.get(
+                f"{BACKEND_URL}/kb/jobs",
+                params={"limit": 20},
+                headers=get_auth_headers(),
+                timeout=KB_REQUEST_TIMEOUT
+            )
+            if jobs_response.status_code == 200:
+                recent_jobs = jobs_response.json()
+                if not recent_jobs:
+                    st.write("No ingestion jobs yet.")
+                for job in recent_jobs:
+                    job_col1, job_col2 = st.columns([4, 1])
+                    with job_col1:
+                        total = job.get("chunks_total") or "?"
+                        st.write(f"**{job['filename']}** → {job['collection_name']}: {job['status']} "
+                                 f"({job.get('chunks_done', 0)}/{total} chunks)")
+                    with job_col2:
+                        if job["status"] in ("queued", "running") and not job.get("cancel_requested"):
+                            if st.button("Cancel", key=f"cancel_job_{job['job_id']}"):
+                                requests.post(
+                                    f"{BACKEND_URL}/kb/jobs/{job['job_id']}/cancel",
+                                    headers=get_auth_headers(),
+                                    timeout=KB_REQUEST_TIMEOUT
+                                )
+                                st.rerun()
+                        elif job["status"] == "failed":
+                            if st.button("Retry", key=f"retry_job_{job['job_id']}"):
+                                requests.post(
+                                    f"{BACKEND_URL}/kb/jobs/{job['job_id']}/retry",
+                                    headers=get_auth_headers(),
+                                    timeout=KB_REQUEST_TIMEOUT
+                                )
+                                st.rerun()
+            else:
+                st.write("Failed to load ingestion jobs")
+        except requests.exceptions.RequestException:
+            st.write("Failed to load ingestion jobs")
+    
     # Website scraping processing
     if scrape_button and website_urls:
         urls_list = [url.strip() for url in website_urls.split('\n') if url.strip()]
@@ -284,49 +355,68 @@ with tab3:
         with st.chat_message("user"):
             st.write(query)
         
-        # Process query
+        # Process query, rendering tokens as the backend streams them
         with st.chat_message("assistant"):
-            with st.spinner("Searching knowledge base..."):
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/kb/chat",
-                        json={"message": query, "collection_name": chat_collection},
-                        headers=get_auth_headers()
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        st.write(result["response"])
-                        
-                        # Show performance metrics
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.caption(f"🔍 Embedding: {result['query_embedding_time']:.0f}ms")
-                        with col2:
-                            st.caption(f"📖 Retrieval: {result['retrieval_time']:.0f}ms")
-                        with col3:
-                            st.caption(f"🤖 LLM: {result['llm_response_time']:.0f}ms")
-                        
-                        # Show sources
-                        if result.get("sources"):
-                            with st.expander(f"📚 Sources ({len(result['sources'])})"):
-                                for i, source in enumerate(result["sources"], 1):
-                                    st.write(f"**{i}. {source['filename']}** (Relevance: {source['score']:.3f})")
-                                    st.write(f"_{source['text_preview']}_")
-                                    st.divider()
-                        
-                        # Add to chat history
-                        st.session_state.chat_history.append({
-                            "query": query,
-                            "response": result["response"],
-                            "sources": result.get("sources", [])
-                        })
+            sources = []
+            performance = {}
+            
+            def stream_answer():
+                for event in iter_stream_events(
+                    f"{BACKEND_URL}/kb/chat/stream",
+                    {"message": query, "collection_name": chat_collection}
+                ):
+                    if event["type"] == "sources":
+                        sources.extend(event.get("sources", []))
+                    elif event["type"] == "token":
+                        yield event["content"]
+                    elif event["type"] == "done":
+                        performance.update(event.get("performance", {}))
+                    elif event["type"] == "error":
+                        raise RuntimeError(event["error"])
+            
+            try:
+                with st.spinner("Searching knowledge base..."):
+                    answer_stream = stream_answer()
+                    first_token = next(answer_stream, "")
+                
+                def full_answer():
+                    yield first_token
+                    yield from answer_stream
+                
+                response_text = st.write_stream(full_answer())
+                
+                # Show performance metrics
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.caption(f"🔍 Embedding: {performance.get('query_embedding_time_ms', 0):.0f}ms")
+                with col2:
+                    st.caption(f"📖 Retrieval: {performance.get('retrieval_time_ms', 0):.0f}ms")
+                with col3:
+                    if performance.get("answer_cache", "miss") != "miss":
+                        st.caption("⚡ Cached answer")
                     else:
-                        error_msg = response.json().get("detail", "Unknown error")
-                        st.error(f"Query failed: {error_msg}")
+                        st.caption(f"🤖 LLM: {performance.get('llm_response_time_ms', 0):.0f}ms "
+                                   f"(first token {performance.get('first_token_time_ms') or 0:.0f}ms)")
                 
-                except Exception as e:
-                    st.error(f"Connection error: {str(e)}")
+                # Show sources
+                if sources:
+                    with st.expander(f"📚 Sources ({len(sources)})"):
+                        for i, source in enumerate(sources, 1):
+                            st.write(f"**{i}. {source['filename']}** (Relevance: {source['score']:.3f})")
+                            st.write(f"_{source['text_preview']}_")
+                            st.divider()
+                
+                # Add to chat history
+                st.session_state.chat_history.append({
+                    "query": query,
+                    "response": response_text,
+                    "sources": sources
+                })
+            
+            except RuntimeError as e:
+                st.error(f"Query failed: {str(e)}")
+            except Exception as e:
+                st.error(f"Connection error: {str(e)}")
     
     # Clear chat history
     if st.button("🗑️ Clear Chat History"):
@@ -349,10 +439,12 @@ with tab4:
             st.error(f"Error fetching collections: {str(e)}")
             return []
 
-    def create_collection(name, description, tags):
+    def create_collection(name, description, tags, quantization=None):
         """Create a new collection"""
         try:
             payload = {"name": name, "description": description, "tags": tags}
+            if quantization:
+                payload["quantization"] = quantization
             response = requests.post(f"{BACKEND_URL}/kb/collections", json=payload, headers=get_auth_headers())
             return response.status_code == 200, response.json() if response.status_code == 200 else response.text
         except Exception as e:
@@ -423,10 +515,21 @@ with tab4:
                 new_description = st.text_area("Description", placeholder="Brief description of this collection...")
                 new_tags_input = st.text_input("Tags (comma-separated)", placeholder="tag1, tag2, tag3")
                 new_tags = [tag.strip() for tag in new_tags_input.split(",") if tag.strip()]
+                quantization_options = {
+                    "Server default": None,
+                    "None (float32)": "none",
+                    "Scalar (int8, ~4x smaller)": "scalar",
+                    "Binary (1 bit, ~32x smaller)": "binary"
+                }
+                new_quantization = st.selectbox(
+                    "Vector Storage",
+                    options=list(quantization_options.keys()),
+                    help="Quantized embeddings use less memory; searches rescore the best candidates with the original vectors"
+                )
                 
                 if st.form_submit_button("🔨 Create Collection", type="primary"):
                     if new_name:
-                        success, result = create_collection(new_name, new_description, new_tags)
+                        success, result = create_collection(new_name, new_description, new_tags, quantization_options[new_quantization])
                         if success:
                             st.success(f"Collection '{new_name}' created successfully!")
                             st.rerun()
@@ -457,6 +560,7 @@ with tab4:
                     "Description": collection.get('description', 'No description')[:50] + ("..." if len(collection.get('description', '')) > 50 else ""),
                     "Documents": collection.get('document_count', 0),
                     "Size (MB)": round(collection.get('total_size_mb', 0), 2),
+                    "Vectors": collection.get('vector_quantization', 'none'),
                     "Tags": ', '.join(collection.get('tags', [])[:2]) + (f" +{len(collection.get('tags', [])) - 2}" if len(collection.get('tags', [])) > 2 else ""),
                     "Created By": collection.get('created_by', 'Unknown'),
                     "Created Date": collection.get('created_date', 'Unknown')[:10] if collection.get('created_date') else 'Unknown'
@@ -0,0 +1,18 @@
+# frontend/stream_utils.py
+import json
+import requests
+from auth_utils import get_auth_headers
+
+def iter_stream_events(url, payload, timeout=None):
+    """POST to a streaming (NDJSON) backend endpoint and yield each event as a dict"""
+    with requests.post(url, json=payload, headers=get_auth_headers(), stream=True, timeout=timeout) as response:
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("detail", "Unknown error")
+            except ValueError:
+                detail = f"HTTP {response.status_code}"
+            yield {"type": "error", "error": detail}
+            return
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
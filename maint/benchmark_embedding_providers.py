@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Ollama vs in-process ONNX embedding throughput
+
+Embeds the same synthetic chunk-sized texts with each provider (bypassing the
+embedding cache) at several batch sizes and reports texts/sec. When both
+providers run, it also reports how closely their vectors agree (cosine
+similarity per text), which tells whether an ONNX export is compatible with
+collections embedded through Ollama.
+
+The ONNX provider needs EMBEDDING_ONNX_MODEL_PATH; the Ollama provider needs
+the Ollama server (OLLAMA_BASE_URL) with DEFAULT_EMBEDDING_MODEL pulled.
+
+Usage (inside the backend container):
+    python maint/benchmark_embedding_providers.py [--providers ollama,onnx] [--texts 512]
+                                                  [--batch-sizes 1,8,32,64] [--chars 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Make the backend package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.append('/app')
+
+from app.config import config
+from app.embedding_providers import create_embedding_provider
+
+WORDS = (
+    "risk management process hazard analysis medical device software lifecycle verification "
+    "validation requirement traceability design control clause shall document maintain "
+    "residual risk evaluation acceptability post-production monitoring usability engineering "
+    "cybersecurity threat model supplier audit nonconformity corrective preventive action"
+).split()
+
+
+def synthetic_texts(count: int, chars: int):
+    """Fixed, chunk-sized texts (DEFAULT_CHUNK_SIZE characters by default)"""
+    rng = random.Random(7)
+    texts = []
+    for i in range(count):
+        words = [f"Section {i}."]
+        while sum(len(word) + 1 for word in words) < chars:
+            words.append(rng.choice(WORDS))
+        texts.append(" ".join(words))
+    return texts
+
+
+def throughput(provider, texts, batch_size: int):
+    """texts/sec and the vectors produced"""
+    vectors = []
+    provider.embed(texts[:batch_size])  # Warm-up (model load, first allocation)
+    start = time.perf_counter()
+    for offset in range(0, len(texts), batch_size):
+        vectors.extend(provider.embed(texts[offset:offset + batch_size]))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for vector in vectors if vector is None)
+    return len(texts) / elapsed if elapsed > 0 else float('inf'), vectors, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding providers")
+    parser.add_argument('--providers', default='ollama,onnx', help='Comma-separated providers')
+    parser.add_argument('--texts', type=int, default=512, help='Texts to embed per measurement')
+    parser.add_argument('--batch-sizes', default='1,8,32,64', help='Comma-separated batch sizes')
+    parser.add_argument('--chars', type=int, default=config.DEFAULT_CHUNK_SIZE, help='Characters per text')
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.texts, args.chars)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+
+    print(f"Embedding provider benchmark ({args.texts} texts x ~{args.chars} chars, "
+          f"{config.EMBEDDING_DIMENSIONS} dims)")
+    print(f"{'provider':>9} {'batch':>6} {'texts/s':>9} {'failed':>7}")
+
+    vectors_by_provider = {}
+    for name in args.providers.split(','):
+        start = time.perf_counter()
+        provider = create_embedding_provider(name)
+        print(f"{name:>9} {'load':>6} {time.perf_counter() - start:>8.1f}s")
+        for batch_size in batch_sizes:
+            rate, vectors, failed = throughput(provider, texts, batch_size)
+            print(f"{name:>9} {batch_size:>6} {rate:>9.1f} {failed:>7}")
+            vectors_by_provider[name] = vectors
+
+    if len(vectors_by_provider) == 2:
+        (first, first_vectors), (second, second_vectors) = vectors_by_provider.items()
+        pairs = [(a, b) for a, b in zip(first_vectors, second_vectors) if a is not None and b is not None]
+        if pairs:
+            a = np.array([pair[0] for pair in pairs], dtype=np.float32)
+            b = np.array([pair[1] for pair in pairs], dtype=np.float32)
+            cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+            print(f"\n{first} vs {second} cosine agreement over {len(pairs)} texts: "
+                  f"mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+            print("Vectors are interchangeable when the minimum stays above ~0.99")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial vs fan-out multi-collection retrieval
+
+Times the per-collection retrieval loop the training generators used
+(query_collection once per topic) against KnowledgeBaseService.search_collections
+(one collection lookup, one embedding batch, concurrent searches, one bulk
+query-log insert) for a growing number of topics. Fan-out latency should stay
+roughly flat as topics are added; the serial loop grows linearly.
+
+Requires the backend services (PostgreSQL, Qdrant, Ollama) to be reachable.
+
+Usage (inside the backend container):
+    python maint/benchmark_fanout_retrieval.py [--topics 1,2,4,8,16] [--limit 15] [--repeat 3]
+                                               [--collections a,b,c]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+# Make the backend package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.append('/app')
+
+from app.kb_service_pg import kb_service
+
+
+def make_searches(collections, count: int, nonce: str):
+    """Topic queries cycling over the collections; the nonce defeats the query embedding memo"""
+    return [
+        (collections[i % len(collections)], f"information about {collections[i % len(collections)].replace('_', ' ')} {nonce}-{i}")
+        for i in range(count)
+    ]
+
+
+def time_serial(searches, limit: int) -> float:
+    start = time.perf_counter()
+    for collection_name, query in searches:
+        kb_service.query_collection(collection_name, query, limit=limit)
+    return time.perf_counter() - start
+
+
+def time_fanout(searches, limit: int) -> float:
+    start = time.perf_counter()
+    kb_service.search_collections(searches, limit=limit)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs fan-out multi-collection retrieval")
+    parser.add_argument('--topics', default='1,2,4,8,16', help='Comma-separated topic counts')
+    parser.add_argument('--limit', type=int, default=15, help='Results per search')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (median is reported)')
+    parser.add_argument('--collections', default=None, help='Comma-separated collections (default: all)')
+    args = parser.parse_args()
+
+    if args.collections:
+        collections = args.collections.split(',')
+    else:
+        collections = [collection["name"] for collection in kb_service.get_collections()]
+    if not collections:
+        print("No Knowledge Base collections found")
+        sys.exit(1)
+
+    topic_counts = [int(count) for count in args.topics.split(',')]
+    print(f"Multi-collection retrieval benchmark ({len(collections)} collections, "
+          f"limit {args.limit}, median of {args.repeat} runs)")
+    print(f"{'topics':>7} {'serial ms':>10} {'fan-out ms':>11} {'speedup':>8}")
+
+    for count in topic_counts:
+        serial_times, fanout_times = [], []
+        for _ in range(args.repeat):
+            serial_times.append(time_serial(make_searches(collections, count, uuid.uuid4().hex[:8]), args.limit))
+            fanout_times.append(time_fanout(make_searches(collections, count, uuid.uuid4().hex[:8]), args.limit))
+        serial = statistics.median(serial_times) * 1000
+        fanout = statistics.median(fanout_times) * 1000
+        speedup = serial / fanout if fanout > 0 else float('inf')
+        print(f"{count:>7} {serial:>10.0f} {fanout:>11.0f} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential vs page-parallel PDF text extraction
+
+Times app.text_extraction on PDFs of increasing page count and reports the
+page count from which parallel extraction beats sequential extraction. Use
+the result to tune KB_PDF_PARALLEL_MIN_PAGES.
+
+Usage (from the repository root or inside the backend container):
+    python maint/benchmark_pdf_extraction.py [--pdf SAMPLE.pdf] [--pages 10,25,50,100,200,400,800]
+                                             [--workers N] [--repeat 3]
+
+Without --pdf a synthetic text-heavy PDF is generated with reportlab. With
+--pdf, pages of the sample are repeated to reach each page count, which gives
+more realistic timings for scanned standards bundles and complex layouts.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+# Make the backend package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.append('/app')
+
+import PyPDF2
+
+from app.text_extraction import (
+    _iter_pdf_segments_parallel,
+    _iter_pdf_segments_sequential,
+    pdf_extract_workers,
+)
+
+LOREM = (
+    "The manufacturer shall establish, document and maintain a risk management process "
+    "for identifying hazards associated with the medical device, estimating and evaluating "
+    "the associated risks, controlling these risks and monitoring the effectiveness of the controls. "
+)
+
+
+def synthetic_pdf(pages: int) -> bytes:
+    """Generate a text-heavy PDF with reportlab"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for page in range(pages):
+        text = pdf.beginText(40, 800)
+        text.textLine(f"Clause {page + 1}")
+        for line in range(60):
+            text.textLine(f"{line + 1}. {LOREM[:95]}")
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def sample_pdf(sample_path: str, pages: int) -> bytes:
+    """Repeat the sample's pages until the requested page count is reached"""
+    reader = PyPDF2.PdfReader(sample_path)
+    writer = PyPDF2.PdfWriter()
+    for page in range(pages):
+        writer.add_page(reader.pages[page % len(reader.pages)])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def time_extraction(file_content: bytes, parallel: bool, workers: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        total_pages = len(reader.pages)
+        if parallel:
+            pages = list(_iter_pdf_segments_parallel(reader, file_content, total_pages, workers))
+        else:
+            pages = list(_iter_pdf_segments_sequential(reader, 0, total_pages))
+        timings.append(time.perf_counter() - start)
+        assert len(pages) == total_pages
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs page-parallel PDF extraction")
+    parser.add_argument('--pdf', help='Sample PDF whose pages are repeated (default: synthetic PDF)')
+    parser.add_argument('--pages', default='10,25,50,100,200,400,800', help='Comma-separated page counts')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: KB_PDF_EXTRACT_WORKERS / CPU count)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (median is reported)')
+    args = parser.parse_args()
+
+    workers = args.workers or pdf_extract_workers()
+    page_counts = [int(count) for count in args.pages.split(',')]
+
+    print(f"PDF extraction benchmark ({workers} workers, median of {args.repeat} runs)")
+    print(f"{'pages':>7} {'sequential s':>13} {'parallel s':>11} {'speedup':>8}")
+
+    crossover = None
+    for pages in page_counts:
+        file_content = sample_pdf(args.pdf, pages) if args.pdf else synthetic_pdf(pages)
+        sequential = time_extraction(file_content, False, workers, args.repeat)
+        parallel = time_extraction(file_content, True, workers, args.repeat)
+        speedup = sequential / parallel if parallel > 0 else float('inf')
+        print(f"{pages:>7} {sequential:>13.3f} {parallel:>11.3f} {speedup:>7.2f}x")
+        if crossover is None and parallel < sequential:
+            crossover = pages
+
+    if crossover is None:
+        print("\nParallel extraction did not beat sequential extraction at any tested size")
+    else:
+        print(f"\nParallel extraction wins from ~{crossover} pages; set KB_PDF_PARALLEL_MIN_PAGES accordingly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark: synchronous AI calls, per-call event loop vs pooled sync facade
+
+Runs N concurrent synchronous callers (threads, like training requests and
+the automated review service) that each make several chat calls, in two modes:
+- loop-per-call: the previous AIService.generate_response approach, a new
+  event loop and a new httpx.AsyncClient (so a new connection) per call
+- facade: ollama_pool.run_sync, submitting to the pool's background loop
+  whose client keeps connections alive
+
+By default the calls go to a local stub server that answers /api/chat
+immediately (or after --server-delay-ms), which isolates the client-side
+overhead from model latency. It also counts the TCP connections each mode
+opened. --url points the benchmark at a real Ollama instead (calls are then
+bounded by model speed, and the stub's connection count is not available).
+
+The LLM scheduler is bypassed so that both modes make the same HTTP calls.
+
+Usage (inside the backend container):
+    python maint/benchmark_sync_generate.py [--callers 100] [--calls-per-caller 5]
+                                           [--server-delay-ms 0] [--url http://ollama:11434]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# Make the backend package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.append('/app')
+
+from app.config import config
+from app.ollama_pool import ollama_pool
+
+CHAT_RESPONSE = json.dumps({"message": {"role": "assistant", "content": "True"}, "done": True}).encode()
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal keep-alive /api/chat endpoint that records client connections"""
+
+    protocol_version = "HTTP/1.1"
+    delay_seconds = 0.0
+    connections = set()
+    connections_lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.connections_lock:
+            self.connections.add(self.client_address)
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(CHAT_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(CHAT_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def loop_per_call(url: str, payload: dict) -> int:
+    """The previous generate_response transport: new loop and client for every call"""
+    async def call():
+        async with httpx.AsyncClient(timeout=config.AI_TIMEOUT) as client:
+            response = await client.post(url, json=payload)
+            return response.status_code
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(call())
+    finally:
+        loop.close()
+
+
+def facade(url: str, payload: dict) -> int:
+    response = ollama_pool.run_sync(ollama_pool.request("POST", url, json=payload))
+    return response.status_code
+
+
+def run_mode(call, url: str, payload: dict, callers: int, calls_per_caller: int):
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    def caller():
+        nonlocal failures
+        for _ in range(calls_per_caller):
+            start = time.perf_counter()
+            try:
+                ok = call(url, payload) == 200
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                failures += 0 if ok else 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        for _ in range(callers):
+            executor.submit(caller)
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls_per_second": len(latencies) / wall,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "failures": failures
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark synchronous AI call overhead")
+    parser.add_argument('--callers', type=int, default=100, help='Concurrent synchronous callers')
+    parser.add_argument('--calls-per-caller', type=int, default=5, help='Sequential calls per caller')
+    parser.add_argument('--server-delay-ms', type=float, default=0, help='Stub server response delay')
+    parser.add_argument('--url', default=None, help='Ollama base URL (default: local stub server)')
+    parser.add_argument('--model', default=config.DEFAULT_CHAT_MODEL, help='Model for --url runs')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        StubOllamaHandler.delay_seconds = args.server_delay_ms / 1000
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    url = f"{base_url}/api/chat"
+    payload = {
+        "model": args.model,
+        "messages": [{"role": "user", "content": "Answer True or False: water is wet."}],
+        "stream": False,
+        "options": {"num_predict": 4}
+    }
+
+    print(f"Sync AI call benchmark: {args.callers} callers x {args.calls_per_caller} calls against "
+          f"{'stub server' if server else base_url} (pool max {ollama_pool.limits.max_connections} connections)")
+    print(f"{'mode':>14} {'calls/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7} {'connections':>12}")
+    try:
+        for name, call in [("loop-per-call", loop_per_call), ("facade", facade)]:
+            StubOllamaHandler.connections.clear()
+            result = run_mode(call, url, payload, args.callers, args.calls_per_caller)
+            connections = len(StubOllamaHandler.connections) if server else "-"
+            print(f"{name:>14} {result['calls_per_second']:>9.1f} {result['p50']:>8.1f} "
+                  f"{result['p95']:>8.1f} {result['failures']:>7} {connections:>12}")
+    finally:
+        ollama_pool.stop_sync_loop()
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
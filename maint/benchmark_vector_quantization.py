@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Report: recall, latency and memory of quantized embedding storage
+
+Loads a fixed, seeded corpus of clustered unit vectors (embedding-like: chunks
+of the same document sit close together) into one collection per
+quantization mode (none, scalar int8, binary) and runs the same query set
+against each. Ground truth is exact float32 cosine top-k computed in NumPy.
+
+Reports per mode:
+- recall@k against the exact top-k
+- search latency (median and p95)
+- index memory: bytes per vector held in RAM and the total for the corpus
+  (quantized modes keep only the codes in RAM; originals are read from disk
+  for rescoring the oversampled candidates)
+
+Usage (inside the backend container):
+    python maint/benchmark_vector_quantization.py [--backend embedded|qdrant] [--points 100000]
+                                                  [--queries 200] [--limit 10] [--oversampling 1,2,3,4]
+                                                  [--dimensions 768]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+# Make the backend package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.append('/app')
+
+from app.config import config
+from app.vector_store import (
+    QUANTIZATION_MODES, EmbeddedVectorStore, QdrantVectorStore, VectorPoint, quantization_bytes_per_vector
+)
+
+SEED = 1234
+CLUSTER_SIZE = 50  # Chunks per synthetic document
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_corpus(points: int, queries: int, dimensions: int):
+    """Fixed corpus and query set: clustered vectors, queries are perturbed corpus points"""
+    rng = np.random.default_rng(SEED)
+    centers = normalize(rng.standard_normal((points // CLUSTER_SIZE + 1, dimensions), dtype=np.float32))
+    # Noise of norm ~0.6 around each document center, ~0.3 around the sampled query targets
+    noise_scale = 1.0 / np.sqrt(dimensions)
+    corpus = normalize(
+        centers[np.arange(points) // CLUSTER_SIZE]
+        + 0.6 * noise_scale * rng.standard_normal((points, dimensions), dtype=np.float32)
+    )
+    query_set = normalize(
+        corpus[rng.choice(points, queries, replace=False)]
+        + 0.3 * noise_scale * rng.standard_normal((queries, dimensions), dtype=np.float32)
+    )
+    return corpus, query_set
+
+
+def point_id(index: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"quantization-bench:{index}"))
+
+
+def exact_top_k(corpus: np.ndarray, query_set: np.ndarray, limit: int):
+    truth = []
+    for query in query_set:
+        scores = corpus @ query
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        truth.append({point_id(int(index)) for index in top})
+    return truth
+
+
+def run_mode(store, quantization: str, corpus: np.ndarray, query_set: np.ndarray, truth, limit: int):
+    collection_name = f"bench_quantization_{quantization}"
+    if collection_name in store.list_collections():
+        store.delete_collection(collection_name)
+    store.create_collection(collection_name, corpus.shape[1], quantization)
+    try:
+        for first in range(0, len(corpus), 1000):
+            store.upsert(collection_name, [
+                VectorPoint(point_id(index), corpus[index].tolist(), {"chunk_index": index % CLUSTER_SIZE})
+                for index in range(first, min(first + 1000, len(corpus)))
+            ], wait=True)
+        if isinstance(store, QdrantVectorStore):
+            time.sleep(5)  # Let Qdrant build the HNSW index and quantized codes
+
+        latencies, recalls = [], []
+        for query, expected in zip(query_set, truth):
+            start = time.perf_counter()
+            hits = store.search(collection_name, query.tolist(), limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len({hit.id for hit in hits} & expected) / limit)
+        latencies.sort()
+        return {
+            "recall": statistics.mean(recalls),
+            "p50": statistics.median(latencies),
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        }
+    finally:
+        store.delete_collection(collection_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quantized embedding storage modes")
+    parser.add_argument('--backend', default='embedded', choices=['embedded', 'qdrant'], help='Vector store backend')
+    parser.add_argument('--points', type=int, default=100000, help='Corpus size')
+    parser.add_argument('--queries', type=int, default=200, help='Queries in the fixed query set')
+    parser.add_argument('--limit', type=int, default=10, help='k for recall@k')
+    parser.add_argument('--oversampling', default='1,3', help='Comma-separated oversampling factors to compare')
+    parser.add_argument('--dimensions', type=int, default=config.EMBEDDING_DIMENSIONS, help='Vector dimensions')
+    args = parser.parse_args()
+
+    corpus, query_set = make_corpus(args.points, args.queries, args.dimensions)
+    truth = exact_top_k(corpus, query_set, args.limit)
+    float_bytes = quantization_bytes_per_vector("none", args.dimensions)
+
+    print(f"Quantization report: {args.backend}, {args.points} points x {args.dimensions} dims, "
+          f"{args.queries} queries, recall@{args.limit}")
+    print(f"{'mode':>7} {'oversample':>10} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'B/vector':>9} {'index MB':>9} {'vs float':>9}")
+
+    embedded_root = tempfile.mkdtemp(prefix="docsmait_quantization_bench_")
+    try:
+        for oversampling in [float(value) for value in args.oversampling.split(',')]:
+            if args.backend == "qdrant":
+                store = QdrantVectorStore(config.QDRANT_URL, oversampling)
+            else:
+                store = EmbeddedVectorStore(embedded_root, oversampling)
+            for quantization in QUANTIZATION_MODES:
+                if quantization == "none" and oversampling != float(args.oversampling.split(',')[0]):
+                    continue  # Oversampling does not apply to float storage
+                result = run_mode(store, quantization, corpus, query_set, truth, args.limit)
+                bytes_per_vector = quantization_bytes_per_vector(quantization, args.dimensions)
+                print(f"{quantization:>7} {oversampling if quantization != 'none' else '-':>10} "
+                      f"{result['recall']:>7.3f} {result['p50']:>7.2f} {result['p95']:>7.2f} "
+                      f"{bytes_per_vector:>9} {bytes_per_vector * args.points / (1024 * 1024):>9.1f} "
+                      f"{float_bytes / bytes_per_vector:>8.0f}x")
+    finally:
+        shutil.rmtree(embedded_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
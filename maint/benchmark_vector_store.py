@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Qdrant vs embedded (NumPy/mmap) vector store
+
+Loads synthetic chunk vectors (random unit vectors with KB-style payloads)
+into each backend at growing collection sizes and reports:
+- upsert throughput (points/sec, batches of --batch-size)
+- top-k search latency (median and p95), unfiltered and filtered by kb_document_id
+- filtered count latency (what ingestion verification uses)
+- on-disk size of the embedded store
+
+The Qdrant backend needs the Qdrant server (QDRANT_URL); the embedded backend
+writes to a temporary directory. 1M x 768 float32 vectors take ~3 GB on disk
+for the embedded store, so make sure there is room.
+
+Usage (inside the backend container):
+    python maint/benchmark_vector_store.py [--sizes 10000,100000,1000000] [--backends qdrant,embedded]
+                                           [--dimensions 768] [--queries 50] [--limit 5] [--batch-size 1000]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+# Make the backend package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+sys.path.append('/app')
+
+from app.config import config
+from app.vector_store import EmbeddedVectorStore, QdrantVectorStore, VectorPoint
+
+CHUNKS_PER_DOCUMENT = 50
+
+
+def random_unit_vectors(rng, count: int, dimensions: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load(store, collection_name: str, size: int, dimensions: int, batch_size: int, rng) -> float:
+    """Upsert size points; returns points per second"""
+    start = time.perf_counter()
+    for first in range(0, size, batch_size):
+        count = min(batch_size, size - first)
+        vectors = random_unit_vectors(rng, count, dimensions)
+        points = [
+            VectorPoint(
+                str(uuid.uuid5(uuid.NAMESPACE_URL, f"bench:{first + offset}")),
+                vectors[offset].tolist(),
+                {
+                    "kb_document_id": f"doc-{(first + offset) // CHUNKS_PER_DOCUMENT}",
+                    "chunk_index": (first + offset) % CHUNKS_PER_DOCUMENT,
+                    "filename": f"document-{(first + offset) // CHUNKS_PER_DOCUMENT}.pdf",
+                    "text": f"Synthetic chunk {first + offset} " * 8
+                }
+            )
+            for offset in range(count)
+        ]
+        store.upsert(collection_name, points, wait=True)
+    elapsed = time.perf_counter() - start
+    return size / elapsed if elapsed > 0 else float('inf')
+
+
+def time_calls(call, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[min(len(times) - 1, int(len(times) * 0.95))]
+
+
+def benchmark(store, backend: str, size: int, args) -> dict:
+    rng = np.random.default_rng(42)
+    collection_name = f"bench_vectors_{size}"
+    if collection_name in store.list_collections():
+        store.delete_collection(collection_name)
+    store.create_collection(collection_name, args.dimensions)
+    try:
+        upsert_rate = load(store, collection_name, size, args.dimensions, args.batch_size, rng)
+        queries = iter(random_unit_vectors(rng, args.queries * 2, args.dimensions).tolist())
+        document_filter = {"must": [{"key": "kb_document_id", "match": {"value": f"doc-{size // CHUNKS_PER_DOCUMENT // 2}"}}]}
+
+        search = time_calls(lambda: store.search(collection_name, next(queries), args.limit), args.queries)
+        filtered = time_calls(
+            lambda: store.search(collection_name, next(queries), args.limit, query_filter=document_filter),
+            args.queries
+        )
+        count = time_calls(lambda: store.count(collection_name, document_filter), max(3, args.queries // 10))
+
+        disk_mb = None
+        if backend == "embedded":
+            path = os.path.join(store.root_path, collection_name)
+            disk_mb = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / (1024 * 1024)
+        return {
+            "upsert_rate": upsert_rate, "search": search, "filtered": filtered,
+            "count": count, "disk_mb": disk_mb
+        }
+    finally:
+        store.delete_collection(collection_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends")
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated collection sizes')
+    parser.add_argument('--backends', default='qdrant,embedded', help='Comma-separated backends')
+    parser.add_argument('--dimensions', type=int, default=config.EMBEDDING_DIMENSIONS, help='Vector dimensions')
+    parser.add_argument('--queries', type=int, default=50, help='Searches per measurement')
+    parser.add_argument('--limit', type=int, default=5, help='Top-k per search')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Points per upsert')
+    args = parser.parse_args()
+
+    embedded_root = tempfile.mkdtemp(prefix="docsmait_vector_bench_")
+    stores = {}
+    for backend in args.backends.split(','):
+        if backend == "qdrant":
+            stores[backend] = QdrantVectorStore(config.QDRANT_URL)
+        elif backend == "embedded":
+            stores[backend] = EmbeddedVectorStore(embedded_root)
+        else:
+            print(f"Unknown backend '{backend}'")
+            sys.exit(1)
+
+    print(f"Vector store benchmark ({args.dimensions} dims, top-{args.limit}, {args.queries} queries per size)")
+    print(f"{'backend':>9} {'points':>9} {'upsert/s':>10} {'search p50':>11} {'p95':>7} "
+          f"{'filtered p50':>13} {'p95':>7} {'count p50':>10} {'disk MB':>8}")
+    try:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            for backend, store in stores.items():
+                result = benchmark(store, backend, size, args)
+                disk = f"{result['disk_mb']:.0f}" if result["disk_mb"] is not None else "-"
+                print(f"{backend:>9} {size:>9} {result['upsert_rate']:>10.0f} "
+                      f"{result['search'][0]:>9.1f}ms {result['search'][1]:>5.1f}ms "
+                      f"{result['filtered'][0]:>11.1f}ms {result['filtered'][1]:>5.1f}ms "
+                      f"{result['count'][0]:>8.1f}ms {disk:>8}")
+    finally:
+        shutil.rmtree(embedded_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ API Endpoints Tests
 Tests for all major API endpoints and their functionality.
 """
 
+import asyncio
 import pytest
 import requests
 
@@ -324,6 +325,198 @@ class TestKnowledgeBaseEndpoints:
                 assert len(data[key]) > 0
 
 
+@pytest.mark.api
+class TestAIHealthEndpoints:
+    """Test AI service health reporting."""
+
+    def test_ai_health_unauthenticated(self, api_client, backend_url):
+        """Test AI health without authentication."""
+        response = api_client.get(f"{backend_url}/ai/health")
+        
+        assert response.status_code == 401
+
+    def test_ai_health_reports_circuit_breaker(self, authenticated_client, backend_url, assert_docsmait):
+        """Test AI health reports breaker state and latency without probing Ollama."""
+        response = authenticated_client.get(f"{backend_url}/ai/health")
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data, ["healthy", "service", "circuit_breaker", "connection_pool"])
+        assert data["circuit_breaker"]["state"] in ["closed", "open", "half_open"]
+        assert data["healthy"] == (data["circuit_breaker"]["state"] != "open")
+        assert "p95" in data["circuit_breaker"]["latency_ms"]
+
+    def test_ai_health_reports_scheduler_queues(self, authenticated_client, backend_url):
+        """Test AI health reports per-class LLM scheduler queues and queue times."""
+        response = authenticated_client.get(f"{backend_url}/ai/health")
+        
+        assert response.status_code == 200
+        scheduler = response.json()["scheduler"]
+        for name in ["generation", "embedding"]:
+            assert scheduler[name]["max_concurrency"] >= 1
+            assert set(scheduler[name]["classes"]) == {"interactive", "batch", "background"}
+            for stats in scheduler[name]["classes"].values():
+                assert stats["running"] >= 0
+                assert "p95" in stats["queue_time_ms"]
+
+    def test_ai_health_probe(self, authenticated_client, backend_url):
+        """Test an explicit probe returns the same structure."""
+        response = authenticated_client.get(f"{backend_url}/ai/health", params={"probe": True}, timeout=30)
+        
+        assert response.status_code == 200
+        assert isinstance(response.json()["healthy"], bool)
+
+
+@pytest.mark.api
+class TestAIAssistCache:
+    """Test the AI assistance response cache."""
+
+    ASSIST_REQUEST = {
+        "document_type": "general",
+        "document_content": "The device shall log every alarm with a timestamp.",
+        "user_input": "Improve clarity"
+    }
+
+    def test_repeated_assist_is_served_from_cache(self, authenticated_client, backend_url):
+        """Test a repeated request is a cache hit and regenerate bypasses the cache."""
+        first = authenticated_client.post(f"{backend_url}/ai/assist", json=self.ASSIST_REQUEST, timeout=180)
+        assert first.status_code == 200
+        if not first.json()["success"]:
+            pytest.skip("AI service not available")
+        assert first.json()["metadata"]["cache_hit"] is False
+        
+        second = authenticated_client.post(f"{backend_url}/ai/assist", json=self.ASSIST_REQUEST, timeout=180)
+        assert second.status_code == 200
+        assert second.json()["metadata"]["cache_hit"] is True
+        assert second.json()["metadata"]["cache_key"] == first.json()["metadata"]["cache_key"]
+        assert second.json()["response"] == first.json()["response"]
+        
+        regenerated = authenticated_client.post(
+            f"{backend_url}/ai/assist", json=dict(self.ASSIST_REQUEST, regenerate=True), timeout=180
+        )
+        assert regenerated.status_code == 200
+        if regenerated.json()["success"]:
+            assert regenerated.json()["metadata"]["cache_hit"] is False
+
+    def test_poor_feedback_evicts_cached_answer(self, authenticated_client, backend_url):
+        """Test low-rated feedback on a cached answer evicts it."""
+        first = authenticated_client.post(f"{backend_url}/ai/assist", json=self.ASSIST_REQUEST, timeout=180)
+        if first.status_code != 200 or not first.json()["success"]:
+            pytest.skip("AI service not available")
+        cache_key = first.json()["metadata"]["cache_key"]
+        
+        response = authenticated_client.post(
+            f"{backend_url}/ai/feedback", json={"feedback_rating": 1, "cache_key": cache_key}
+        )
+        assert response.status_code == 200
+        assert response.json()["cache_evicted"] is True
+        
+        again = authenticated_client.post(f"{backend_url}/ai/assist", json=self.ASSIST_REQUEST, timeout=180)
+        if again.json()["success"]:
+            assert again.json()["metadata"]["cache_hit"] is False
+
+    def test_feedback_with_unknown_cache_key(self, authenticated_client, backend_url):
+        """Test feedback for an unknown cache key is accepted without evicting anything."""
+        response = authenticated_client.post(
+            f"{backend_url}/ai/feedback", json={"feedback_rating": 1, "cache_key": "0" * 32}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["cache_evicted"] is False
+
+
+@pytest.mark.api
+@pytest.mark.slow
+class TestAILongDocument:
+    """Test map-reduce assistance for documents longer than the context window."""
+
+    @staticmethod
+    def long_document(edited_section: int = -1) -> str:
+        sections = []
+        for i in range(8):
+            text = f"Requirement {i}: the device shall record alarm {i} with a timestamp and severity. " * 8
+            if i == edited_section:
+                text += "Alarms shall also be exported hourly."
+            sections.append(f"## Section {i}\n\n{text}")
+        return "\n\n".join(sections)
+
+    def test_long_document_is_processed_in_sections(self, authenticated_client, backend_url):
+        """Test a long document is split into sections and edits only recompute changed sections."""
+        request = {"document_type": "general", "user_input": "Find gaps", "long_document": True}
+        first = authenticated_client.post(
+            f"{backend_url}/ai/assist", json=dict(request, document_content=self.long_document()), timeout=600
+        )
+        assert first.status_code == 200
+        if not first.json()["success"]:
+            pytest.skip("AI service not available")
+        sections = first.json()["metadata"]["long_document"]
+        assert sections["sections"] > 1
+        
+        edited = authenticated_client.post(
+            f"{backend_url}/ai/assist", json=dict(request, document_content=self.long_document(3)), timeout=600
+        )
+        assert edited.status_code == 200
+        if edited.json()["success"]:
+            edited_sections = edited.json()["metadata"]["long_document"]
+            assert edited_sections["sections_cached"] >= edited_sections["sections"] - 1
+
+
+class TestLongDocumentReduce:
+    """Test the bounded reduce rounds of long-document assistance (no backend needed)."""
+
+    @staticmethod
+    def run_reduce(section_count: int, finding_length: int, budget: int = 4000):
+        long_document = pytest.importorskip("app.long_document")
+        calls = []
+
+        async def condense(group):
+            calls.append(len("\n\n".join(group)))
+            return True, "c" * finding_length
+
+        partials = ["f" * 3000 for _ in range(section_count)]
+        result = asyncio.run(long_document.reduce_partials(partials, budget, condense))
+        return long_document, result, calls
+
+    def test_groups_always_shrink_the_findings(self):
+        """Test findings as long as the budget are still grouped in pairs."""
+        long_document = pytest.importorskip("app.long_document")
+        groups = long_document.group_partials(["f" * 4000] * 5, 4000)
+
+        assert [len(group) for group in groups] == [2, 2, 1]
+        assert all(len("\n\n".join(group)) <= 4000 for group in groups)
+
+    def test_many_sections_need_several_reduce_rounds(self):
+        """Test 16 long findings reduce in more than one round and then fit the budget."""
+        _, (success, partials, rounds), calls = self.run_reduce(16, 1000)
+
+        assert success is True
+        assert rounds > 1
+        assert len("\n\n".join(partials)) <= 4000
+        assert all(length <= 4000 for length in calls)
+
+    def test_reduce_rounds_are_capped(self):
+        """Test condensed findings that never shrink stop after MAX_REDUCE_ROUNDS."""
+        long_document, (success, partials, rounds), calls = self.run_reduce(64, 3000)
+
+        assert success is True
+        assert rounds == long_document.MAX_REDUCE_ROUNDS
+        assert len(calls) < 64
+
+    def test_failed_condense_stops_the_reduce(self):
+        """Test a failed intermediate reduce is reported instead of retried."""
+        long_document = pytest.importorskip("app.long_document")
+
+        async def condense(group):
+            return False, "AI service error: HTTP 500"
+
+        success, partials, rounds = asyncio.run(
+            long_document.reduce_partials(["f" * 3000] * 4, 4000, condense)
+        )
+        assert success is False
+        assert partials == ["AI service error: HTTP 500"]
+        assert rounds == 0
+
+
 @pytest.mark.api
 @pytest.mark.slow
 class TestAPIPerformance:
@@ -380,4 +380,368 @@ class TestKnowledgeBasePerformance:
         assert response_time < 45.0, f"Large context KB query too slow: {response_time:.2f}s"
         
         # Should handle large context appropriately
-        assert response.status_code in [200, 400, 413, 503]
\ No newline at end of file
+        assert response.status_code in [200, 400, 413, 503]
+
+@pytest.mark.api
+class TestKnowledgeBaseEmbeddingCache:
+    """Test embedding cache statistics endpoint."""
+
+    def test_embedding_cache_stats_unauthenticated(self, api_client, backend_url):
+        """Test embedding cache stats require authentication."""
+        response = api_client.get(f"{backend_url}/kb/embedding_cache/stats")
+        
+        assert response.status_code == 401
+
+    def test_embedding_cache_stats_authenticated(self, authenticated_client, backend_url, assert_docsmait):
+        """Test embedding cache stats expose hit/miss counters."""
+        response = authenticated_client.get(f"{backend_url}/kb/embedding_cache/stats")
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data, ["hits", "misses", "hit_rate", "evictions", "enabled"])
+        assert 0.0 <= data["hit_rate"] <= 1.0
+
+    def test_kb_cache_stats_include_query_embeddings(self, authenticated_client, backend_url, assert_docsmait):
+        """Test combined cache stats expose the query embedding memo."""
+        response = authenticated_client.get(f"{backend_url}/kb/cache/stats")
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data, ["embedding_cache", "query_embedding_cache"])
+        assert_docsmait.assert_json_structure(data["query_embedding_cache"], ["hits", "misses", "hit_rate", "entries"])
+
+    def test_kb_cache_stats_include_answer_cache(self, authenticated_client, backend_url, assert_docsmait):
+        """Test combined cache stats expose the chat answer cache."""
+        response = authenticated_client.get(f"{backend_url}/kb/cache/stats")
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data["answer_cache"], ["lookups", "exact_hits", "semantic_hits", "answer_hit_rate"])
+
+    def test_kb_cache_stats_include_collection_registry(self, authenticated_client, backend_url, assert_docsmait):
+        """Test combined cache stats expose the collection registry."""
+        authenticated_client.get(f"{backend_url}/kb/search", params={"query": "risk"})
+        response = authenticated_client.get(f"{backend_url}/kb/cache/stats")
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data["collection_registry"], ["hits", "loads", "listening", "ttl_seconds"])
+
+    def test_kb_cache_stats_include_query_log(self, authenticated_client, backend_url, assert_docsmait):
+        """Test combined cache stats expose the buffered query log writer."""
+        response = authenticated_client.get(f"{backend_url}/kb/cache/stats")
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data["query_log"], ["queued", "flushed", "dropped", "pending"])
+
+
+@pytest.mark.api
+class TestKnowledgeBaseIngestionJobs:
+    """Test background ingestion job endpoints."""
+
+    def test_add_text_returns_job_id(self, authenticated_client, backend_url, assert_docsmait):
+        """Test add_text queues a job and its progress can be polled."""
+        response = authenticated_client.post(
+            f"{backend_url}/kb/add_text",
+            params={
+                "collection_name": "test_collection",
+                "text_content": "Ingestion job test content for the knowledge base.",
+                "filename": "ingestion_job_test.md"
+            }
+        )
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data, ["job_id", "status"])
+        
+        job_response = authenticated_client.get(f"{backend_url}/kb/jobs/{data['job_id']}")
+        assert_docsmait.assert_api_success(job_response)
+        job = job_response.json()
+        assert_docsmait.assert_json_structure(job, ["status", "chunks_done", "chunks_total", "chunks_per_second", "eta_seconds"])
+        assert job["status"] in ["queued", "running", "completed", "failed", "cancelled"]
+
+    def test_get_unknown_job(self, authenticated_client, backend_url):
+        """Test polling an unknown job returns 404."""
+        response = authenticated_client.get(f"{backend_url}/kb/jobs/00000000-0000-0000-0000-000000000000")
+        
+        assert response.status_code == 404
+
+    def test_list_jobs_invalid_status(self, authenticated_client, backend_url):
+        """Test listing jobs with an invalid status filter."""
+        response = authenticated_client.get(f"{backend_url}/kb/jobs", params={"status": "bogus"})
+        
+        assert response.status_code == 400
+
+    def test_retry_unknown_job(self, authenticated_client, backend_url):
+        """Test retrying an unknown job returns 404."""
+        response = authenticated_client.post(f"{backend_url}/kb/jobs/00000000-0000-0000-0000-000000000000/retry")
+        
+        assert response.status_code == 404
+
+
+@pytest.mark.api
+class TestKnowledgeBaseBulkIngest:
+    """Test bulk (archive / directory) ingestion endpoints."""
+
+    def test_bulk_upload_archive_returns_job_id(self, authenticated_client, backend_url, assert_docsmait):
+        """Test uploading a zip archive queues a bulk ingestion job."""
+        import io
+        import zipfile
+        
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("standards/first.md", "# First\n\nBulk ingestion test content.")
+            zf.writestr("second.txt", "More bulk ingestion test content.")
+        archive.seek(0)
+        
+        response = authenticated_client.post(
+            f"{backend_url}/kb/bulk_upload",
+            data={"collection_name": "test_collection"},
+            files={"file": ("bulk_test.zip", archive, "application/zip")}
+        )
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data, ["job_id", "status"])
+
+    def test_cancelled_bulk_job_leaves_no_documents(self, authenticated_client, backend_url, assert_docsmait):
+        """Test cancelling a multi-file bulk job removes every document it wrote."""
+        import io
+        import time
+        import uuid
+        import zipfile
+        
+        collection_name = f"bulk_cancel_{uuid.uuid4().hex[:8]}"
+        created = authenticated_client.post(f"{backend_url}/kb/collections", json={"name": collection_name})
+        assert_docsmait.assert_api_success(created)
+        
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            for i in range(40):
+                zf.writestr(f"docs/file_{i:02d}.md", f"# File {i}\n\n" + "Bulk cancellation test content. " * 400)
+        archive.seek(0)
+        
+        response = authenticated_client.post(
+            f"{backend_url}/kb/bulk_upload",
+            data={"collection_name": collection_name},
+            files={"file": ("bulk_cancel.zip", archive, "application/zip")}
+        )
+        assert_docsmait.assert_api_success(response)
+        job_id = response.json()["job_id"]
+        
+        # Let the worker start on the first files, then cancel
+        for _ in range(60):
+            job = authenticated_client.get(f"{backend_url}/kb/jobs/{job_id}").json()
+            if job["status"] != "queued":
+                break
+            time.sleep(0.5)
+        cancel = authenticated_client.post(f"{backend_url}/kb/jobs/{job_id}/cancel")
+        if cancel.status_code == 409:
+            pytest.skip("Bulk job finished before it could be cancelled")
+        assert_docsmait.assert_api_success(cancel)
+        
+        for _ in range(120):
+            job = authenticated_client.get(f"{backend_url}/kb/jobs/{job_id}").json()
+            if job["status"] not in ["queued", "running"]:
+                break
+            time.sleep(0.5)
+        
+        try:
+            assert job["status"] == "cancelled"
+            collection = authenticated_client.get(f"{backend_url}/kb/collections/{collection_name}").json()
+            assert collection["documents"] == []
+        finally:
+            authenticated_client.delete(f"{backend_url}/kb/collections/{collection_name}", params={"force": True})
+
+    def test_bulk_ingest_directory_outside_import_root(self, authenticated_client, backend_url):
+        """Test server-side directories outside the import root are rejected."""
+        response = authenticated_client.post(
+            f"{backend_url}/kb/bulk_ingest_directory",
+            params={"directory": "/etc", "collection_name": "test_collection"}
+        )
+        
+        assert response.status_code in [400, 403]
+
+    def test_bulk_upload_unauthenticated(self, api_client, backend_url):
+        """Test bulk upload without authentication."""
+        response = api_client.post(
+            f"{backend_url}/kb/bulk_upload",
+            files={"file": ("bulk_test.zip", b"not an archive", "application/zip")}
+        )
+        
+        assert response.status_code == 401
+
+
+@pytest.mark.api
+class TestKnowledgeBaseStreaming:
+    """Test streaming (NDJSON) chat endpoints."""
+
+    def test_kb_chat_stream_unauthenticated(self, api_client, backend_url):
+        """Test streaming chat without authentication."""
+        response = api_client.post(
+            f"{backend_url}/kb/chat/stream",
+            json={"message": "What is risk management?"}
+        )
+        
+        assert response.status_code == 401
+
+    def test_kb_chat_stream_events(self, authenticated_client, backend_url):
+        """Test streaming chat sends sources first and ends with a done or error event."""
+        response = authenticated_client.post(
+            f"{backend_url}/kb/chat/stream",
+            json={"message": "What is risk management?"},
+            stream=True,
+            timeout=120
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        import json
+        events = [json.loads(line) for line in response.iter_lines() if line]
+        assert events
+        assert events[0]["type"] in ["sources", "error"]
+        assert events[-1]["type"] in ["done", "error"]
+        if events[-1]["type"] == "done":
+            assert "total_time_ms" in events[-1]["performance"]
+
+    def test_ai_assist_stream_unauthenticated(self, api_client, backend_url):
+        """Test streaming AI assistance without authentication."""
+        response = api_client.post(
+            f"{backend_url}/ai/assist/stream",
+            json={"document_content": "Draft", "user_input": "Improve", "document_type": "general"}
+        )
+        
+        assert response.status_code == 401
+
+
+@pytest.mark.api
+class TestKnowledgeBaseSearch:
+    """Test retrieval-only search endpoint (vector, lexical, hybrid)."""
+
+    def test_kb_search_unauthenticated(self, api_client, backend_url):
+        """Test search without authentication."""
+        response = api_client.get(f"{backend_url}/kb/search", params={"query": "REQ-042"})
+        
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize("mode", ["lexical", "hybrid", "vector", "auto"])
+    def test_kb_search_modes(self, authenticated_client, backend_url, assert_docsmait, mode):
+        """Test each search mode returns ranked results."""
+        response = authenticated_client.get(
+            f"{backend_url}/kb/search",
+            params={"query": "ISO 14971 clause 7", "mode": mode, "limit": 3}
+        )
+        
+        assert_docsmait.assert_api_success(response)
+        data = response.json()
+        assert_docsmait.assert_json_structure(data, ["query", "collection_name", "results"])
+        assert len(data["results"]) <= 3
+        for result in data["results"]:
+            assert_docsmait.assert_json_structure(result, ["text", "filename", "score", "retrieval_mode"])
+
+    def test_kb_search_invalid_mode(self, authenticated_client, backend_url):
+        """Test unknown search modes are rejected."""
+        response = authenticated_client.get(
+            f"{backend_url}/kb/search",
+            params={"query": "risk", "mode": "fuzzy"}
+        )
+        
+        assert response.status_code == 422
+
+
+@pytest.mark.api
+class TestKnowledgeBaseStatistics:
+    """Test rollup-backed KB statistics and their repair endpoint."""
+
+    def test_kb_stats_rebuild_unauthenticated(self, api_client, backend_url):
+        """Test rebuilding statistics without authentication."""
+        response = api_client.post(f"{backend_url}/kb/stats/rebuild")
+        
+        assert response.status_code == 401
+
+    def test_kb_stats_match_after_rebuild(self, authenticated_client, backend_url, assert_docsmait):
+        """Test recomputed rollups agree with the incrementally maintained ones."""
+        before = authenticated_client.get(f"{backend_url}/kb/stats")
+        assert_docsmait.assert_api_success(before)
+        
+        rebuild = authenticated_client.post(f"{backend_url}/kb/stats/rebuild")
+        assert_docsmait.assert_api_success(rebuild)
+        assert_docsmait.assert_json_structure(rebuild.json(), ["success", "collections", "documents", "query_days"])
+        
+        after = authenticated_client.get(f"{backend_url}/kb/stats")
+        assert_docsmait.assert_api_success(after)
+        for key in ["documents_indexed", "total_documents", "index_size_mb"]:
+            assert after.json()[key] == before.json()[key]
+        assert after.json()["queries_today"] >= before.json()["queries_today"]
+
+
+@pytest.mark.api
+class TestKnowledgeBaseVectorQuantization:
+    """Test per-collection quantized embedding storage."""
+
+    def test_collections_report_quantization(self, authenticated_client, backend_url, assert_docsmait):
+        """Test every collection reports its vector storage mode."""
+        response = authenticated_client.get(f"{backend_url}/kb/collections")
+        
+        assert_docsmait.assert_api_success(response)
+        for collection in response.json():
+            assert collection["vector_quantization"] in ["none", "scalar", "binary"]
+
+    def test_create_collection_invalid_quantization(self, authenticated_client, backend_url):
+        """Test unknown quantization modes are rejected."""
+        response = authenticated_client.post(
+            f"{backend_url}/kb/collections",
+            json={"name": "quantization_invalid", "quantization": "int4"}
+        )
+        
+        assert response.status_code == 422
+
+
+@pytest.mark.api
+class TestAssessmentQuestionBanks:
+    """Test assessments served from pre-generated question banks."""
+
+    def test_question_banks_unauthenticated(self, api_client, backend_url):
+        """Test question bank status without authentication."""
+        response = api_client.get(f"{backend_url}/training/question-banks")
+        
+        assert response.status_code == 401
+
+    def test_question_banks_status(self, authenticated_client, backend_url, assert_docsmait):
+        """Test every collection reports its question bank state."""
+        response = authenticated_client.get(f"{backend_url}/training/question-banks")
+        
+        assert_docsmait.assert_api_success(response)
+        for bank in response.json()["banks"]:
+            assert_docsmait.assert_json_structure(bank, ["collection_name", "status", "question_count", "up_to_date"])
+            assert bank["status"] in ["pending", "generating", "ready", "failed"]
+
+    def test_assessment_does_not_wait_or_leak_answers(self, authenticated_client, backend_url):
+        """Test assessments are sampled instantly and carry no answers."""
+        import time
+        
+        start_time = time.time()
+        response = authenticated_client.post(
+            f"{backend_url}/training/assessment",
+            json={"topics": ["knowledge base"], "num_questions": 10}
+        )
+        
+        assert response.status_code == 200
+        assert time.time() - start_time < 5.0
+        data = response.json()
+        if data.get("success"):
+            assert 0 < len(data["questions"]) <= 10
+            for question in data["questions"]:
+                assert "correct_answer" not in question
+
+    def test_submit_unknown_questions(self, authenticated_client, backend_url):
+        """Test answers to questions outside any bank are not scored."""
+        response = authenticated_client.post(
+            f"{backend_url}/training/assessment/submit",
+            json={"question_ids": ["not-a-question"], "answers": [True]}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["success"] is False